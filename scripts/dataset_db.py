@@ -0,0 +1,477 @@
+"""
+Backend SQLite indexado para el dataset
+
+Materializa dataset.json en una base de datos embebida con índices sobre
+author_id, created_at, sentimiento, texto de entidades y coordenadas de usuario,
+y expone una pequeña capa de consultas equivalente a los helpers del frontend
+(getTweetsByUser, getEnrichedTweetsBySentiment, getTweetsByDateRange).
+
+La redistribución de coordenadas se ejecuta como una única sentencia UPDATE en
+lugar de recorrer el diccionario de usuarios en Python: los números aleatorios
+salen de un hash entero de (semilla, rowid) y la trigonometría de las funciones
+matemáticas de SQLite. Si la versión de SQLite no las incluye se usa una función
+Python registrada, que cuesta una llamada por fila (bench mide ambas).
+
+Los generadores y la ingesta aceptan --db para materializar el dataset al escribirlo.
+
+Uso:
+    python scripts/dataset_db.py build public/data/dataset.json .cache/dataset.sqlite
+    python scripts/dataset_db.py redistribute .cache/dataset.sqlite --seed 42
+    python scripts/dataset_db.py export .cache/dataset.sqlite public/data/dataset.json
+    python scripts/dataset_db.py bench .cache/dataset.sqlite
+"""
+
+import argparse
+import json
+import random
+import sqlite3
+import time
+from typing import Dict, Any, List, Iterator, Optional, Tuple
+
+from redistribute_users_to_colombia import COLOMBIA_BOUNDS, MAJOR_CITIES, generate_random_coordinates_in_colombia
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS tweets (
+    id TEXT PRIMARY KEY,
+    author_id TEXT NOT NULL,
+    created_at TEXT NOT NULL,
+    text TEXT NOT NULL,
+    retweet_count INTEGER,
+    like_count INTEGER,
+    raw TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS users (
+    id TEXT PRIMARY KEY,
+    username TEXT,
+    location TEXT,
+    verified INTEGER,
+    followers_count INTEGER,
+    geo_x REAL,
+    geo_y REAL,
+    raw TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS sentiment (
+    id TEXT PRIMARY KEY,
+    sentiment TEXT NOT NULL,
+    created_at TEXT,
+    raw TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS entities (
+    tweet_id TEXT NOT NULL,
+    text TEXT NOT NULL,
+    category TEXT,
+    confidence REAL
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+'''
+
+# Los índices se crean tras la carga masiva: construirlos una vez es más rápido
+# que mantenerlos fila a fila durante los INSERT
+INDEXES = '''
+CREATE INDEX IF NOT EXISTS idx_tweets_author ON tweets(author_id, created_at);
+CREATE INDEX IF NOT EXISTS idx_tweets_created ON tweets(created_at);
+CREATE INDEX IF NOT EXISTS idx_sentiment_label ON sentiment(sentiment, created_at);
+CREATE INDEX IF NOT EXISTS idx_entities_text ON entities(text);
+CREATE INDEX IF NOT EXISTS idx_entities_tweet ON entities(tweet_id);
+CREATE INDEX IF NOT EXISTS idx_users_geo ON users(geo_y, geo_x);
+CREATE INDEX IF NOT EXISTS idx_users_username ON users(username);
+'''
+
+
+# Máscara de 32 bits del hash entero; los productos se mantienen por debajo de 2^63
+_MASK32 = 0xFFFFFFFF
+
+
+def _sql_xorshift(col: str, bits: int) -> str:
+    """x ^ (x >> bits) en SQL, que no tiene operador XOR: a ^ b = (a | b) - (a & b)."""
+    return f"(({col} | ({col} >> {bits})) - ({col} & ({col} >> {bits})))"
+
+
+def _sql_redistribucion() -> str:
+    """
+    SELECT (rid, lat, lon) que genera en SQL las mismas distribuciones que generate_random_coordinates_in_colombia.
+
+    Cuatro uniformes por fila (hash de :seed, rowid y el índice) deciden ciudad o
+    país, la ciudad por peso, el ángulo y la distancia al centro. Cada etapa del
+    hash es MATERIALIZED: si SQLite la aplanara, cada XOR copiaría cuatro veces la
+    expresión de la etapa anterior.
+    """
+    uniformes = range(4)
+    semillas = ', '.join(
+        f"((rowid * 2654435761 + :seed * 40503 + {k * 2246822519}) & {_MASK32}) AS h{k}" for k in uniformes)
+    mezcla1 = ', '.join(f"(({_sql_xorshift(f'h{k}', 16)}) * 73244475) & {_MASK32} AS h{k}" for k in uniformes)
+    mezcla2 = ', '.join(f"(({_sql_xorshift(f'h{k}', 16)}) * 73244475) & {_MASK32} AS h{k}" for k in uniformes)
+    final = ', '.join(f"{_sql_xorshift(f'h{k}', 16)} / 4294967296.0 AS u{k}" for k in uniformes)
+
+    total = sum(c['weight'] for c in MAJOR_CITIES)
+    acumulado = 0
+    ciudades = []
+    for c in MAJOR_CITIES:
+        ciudades.append(f"({c['lat']}, {c['lon']}, {acumulado / total}, {(acumulado + c['weight']) / total})")
+        acumulado += c['weight']
+
+    b = COLOMBIA_BOUNDS
+    lat_ciudad = f"c.lat + sqrt(u3) * 0.5 * cos(2 * pi() * u2)"
+    lon_ciudad = f"c.lon + sqrt(u3) * 0.5 * sin(2 * pi() * u2) / cos(radians(c.lat))"
+    return f'''
+WITH semillas AS MATERIALIZED (SELECT rowid AS rid, {semillas} FROM users WHERE geo_x IS NOT NULL AND geo_y IS NOT NULL),
+     mezcla1 AS MATERIALIZED (SELECT rid, {mezcla1} FROM semillas),
+     mezcla2 AS MATERIALIZED (SELECT rid, {mezcla2} FROM mezcla1),
+     uniformes AS MATERIALIZED (SELECT rid, {final} FROM mezcla2),
+     ciudades(lat, lon, desde, hasta) AS (VALUES {', '.join(ciudades)}),
+     puntos AS (
+        SELECT rid,
+               CASE WHEN u0 < 0.7 THEN max({b['lat_min']}, min({b['lat_max']}, {lat_ciudad}))
+                    ELSE {b['lat_min']} + u2 * ({b['lat_max'] - b['lat_min']}) END AS lat,
+               CASE WHEN u0 < 0.7 THEN max({b['lon_min']}, min({b['lon_max']}, {lon_ciudad}))
+                    ELSE {b['lon_min']} + u3 * ({b['lon_max'] - b['lon_min']}) END AS lon
+        FROM uniformes LEFT JOIN ciudades c ON u1 >= c.desde AND u1 < c.hasta
+     )
+SELECT rid, round(lat, 6), round(lon, 6) FROM puntos
+'''
+
+
+def _user_geo(user: Dict[str, Any]) -> Tuple[Optional[float], Optional[float]]:
+    """Extrae (x, y) del usuario si tiene coordenadas válidas."""
+    geo = user.get('geo')
+    if isinstance(geo, dict) and 'x' in geo and 'y' in geo:
+        return geo['x'], geo['y']
+    return None, None
+
+
+def materialize(dataset: Dict[str, Any], db_path: str) -> 'DatasetDB':
+    """
+    Crea (o reemplaza) la base de datos a partir del dataset en memoria.
+
+    Args:
+        dataset: Dataset con tweets, users, places y sentimiento/enriched_tweets
+        db_path: Ruta del fichero SQLite
+
+    Returns:
+        DatasetDB abierto sobre la base creada
+    """
+    conn = sqlite3.connect(db_path)
+    conn.executescript(
+        'DROP TABLE IF EXISTS tweets; DROP TABLE IF EXISTS users;'
+        'DROP TABLE IF EXISTS sentiment; DROP TABLE IF EXISTS entities;'
+        'DROP TABLE IF EXISTS meta;'
+    )
+    conn.execute('PRAGMA journal_mode=OFF')
+    conn.execute('PRAGMA synchronous=OFF')
+    conn.executescript(SCHEMA)
+
+    conn.executemany(
+        'INSERT OR REPLACE INTO tweets VALUES (?, ?, ?, ?, ?, ?, ?)',
+        ((t['id'], t['author_id'], t['created_at'], t['text'],
+          t.get('public_metrics', {}).get('retweet_count', 0),
+          t.get('public_metrics', {}).get('like_count', 0),
+          json.dumps(t, ensure_ascii=False))
+         for t in dataset.get('tweets', []))
+    )
+
+    def user_rows() -> Iterator[tuple]:
+        for user_id, user in dataset.get('users', {}).items():
+            x, y = _user_geo(user)
+            yield (user_id, user.get('username'), user.get('location'), int(bool(user.get('verified'))),
+                   user.get('public_metrics', {}).get('followers_count', 0), x, y,
+                   json.dumps(user, ensure_ascii=False))
+
+    conn.executemany('INSERT OR REPLACE INTO users VALUES (?, ?, ?, ?, ?, ?, ?, ?)', user_rows())
+
+    # El dataset real usa "sentimiento" en lugar de "enriched_tweets"
+    enriched = dataset.get('sentimiento') or dataset.get('enriched_tweets') or []
+    conn.executemany(
+        'INSERT OR REPLACE INTO sentiment VALUES (?, ?, ?, ?)',
+        ((e['id'], e['sentiment'], e.get('created_at'), json.dumps(e, ensure_ascii=False)) for e in enriched)
+    )
+    conn.executemany(
+        'INSERT INTO entities VALUES (?, ?, ?, ?)',
+        ((e['id'], ent['text'], ent.get('category'), ent.get('confidence'))
+         for e in enriched for ent in e.get('entities', []))
+    )
+    conn.execute("INSERT INTO meta VALUES ('places', ?)", (json.dumps(dataset.get('places', {}), ensure_ascii=False),))
+
+    conn.executescript(INDEXES)
+    conn.execute('ANALYZE')
+    conn.commit()
+    conn.close()
+    return DatasetDB(db_path)
+
+
+class DatasetDB:
+    """
+    Capa de consultas sobre la base materializada.
+
+    Todas las consultas se resuelven mediante índices; los registros se devuelven
+    con el mismo formato JSON que el dataset original.
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self.conn = sqlite3.connect(db_path)
+
+    def __enter__(self) -> 'DatasetDB':
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self.conn.close()
+
+    def _raw(self, sql: str, params: tuple) -> List[Dict[str, Any]]:
+        return [json.loads(row[0]) for row in self.conn.execute(sql, params)]
+
+    def counts(self) -> Dict[str, int]:
+        return {
+            table: self.conn.execute(f'SELECT COUNT(*) FROM {table}').fetchone()[0]
+            for table in ('tweets', 'users', 'sentiment', 'entities')
+        }
+
+    def get_tweet(self, tweet_id: str) -> Optional[Dict[str, Any]]:
+        rows = self._raw('SELECT raw FROM tweets WHERE id = ?', (tweet_id,))
+        return rows[0] if rows else None
+
+    def get_user(self, user_id: str) -> Optional[Dict[str, Any]]:
+        """Usuario por id, con las coordenadas actuales de la base."""
+        row = self.conn.execute('SELECT raw, geo_x, geo_y FROM users WHERE id = ?', (user_id,)).fetchone()
+        return self._user_from_row(row) if row else None
+
+    @staticmethod
+    def _user_from_row(row: tuple) -> Dict[str, Any]:
+        user = json.loads(row[0])
+        if row[1] is not None and row[2] is not None:
+            user['geo'] = {'x': row[1], 'y': row[2]}
+        return user
+
+    def tweets_by_user(self, user_id: str, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Equivalente a getTweetsByUser, ordenado del más reciente al más antiguo."""
+        return self._raw(
+            'SELECT raw FROM tweets WHERE author_id = ? ORDER BY created_at DESC LIMIT ?',
+            (user_id, -1 if limit is None else limit)
+        )
+
+    def enriched_by_sentiment(self, sentiment: str, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Equivalente a getEnrichedTweetsBySentiment."""
+        return self._raw(
+            'SELECT raw FROM sentiment WHERE sentiment = ? ORDER BY created_at DESC LIMIT ?',
+            (sentiment, -1 if limit is None else limit)
+        )
+
+    def tweets_by_date_range(self, start: str, end: str, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Equivalente a getTweetsByDateRange.
+
+        Las fechas son ISO 8601 (el formato del dataset ordena lexicográficamente).
+        """
+        return self._raw(
+            'SELECT raw FROM tweets WHERE created_at >= ? AND created_at <= ? ORDER BY created_at LIMIT ?',
+            (start, end, -1 if limit is None else limit)
+        )
+
+    def tweets_by_entity(self, entity_text: str, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Tweets enriquecidos que mencionan una entidad concreta."""
+        return self._raw(
+            'SELECT s.raw FROM entities e JOIN sentiment s ON s.id = e.tweet_id '
+            'WHERE e.text = ? LIMIT ?',
+            (entity_text, -1 if limit is None else limit)
+        )
+
+    def users_in_bbox(self, lat_min: float, lat_max: float, lon_min: float, lon_max: float) -> List[Dict[str, Any]]:
+        """Usuarios cuyas coordenadas caen dentro de la caja indicada."""
+        rows = self.conn.execute(
+            'SELECT raw, geo_x, geo_y FROM users '
+            'WHERE geo_y BETWEEN ? AND ? AND geo_x BETWEEN ? AND ?',
+            (lat_min, lat_max, lon_min, lon_max)
+        )
+        return [self._user_from_row(row) for row in rows]
+
+    def geo_stats(self, bounds: Dict[str, float] = COLOMBIA_BOUNDS) -> Dict[str, Any]:
+        """
+        Estadísticas de verify_colombia_distribution calculadas con un único agregado SQL.
+        """
+        row = self.conn.execute(
+            'SELECT COUNT(*), COUNT(geo_x),'
+            '  SUM(geo_y BETWEEN :lat_min AND :lat_max AND geo_x BETWEEN :lon_min AND :lon_max),'
+            '  MIN(geo_y), MAX(geo_y), AVG(geo_y), MIN(geo_x), MAX(geo_x), AVG(geo_x) '
+            'FROM users', bounds
+        ).fetchone()
+        keys = ('total_users', 'users_with_geo', 'users_in_bounds',
+                'lat_min', 'lat_max', 'lat_avg', 'lon_min', 'lon_max', 'lon_avg')
+        stats = dict(zip(keys, row))
+        stats['users_in_bounds'] = stats['users_in_bounds'] or 0
+        return stats
+
+    def redistribute_coordinates(self, seed: Optional[int] = None, metodo: str = 'auto') -> int:
+        """
+        Redistribuye dentro de Colombia a todos los usuarios con coordenadas.
+
+        Usa una única sentencia UPDATE. Con metodo='sql' los puntos se calculan en
+        SQLite (hash entero + funciones matemáticas); con metodo='udf' cada fila
+        llama a generate_random_coordinates_in_colombia a través de una función
+        registrada. 'auto' usa SQL si SQLite incluye las funciones matemáticas
+        (3.35+ compilado con ellas). Ambos son reproducibles para una misma semilla.
+
+        Returns:
+            Número de usuarios actualizados
+        """
+        base_seed = random.randrange(2 ** 32) if seed is None else seed
+        if metodo in ('auto', 'sql'):
+            # Los puntos se materializan en una tabla temporal con clave rowid: evaluar el
+            # CTE dentro del UPDATE lo recalcularía por fila
+            self.conn.execute('CREATE TEMP TABLE IF NOT EXISTS _puntos (rid INTEGER PRIMARY KEY, lat REAL, lon REAL)')
+            self.conn.execute('DELETE FROM _puntos')
+            try:
+                self.conn.execute(f'INSERT INTO _puntos {_sql_redistribucion()}', {'seed': base_seed % 2 ** 32})
+            except sqlite3.OperationalError:
+                # SQLite sin funciones matemáticas (sin, cos, sqrt...)
+                if metodo == 'sql':
+                    raise
+            else:
+                cursor = self.conn.execute(
+                    'UPDATE users SET geo_y = (SELECT lat FROM _puntos WHERE rid = users.rowid),'
+                    '                 geo_x = (SELECT lon FROM _puntos WHERE rid = users.rowid) '
+                    'WHERE rowid IN (SELECT rid FROM _puntos)'
+                )
+                self.conn.execute('DELETE FROM _puntos')
+                self.conn.commit()
+                return cursor.rowcount
+        return self._redistribuir_udf(base_seed)
+
+    def _redistribuir_udf(self, base_seed: int) -> int:
+        """Variante con función Python: una llamada por fila y eje."""
+        ultimo: Dict[str, Any] = {'rowid': None, 'punto': None}
+
+        def coordenada(rowid: int, eje: int) -> float:
+            if ultimo['rowid'] != rowid:
+                rng = random.Random(base_seed * 1_000_003 + rowid)
+                ultimo['rowid'] = rowid
+                ultimo['punto'] = generate_random_coordinates_in_colombia(rng)
+            lat, lon = ultimo['punto']
+            return round(lat if eje == 0 else lon, 6)
+
+        self.conn.create_function('coordenada_colombia', 2, coordenada)
+        cursor = self.conn.execute(
+            'UPDATE users SET geo_y = coordenada_colombia(rowid, 0), geo_x = coordenada_colombia(rowid, 1) '
+            'WHERE geo_x IS NOT NULL AND geo_y IS NOT NULL'
+        )
+        self.conn.commit()
+        return cursor.rowcount
+
+    def to_dataset(self) -> Dict[str, Any]:
+        """Reconstruye el dataset en el formato de dataset.json (con las coordenadas actuales)."""
+        places_row = self.conn.execute("SELECT value FROM meta WHERE key = 'places'").fetchone()
+        return {
+            "tweets": [json.loads(r[0]) for r in self.conn.execute('SELECT raw FROM tweets ORDER BY rowid')],
+            "users": {
+                user['id']: user for user in
+                (self._user_from_row(r) for r in self.conn.execute('SELECT raw, geo_x, geo_y FROM users ORDER BY rowid'))
+            },
+            "places": json.loads(places_row[0]) if places_row else {},
+            "sentimiento": [json.loads(r[0]) for r in self.conn.execute('SELECT raw FROM sentiment ORDER BY rowid')],
+        }
+
+
+def benchmark(db: DatasetDB, repeticiones: int = 100) -> Dict[str, float]:
+    """Mide la latencia media (ms) de cada consulta con parámetros tomados de la propia base."""
+    def tomar(sql: str) -> Any:
+        row = db.conn.execute(sql).fetchone()
+        return row[0] if row else None
+
+    author = tomar('SELECT author_id FROM tweets ORDER BY random() LIMIT 1')
+    entity = tomar('SELECT text FROM entities ORDER BY random() LIMIT 1')
+    fecha = tomar('SELECT created_at FROM tweets ORDER BY random() LIMIT 1') or ''
+
+    consultas = {
+        'tweets_by_user': lambda: db.tweets_by_user(author),
+        'enriched_by_sentiment(100)': lambda: db.enriched_by_sentiment('negative', 100),
+        'tweets_by_date_range(100)': lambda: db.tweets_by_date_range(fecha, '9999', 100),
+        'tweets_by_entity(100)': lambda: db.tweets_by_entity(entity, 100),
+        'users_in_bbox(Medellín)': lambda: db.users_in_bbox(6.1, 6.4, -75.7, -75.4),
+        'get_user': lambda: db.get_user(author),
+    }
+    resultados = {}
+    for nombre, consulta in consultas.items():
+        inicio = time.perf_counter()
+        for _ in range(repeticiones):
+            consulta()
+        resultados[nombre] = (time.perf_counter() - inicio) * 1000 / repeticiones
+    return resultados
+
+
+def benchmark_redistribucion(db: DatasetDB, seed: int = 42) -> Dict[str, float]:
+    """Tiempo (ms) de redistribute_coordinates en SQL y con la función Python, sobre copias en memoria."""
+    resultados = {}
+    for metodo in ('sql', 'udf'):
+        with DatasetDB(':memory:') as copia:
+            db.conn.backup(copia.conn)
+            inicio = time.perf_counter()
+            try:
+                filas = copia.redistribute_coordinates(seed, metodo)
+            except sqlite3.OperationalError:
+                continue
+            resultados[f'redistribute[{metodo}] ({filas} filas)'] = (time.perf_counter() - inicio) * 1000
+    return resultados
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """Función principal: build / redistribute / export / bench."""
+    parser = argparse.ArgumentParser(description='Backend SQLite indexado para el dataset')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    p_build = sub.add_parser('build', help='Materializar dataset.json en SQLite')
+    p_build.add_argument('input')
+    p_build.add_argument('db')
+
+    p_redis = sub.add_parser('redistribute', help='Redistribuir coordenadas a Colombia')
+    p_redis.add_argument('db')
+    p_redis.add_argument('--seed', type=int, default=None)
+    p_redis.add_argument('--method', choices=('auto', 'sql', 'udf'), default='auto')
+
+    p_export = sub.add_parser('export', help='Exportar la base a dataset.json')
+    p_export.add_argument('db')
+    p_export.add_argument('output')
+
+    p_bench = sub.add_parser('bench', help='Medir latencia de las consultas')
+    p_bench.add_argument('db')
+
+    args = parser.parse_args(argv)
+
+    if args.command == 'build':
+        print(f"Cargando {args.input}...")
+        with open(args.input, 'r', encoding='utf-8') as f:
+            dataset = json.load(f)
+        inicio = time.perf_counter()
+        with materialize(dataset, args.db) as db:
+            print(f"✓ Base creada en {time.perf_counter() - inicio:.2f}s: {db.counts()}")
+
+    elif args.command == 'redistribute':
+        with DatasetDB(args.db) as db:
+            inicio = time.perf_counter()
+            actualizados = db.redistribute_coordinates(args.seed, args.method)
+            print(f"✓ {actualizados} usuarios redistribuidos en {time.perf_counter() - inicio:.2f}s")
+            stats = db.geo_stats()
+            print(f"  En Colombia: {stats['users_in_bounds']}/{stats['users_with_geo']}")
+
+    elif args.command == 'export':
+        with DatasetDB(args.db) as db:
+            dataset = db.to_dataset()
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(dataset, f, ensure_ascii=False, indent=2)
+        print(f"✓ Dataset exportado a {args.output}")
+
+    elif args.command == 'bench':
+        with DatasetDB(args.db) as db:
+            print(f"Registros: {db.counts()}")
+            for nombre, ms in benchmark(db).items():
+                print(f"  {nombre:<30} {ms:>8.3f} ms")
+            # La versión con función Python paga una llamada por fila y eje
+            for nombre, ms in benchmark_redistribucion(db).items():
+                print(f"  {nombre:<30} {ms:>8.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,401 @@
+"""
+Snapshots versionados del dataset con parches delta entre ejecuciones
+
+En lugar de reescribir copias completas (p.ej. dataset_backup_original.json),
+cada versión se guarda como un parche comprimido con solo las diferencias
+respecto a la anterior: tweets añadidos o eliminados, y cambios por campo en
+registros existentes (geo de usuarios, métricas actualizadas...). Cada versión
+se identifica por un hash de contenido, y al aplicar un parche se verifica el
+hash de origen y de destino.
+
+Estructura del almacén (por defecto public/data/snapshots/ junto al dataset,
+para que el cliente pueda descargar solo los parches que le faltan):
+
+    manifest.json               Lista ordenada de versiones
+    base-<hash>.json.gz         Versión completa (la primera y cada max_chain parches)
+    patch-<from>-<to>.json.gz   Diferencias entre dos versiones consecutivas
+
+El cliente se actualiza con refreshDataset (src/lib/data/snapshots.ts), que
+aplica los parches con la misma semántica que aplicar_delta. El hash de
+contenido solo se calcula en Python: el cliente no lo recalcula, sino que
+encadena los hashes del manifiesto (cada parche debe partir del que tiene).
+
+Uso:
+    python scripts/dataset_snapshots.py commit public/data/dataset.json -m "Nuevos tweets"
+    python scripts/dataset_snapshots.py log public/data/dataset.json
+    python scripts/dataset_snapshots.py rollback public/data/dataset.json 3
+    python scripts/dataset_snapshots.py patches-since public/data/dataset.json <hash>
+"""
+
+import argparse
+import gzip
+import hashlib
+import json
+import os
+from datetime import datetime
+from typing import Dict, Any, List, Optional
+
+PATCH_FORMAT = 1
+
+# Secciones con registros identificables: las listas usan record["id"] y los
+# objetos su clave. El dataset real usa "sentimiento" en lugar de "enriched_tweets".
+SECCIONES_LISTA = ('tweets', 'sentimiento', 'enriched_tweets')
+SECCIONES_OBJETO = ('users', 'places')
+
+
+def _canonico(valor: Any) -> bytes:
+    return json.dumps(valor, sort_keys=True, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+
+
+def hash_registro(registro: Any) -> str:
+    return hashlib.sha256(_canonico(registro)).hexdigest()
+
+
+def _registros(dataset: Dict[str, Any], seccion: str) -> Dict[str, Any]:
+    """Registros de una sección como {id: registro}, preservando el orden."""
+    valor = dataset.get(seccion)
+    if valor is None:
+        return {}
+    if seccion in SECCIONES_LISTA:
+        return {str(r['id']): r for r in valor}
+    return dict(valor)
+
+
+def hash_dataset(dataset: Dict[str, Any]) -> str:
+    """
+    Hash de contenido del dataset completo.
+
+    Combina los hashes de cada registro ordenados por id, de modo que no depende
+    del formato del fichero (sangría, orden de claves) sino solo del contenido.
+    """
+    total = hashlib.sha256()
+    for seccion in SECCIONES_LISTA + SECCIONES_OBJETO:
+        if seccion not in dataset:
+            continue
+        total.update(seccion.encode('utf-8') + b'\0')
+        registros = _registros(dataset, seccion)
+        for record_id in sorted(registros):
+            total.update(record_id.encode('utf-8') + b'\0' + hash_registro(registros[record_id]).encode('ascii'))
+        # El orden de las listas también forma parte del contenido
+        if seccion in SECCIONES_LISTA:
+            total.update(hashlib.sha256('\0'.join(registros).encode('utf-8')).digest())
+    return total.hexdigest()
+
+
+def _delta_campos(anterior: Dict[str, Any], nuevo: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Cambios de primer nivel entre dos registros: {"set": {...}, "unset": [...]} o None si son iguales."""
+    cambios = {k: v for k, v in nuevo.items() if k not in anterior or anterior[k] != v}
+    eliminados = [k for k in anterior if k not in nuevo]
+    if not cambios and not eliminados:
+        return None
+    delta: Dict[str, Any] = {}
+    if cambios:
+        delta['set'] = cambios
+    if eliminados:
+        delta['unset'] = eliminados
+    return delta
+
+
+def calcular_delta(anterior: Dict[str, Any], nuevo: Dict[str, Any],
+                   hash_anterior: Optional[str] = None, hash_nuevo: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Parche que transforma `anterior` en `nuevo`.
+
+    Los hashes se pueden pasar si ya se conocen, para no recalcularlos.
+
+    Returns:
+        {"format", "from", "to", "sections": {sección: {"added", "removed", "changed"}}, "stats"}
+    """
+    secciones: Dict[str, Any] = {}
+    stats = {'added': 0, 'removed': 0, 'changed': 0}
+
+    for seccion in SECCIONES_LISTA + SECCIONES_OBJETO:
+        if seccion not in anterior and seccion not in nuevo:
+            continue
+        viejos = _registros(anterior, seccion)
+        nuevos = _registros(nuevo, seccion)
+
+        if seccion in SECCIONES_LISTA:
+            # Un parche de lista reproduce el orden solo si los supervivientes mantienen su
+            # orden relativo y los registros nuevos van al final; si no, se reemplaza la lista
+            supervivientes = [k for k in viejos if k in nuevos]
+            if supervivientes != list(nuevos)[:len(supervivientes)]:
+                secciones[seccion] = {'replace': nuevo.get(seccion, [])}
+                stats['changed'] += len(nuevos)
+                continue
+
+        added = [nuevos[k] if seccion in SECCIONES_LISTA else [k, nuevos[k]] for k in nuevos if k not in viejos]
+        removed = [k for k in viejos if k not in nuevos]
+        changed = {}
+        for k in nuevos:
+            if k in viejos:
+                delta = _delta_campos(viejos[k], nuevos[k])
+                if delta is not None:
+                    changed[k] = delta
+
+        if added or removed or changed or (seccion in nuevo) != (seccion in anterior):
+            entrada: Dict[str, Any] = {}
+            if added:
+                entrada['added'] = added
+            if removed:
+                entrada['removed'] = removed
+            if changed:
+                entrada['changed'] = changed
+            if seccion not in nuevo:
+                entrada['drop'] = True
+            secciones[seccion] = entrada
+            stats['added'] += len(added)
+            stats['removed'] += len(removed)
+            stats['changed'] += len(changed)
+
+    return {
+        'format': PATCH_FORMAT,
+        'from': hash_anterior or hash_dataset(anterior),
+        'to': hash_nuevo or hash_dataset(nuevo),
+        'sections': secciones,
+        'stats': stats,
+    }
+
+
+def aplicar_delta(dataset: Dict[str, Any], parche: Dict[str, Any], verificar: bool = True) -> Dict[str, Any]:
+    """
+    Aplica un parche y devuelve un dataset nuevo (el original no se modifica).
+
+    Args:
+        dataset: Versión de origen del parche
+        parche: Resultado de calcular_delta
+        verificar: Comprobar los hashes de origen y destino
+
+    Raises:
+        ValueError: Si el dataset no es el origen del parche o el resultado no coincide
+    """
+    if verificar and hash_dataset(dataset) != parche['from']:
+        raise ValueError('El dataset no corresponde a la versión de origen del parche')
+
+    resultado = dict(dataset)
+    for seccion, cambios in parche['sections'].items():
+        if cambios.get('drop'):
+            resultado.pop(seccion, None)
+            continue
+        if 'replace' in cambios:
+            resultado[seccion] = cambios['replace']
+            continue
+
+        registros = _registros(dataset, seccion)
+        for k in cambios.get('removed', []):
+            del registros[k]
+        for k, delta in cambios.get('changed', {}).items():
+            registro = {**registros[k], **delta.get('set', {})}
+            for campo in delta.get('unset', []):
+                registro.pop(campo, None)
+            registros[k] = registro
+
+        if seccion in SECCIONES_LISTA:
+            lista = list(registros.values())
+            lista.extend(cambios.get('added', []))
+            resultado[seccion] = lista
+        else:
+            registros.update((k, v) for k, v in cambios.get('added', []))
+            resultado[seccion] = registros
+
+    if verificar and hash_dataset(resultado) != parche['to']:
+        raise ValueError('El resultado de aplicar el parche no coincide con el hash de destino')
+    return resultado
+
+
+def _escribir_gz(path: str, contenido: Any) -> int:
+    tmp = f"{path}.tmp"
+    with gzip.open(tmp, 'wb', compresslevel=6) as f:
+        f.write(_canonico(contenido))
+    os.replace(tmp, path)
+    return os.path.getsize(path)
+
+
+def _leer_gz(path: str) -> Any:
+    with gzip.open(path, 'rb') as f:
+        return json.loads(f.read())
+
+
+def snapshot_dir_for(dataset_path: str) -> str:
+    """
+    Directorio de snapshots que acompaña a un dataset.
+
+    dataset.json usa snapshots/ (el que descarga el cliente); cualquier otro
+    fichero del mismo directorio tiene su propio historial en snapshots-<nombre>/.
+    """
+    base = os.path.splitext(os.path.basename(dataset_path))[0]
+    nombre = 'snapshots' if base == 'dataset' else f'snapshots-{base}'
+    return os.path.join(os.path.dirname(dataset_path) or '.', nombre)
+
+
+class SnapshotStore:
+    """
+    Almacén de versiones del dataset: una base completa y una cadena de parches.
+
+    Args:
+        directory: Directorio del almacén
+        max_chain: Parches consecutivos tras los que se escribe una nueva base,
+            para acotar el coste de reconstruir una versión
+    """
+
+    def __init__(self, directory: str, max_chain: int = 20):
+        self.directory = directory
+        self.max_chain = max_chain
+        self.manifest_path = os.path.join(directory, 'manifest.json')
+        os.makedirs(directory, exist_ok=True)
+        if os.path.exists(self.manifest_path):
+            with open(self.manifest_path, 'r', encoding='utf-8') as f:
+                self.manifest = json.load(f)
+        else:
+            self.manifest = {'versions': []}
+
+    @property
+    def versions(self) -> List[Dict[str, Any]]:
+        return self.manifest['versions']
+
+    def latest(self) -> Optional[Dict[str, Any]]:
+        return self.versions[-1] if self.versions else None
+
+    def _guardar_manifest(self) -> None:
+        tmp = f"{self.manifest_path}.tmp"
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(self.manifest, f, ensure_ascii=False, indent=2)
+        os.replace(tmp, self.manifest_path)
+
+    def _buscar(self, version: int) -> int:
+        for i, entrada in enumerate(self.versions):
+            if entrada['version'] == version:
+                return i
+        raise KeyError(f"Versión {version} inexistente")
+
+    def materialize(self, version: Optional[int] = None) -> Dict[str, Any]:
+        """Reconstruye una versión (la última por defecto) desde su base y los parches siguientes."""
+        if not self.versions:
+            raise KeyError('El almacén de snapshots está vacío')
+        objetivo = len(self.versions) - 1 if version is None else self._buscar(version)
+        inicio = max(i for i in range(objetivo + 1) if self.versions[i]['kind'] == 'base')
+
+        dataset = _leer_gz(os.path.join(self.directory, self.versions[inicio]['file']))
+        for entrada in self.versions[inicio + 1:objetivo + 1]:
+            parche = _leer_gz(os.path.join(self.directory, entrada['file']))
+            dataset = aplicar_delta(dataset, parche, verificar=False)
+        if hash_dataset(dataset) != self.versions[objetivo]['hash']:
+            raise ValueError(f"La versión {self.versions[objetivo]['version']} reconstruida no coincide con su hash")
+        return dataset
+
+    def commit(self, dataset: Dict[str, Any], message: str = '') -> Optional[Dict[str, Any]]:
+        """
+        Registra una nueva versión. Devuelve su entrada del manifiesto, o None si no hubo cambios.
+
+        La primera versión, y la siguiente a cada max_chain parches, se guarda completa.
+        """
+        anterior = self.latest()
+        nuevo_hash = hash_dataset(dataset)
+        if anterior is not None and anterior['hash'] == nuevo_hash:
+            return None
+
+        cadena = 0
+        for entrada in reversed(self.versions):
+            if entrada['kind'] == 'base':
+                break
+            cadena += 1
+
+        entrada: Dict[str, Any] = {
+            'version': anterior['version'] + 1 if anterior else 1,
+            'hash': nuevo_hash,
+            'parent': anterior['hash'] if anterior else None,
+            'created_at': datetime.now().strftime("%Y-%m-%dT%H:%M:%S"),
+            'message': message,
+        }
+
+        if anterior is None or cadena >= self.max_chain:
+            entrada['kind'] = 'base'
+            entrada['file'] = f"base-{nuevo_hash[:16]}.json.gz"
+            entrada['bytes'] = _escribir_gz(os.path.join(self.directory, entrada['file']), dataset)
+        else:
+            parche = calcular_delta(self.materialize(), dataset, anterior['hash'], nuevo_hash)
+            entrada['kind'] = 'patch'
+            entrada['file'] = f"patch-{anterior['hash'][:16]}-{nuevo_hash[:16]}.json.gz"
+            entrada['bytes'] = _escribir_gz(os.path.join(self.directory, entrada['file']), parche)
+            entrada['stats'] = parche['stats']
+
+        self.versions.append(entrada)
+        self._guardar_manifest()
+        return entrada
+
+    def patches_since(self, from_hash: str) -> List[Dict[str, Any]]:
+        """
+        Parches que llevan a un cliente desde from_hash hasta la última versión.
+
+        Raises:
+            KeyError: Si from_hash no está en el almacén o la cadena pasa por una
+                base (el cliente debe descargar esa base completa)
+        """
+        hashes = [v['hash'] for v in self.versions]
+        if from_hash not in hashes:
+            raise KeyError(f"Versión {from_hash[:16]} desconocida")
+        pendientes = self.versions[hashes.index(from_hash) + 1:]
+        if any(v['kind'] == 'base' for v in pendientes):
+            # Una base rompe la cadena de parches directos desde from_hash
+            raise KeyError('Hay una base intermedia; descargar la base más reciente')
+        return pendientes
+
+    def rollback(self, version: int, output_path: str) -> Dict[str, Any]:
+        """Reconstruye una versión, la escribe en output_path y la registra como versión nueva."""
+        dataset = self.materialize(version)
+        with open(output_path, 'w', encoding='utf-8') as f:
+            json.dump(dataset, f, ensure_ascii=False, indent=2)
+        self.commit(dataset, f"Rollback a la versión {version}")
+        return dataset
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """Función principal: commit / log / rollback / patches-since."""
+    parser = argparse.ArgumentParser(description='Snapshots versionados del dataset con parches delta')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    p_commit = sub.add_parser('commit', help='Registrar la versión actual del dataset')
+    p_commit.add_argument('dataset')
+    p_commit.add_argument('-m', '--message', default='')
+
+    p_log = sub.add_parser('log', help='Listar versiones')
+    p_log.add_argument('dataset')
+
+    p_rollback = sub.add_parser('rollback', help='Restaurar una versión en dataset.json')
+    p_rollback.add_argument('dataset')
+    p_rollback.add_argument('version', type=int)
+
+    p_since = sub.add_parser('patches-since', help='Parches pendientes para un cliente')
+    p_since.add_argument('dataset')
+    p_since.add_argument('hash')
+
+    args = parser.parse_args(argv)
+    store = SnapshotStore(snapshot_dir_for(args.dataset))
+
+    if args.command == 'commit':
+        with open(args.dataset, 'r', encoding='utf-8') as f:
+            dataset = json.load(f)
+        entrada = store.commit(dataset, args.message)
+        if entrada is None:
+            print("Sin cambios respecto a la última versión")
+        else:
+            print(f"✓ Versión {entrada['version']} ({entrada['kind']}, {entrada['bytes'] / 1024:.1f} KB)")
+            if 'stats' in entrada:
+                print(f"  {entrada['stats']}")
+
+    elif args.command == 'log':
+        for v in store.versions:
+            print(f"{v['version']:>4}  {v['hash'][:16]}  {v['kind']:<5}  {v['bytes'] / 1024:>10.1f} KB  "
+                  f"{v['created_at']}  {v['message']}")
+
+    elif args.command == 'rollback':
+        store.rollback(args.version, args.dataset)
+        print(f"✓ Dataset restaurado a la versión {args.version}")
+
+    elif args.command == 'patches-since':
+        for v in store.patches_since(args.hash):
+            print(v['file'])
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,185 @@
+"""
+Caché persistente de enriquecimiento (sentimiento + entidades) en SQLite
+
+Cada resultado se indexa por un hash SHA-256 del texto normalizado más la versión
+del enriquecedor, de modo que las ejecuciones incrementales solo calculan el
+enriquecimiento de tweets nuevos o modificados. Cambiar la versión invalida de
+forma natural todas las entradas anteriores.
+
+Incluye búsquedas e inserciones por lote, expulsión LRU acotada por número de
+entradas y contadores de aciertos/fallos.
+"""
+
+import hashlib
+import json
+import sqlite3
+import time
+import unicodedata
+from typing import Dict, Any, List, Callable, Iterable, Tuple
+
+# SQLite limita el número de parámetros por sentencia; se consulta por bloques
+_BATCH = 500
+
+
+def normalizar_texto(texto: str) -> str:
+    """Normaliza el texto para el hash: Unicode NFC y espacios colapsados."""
+    return ' '.join(unicodedata.normalize('NFC', texto).split())
+
+
+def clave_cache(texto: str, version: str) -> str:
+    """Clave de caché: sha256(versión + texto normalizado)."""
+    return hashlib.sha256(f"{version}\x00{normalizar_texto(texto)}".encode('utf-8')).hexdigest()
+
+
+class EnrichmentCache:
+    """
+    Caché clave-valor en SQLite para resultados de enriquecimiento.
+
+    Args:
+        path: Ruta del fichero SQLite (':memory:' para pruebas)
+        version: Versión del enriquecedor; forma parte de la clave
+        max_entries: Máximo de entradas antes de expulsar las menos usadas
+    """
+
+    def __init__(self, path: str, version: str, max_entries: int = 1_000_000):
+        self.path = path
+        self.version = version
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self._conn = sqlite3.connect(path)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS enrichment ('
+            '  key TEXT PRIMARY KEY,'
+            '  value TEXT NOT NULL,'
+            '  last_used REAL NOT NULL'
+            ')'
+        )
+        self._conn.execute('CREATE INDEX IF NOT EXISTS idx_enrichment_last_used ON enrichment(last_used)')
+        self._conn.commit()
+        # Número de filas mantenido en memoria para no contar la tabla en cada lote
+        self._filas = self._conn.execute('SELECT COUNT(*) FROM enrichment').fetchone()[0]
+
+    def __enter__(self) -> 'EnrichmentCache':
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self._conn.close()
+
+    def __len__(self) -> int:
+        return self._filas
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, Any]:
+        """
+        Busca varias claves a la vez.
+
+        Los aciertos y fallos se cuentan por clave consultada, repeticiones incluidas.
+
+        Returns:
+            Diccionario clave -> valor solo con las claves encontradas
+        """
+        keys = list(keys)
+        found = self._buscar(keys)
+        aciertos = sum(1 for k in keys if k in found)
+        self.hits += aciertos
+        self.misses += len(keys) - aciertos
+        return found
+
+    def _buscar(self, keys: List[str]) -> Dict[str, Any]:
+        """Busca las claves (sin repetir) y actualiza su last_used, sin tocar los contadores."""
+        keys = list(dict.fromkeys(keys))
+        found: Dict[str, Any] = {}
+        for i in range(0, len(keys), _BATCH):
+            chunk = keys[i:i + _BATCH]
+            placeholders = ','.join('?' * len(chunk))
+            rows = self._conn.execute(
+                f'SELECT key, value FROM enrichment WHERE key IN ({placeholders})', chunk
+            ).fetchall()
+            found.update((k, json.loads(v)) for k, v in rows)
+
+        if found:
+            now = time.time()
+            self._conn.executemany(
+                'UPDATE enrichment SET last_used = ? WHERE key = ?',
+                [(now, k) for k in found]
+            )
+            self._conn.commit()
+        return found
+
+    def put_many(self, items: Iterable[Tuple[str, Any]]) -> None:
+        """Inserta o reemplaza varias entradas y aplica la expulsión si se supera el límite."""
+        now = time.time()
+        filas = [(k, json.dumps(v, ensure_ascii=False), now) for k, v in items]
+        nuevas = self._conn.executemany(
+            'INSERT OR IGNORE INTO enrichment (key, value, last_used) VALUES (?, ?, ?)', filas
+        ).rowcount
+        if nuevas < len(filas):
+            # Algunas claves ya existían: se reemplaza su valor
+            self._conn.executemany(
+                'UPDATE enrichment SET value = ?, last_used = ? WHERE key = ?',
+                [(v, t, k) for k, v, t in filas]
+            )
+        self._conn.commit()
+        self._filas += nuevas
+        self._evict()
+
+    def _evict(self) -> None:
+        """Elimina las entradas usadas hace más tiempo hasta volver a max_entries."""
+        exceso = len(self) - self.max_entries
+        if exceso <= 0:
+            return
+        self._conn.execute(
+            'DELETE FROM enrichment WHERE key IN ('
+            '  SELECT key FROM enrichment ORDER BY last_used LIMIT ?'
+            ')', (exceso,)
+        )
+        self._conn.commit()
+        self._filas -= exceso
+        self.evictions += exceso
+
+    def get_or_compute_many(self, textos: List[str], calcular: Callable[[str], Any]) -> List[Any]:
+        """
+        Devuelve el enriquecimiento de cada texto, calculando solo los ausentes.
+
+        Cada texto cuenta como un acierto salvo los que hay que calcular, así un
+        texto repetido dentro del mismo lote se calcula una vez y el resto son aciertos.
+
+        Args:
+            textos: Textos a enriquecer (pueden repetirse)
+            calcular: Función de enriquecimiento para un texto
+
+        Returns:
+            Lista de resultados alineada con textos
+        """
+        claves = [clave_cache(t, self.version) for t in textos]
+        resultados = self._buscar(claves)
+
+        nuevos: Dict[str, Any] = {}
+        for clave, texto in zip(claves, textos):
+            if clave not in resultados and clave not in nuevos:
+                nuevos[clave] = calcular(texto)
+        if nuevos:
+            self.put_many(nuevos.items())
+            resultados.update(nuevos)
+
+        self.misses += len(nuevos)
+        self.hits += len(claves) - len(nuevos)
+        return [resultados[c] for c in claves]
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            'entries': len(self),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / total if total else 0.0,
+            'evictions': self.evictions,
+        }
+
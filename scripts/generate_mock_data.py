@@ -1,7 +1,18 @@
+import argparse
 import json
+import os
 import random
 from datetime import datetime, timedelta
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
+
+from enrichment_cache import EnrichmentCache
+from stream_sketches import StreamSketches, actualizar_fichero_sketches
+
+# Versión del enriquecimiento (sentimiento + entidades). Incrementarla invalida la caché.
+ENRIQUECEDOR_VERSION = "mock-1"
+
+# Caché persistente de enriquecimiento entre ejecuciones
+CACHE_PATH = ".cache/enrichment_cache.sqlite"
 
 # Noticias políticas recientes de Colombia (2025) - EXPANDIDAS
 NOTICIAS_BASE = [
@@ -499,23 +510,41 @@ def generar_tweet(tweet_id: str, author_id: str, base_time: datetime) -> Dict[st
         }
     }
 
-def generar_tweet_con_sentimiento(tweet: Dict[str, Any]) -> Dict[str, Any]:
+def enriquecer_texto(texto: str) -> Dict[str, Any]:
+    """Calcula sentimiento y entidades de un texto (la parte cacheable del enriquecimiento)"""
+    sentimiento = analizar_sentimiento(texto)
+    return {
+        "sentiment": sentimiento["sentiment"],
+        "confidence_scores": sentimiento["confidence_scores"],
+        "entities": extraer_entidades(texto)
+    }
+
+def generar_tweet_con_sentimiento(tweet: Dict[str, Any], enriquecimiento: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
     """Genera la versión con análisis de sentimiento del tweet"""
-    sentimiento = analizar_sentimiento(tweet["text"])
-    entidades = extraer_entidades(tweet["text"])
+    if enriquecimiento is None:
+        enriquecimiento = enriquecer_texto(tweet["text"])
     
     return {
         "id": tweet["id"],
         "text": tweet["text"],
         "created_at": tweet["created_at"],
-        "sentiment": sentimiento["sentiment"],
-        "confidence_scores": sentimiento["confidence_scores"],
-        "entities": entidades,
+        "sentiment": enriquecimiento["sentiment"],
+        "confidence_scores": enriquecimiento["confidence_scores"],
+        "entities": enriquecimiento["entities"],
         "geo": None
     }
 
-def generar_dataset(num_tweets: int = 5000) -> Dict[str, Any]:
-    """Genera el dataset completo"""
+def generar_sentimientos(tweets: List[Dict[str, Any]], cache: Optional[EnrichmentCache] = None) -> List[Dict[str, Any]]:
+    """Enriquece un lote de tweets, reutilizando la caché para textos ya procesados"""
+    if cache is None:
+        return [generar_tweet_con_sentimiento(tweet) for tweet in tweets]
+    
+    enriquecimientos = cache.get_or_compute_many([tweet["text"] for tweet in tweets], enriquecer_texto)
+    return [generar_tweet_con_sentimiento(t, e) for t, e in zip(tweets, enriquecimientos)]
+
+def generar_dataset(num_tweets: int = 5000, cache: Optional[EnrichmentCache] = None,
+                    sketches: Optional[StreamSketches] = None) -> Dict[str, Any]:
+    """Genera el dataset completo (opcionalmente alimentando sketches top-K/HyperLogLog)"""
     print(f"🚀 Generando {num_tweets} tweets ficticios...")
     
     # Cargar dataset existente
@@ -542,7 +571,6 @@ def generar_dataset(num_tweets: int = 5000) -> Dict[str, Any]:
     
     # Generar tweets
     tweets_nuevos = []
-    sentimientos_nuevos = []
     base_time = datetime.now()
     
     print(f"📝 Generando {num_tweets} tweets...")
@@ -551,14 +579,21 @@ def generar_dataset(num_tweets: int = 5000) -> Dict[str, Any]:
         author_id = random.choice(user_ids)
         
         tweet = generar_tweet(tweet_id, author_id, base_time)
-        tweet_sentimiento = generar_tweet_con_sentimiento(tweet)
-        
         tweets_nuevos.append(tweet)
-        sentimientos_nuevos.append(tweet_sentimiento)
         
         if (i + 1) % 500 == 0:
             print(f"   Tweets generados: {i + 1}/{num_tweets}")
     
+    # Enriquecer (sentimiento + entidades) en un solo lote
+    print(f"🧠 Enriqueciendo {num_tweets} tweets...")
+    sentimientos_nuevos = generar_sentimientos(tweets_nuevos, cache)
+    if cache is not None:
+        stats = cache.stats()
+        print(f"   Caché: {stats['hits']} aciertos, {stats['misses']} fallos ({stats['hit_rate']:.1%})")
+    
+    if sketches is not None:
+        sketches.update_many(tweets_nuevos, sentimientos_nuevos, usuarios_nuevos)
+    
     # Combinar con dataset existente
     dataset_combinado = {
         "tweets": dataset_existente["tweets"] + tweets_nuevos,
@@ -575,12 +610,23 @@ def generar_dataset(num_tweets: int = 5000) -> Dict[str, Any]:
     return dataset_combinado
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Generador de datos ficticios')
+    parser.add_argument('--sketches', default=None, help='Mantener sketches top-K/HyperLogLog en este JSON')
+    parser.add_argument('--db', default=None, help='Materializar también el dataset en esta base SQLite')
+    args = parser.parse_args()
+
     print("=" * 60)
     print("GENERADOR DE DATOS FICTICIOS - ANÁLISIS REDES SOCIALES")
     print("VERSIÓN EXPANDIDA - 50,000 TWEETS")
     print("=" * 60)
     
-    dataset = generar_dataset(50000)
+    os.makedirs(os.path.dirname(CACHE_PATH), exist_ok=True)
+    sketches = StreamSketches() if args.sketches else None
+    with EnrichmentCache(CACHE_PATH, ENRIQUECEDOR_VERSION) as cache:
+        dataset = generar_dataset(50000, cache, sketches)
+    if sketches is not None:
+        sketches = actualizar_fichero_sketches(args.sketches, sketches, dataset)
+        print(f"📈 Sketches actualizados: {sketches.tweets} tweets -> {args.sketches}")
     
     # Guardar dataset
     output_path = "public/data/dataset.json"
@@ -590,6 +636,15 @@ if __name__ == "__main__":
         json.dump(dataset, f, ensure_ascii=False, indent=4)
     
     print(f"✅ Dataset guardado exitosamente!")
+    # El cliente se actualiza desde los snapshots: registrar la nueva versión
+    from dataset_snapshots import SnapshotStore, snapshot_dir_for
+    entrada = SnapshotStore(snapshot_dir_for(output_path)).commit(dataset, "Datos ficticios generados")
+    if entrada is not None:
+        print(f"🗂️ Snapshot: versión {entrada['version']} ({entrada['kind']}, {entrada['bytes'] / 1024:.1f} KB)")
+    if args.db:
+        from dataset_db import materialize
+        with materialize(dataset, args.db) as db:
+            print(f"🗄️ Base SQLite {args.db}: {db.counts()}")
     print(f"\n📊 Estadísticas finales:")
     print(f"   - Tweets totales: {len(dataset['tweets'])}")
     print(f"   - Usuarios totales: {len(dataset['users'])}")
@@ -0,0 +1,284 @@
+"""
+Generador de datasets con estructura de red social realista (ley de potencias)
+
+A diferencia de generar_dataset, que elige autores uniformemente y menciona
+usuarios inexistentes, este modo produce:
+
+- Un grafo de seguidores por enlace preferencial (Barabási–Albert) en tiempo
+  lineal O(n·m), usando la lista de destinos repetidos por grado.
+- Actividad de autores con cola pesada (Pareto, ponderada por seguidores).
+- Cascadas de retweets que se propagan por los seguidores del autor, con
+  texto "RT @username: ..." que apunta a usuarios generados.
+- Menciones @username a cuentas que el autor sigue.
+
+Los nombres de usuario son ASCII y únicos para que los reconozcan las
+expresiones /^RT @(\\w+):/ y /@(\\w+)/ de buildNetworkFromDataset.
+
+Uso:
+    python scripts/generate_social_graph.py --users 100000 --tweets 1000000 --output public/data/dataset_grafo.json
+
+Por defecto escribe public/data/dataset_grafo.json para no pisar el dataset
+principal; para usarlo en el dashboard basta con indicar --output public/data/dataset.json.
+"""
+
+import argparse
+import bisect
+import itertools
+import json
+import random
+import re
+import time
+import unicodedata
+from collections import deque
+from datetime import datetime, timedelta
+from typing import Dict, Any, List, Optional, Tuple
+
+from enrichment_cache import EnrichmentCache
+from generate_mock_data import (
+    ENRIQUECEDOR_VERSION, generar_usuario, generar_tweet, generar_tweet_text,
+    generar_nombre_usuario, generar_sentimientos
+)
+from stream_sketches import StreamSketches, actualizar_fichero_sketches
+
+
+def _handle_ascii(base: str, sufijo: int) -> str:
+    """Username de Twitter válido (ASCII, <= 15 caracteres) y único gracias al sufijo."""
+    plano = unicodedata.normalize('NFKD', base).encode('ascii', 'ignore').decode('ascii')
+    plano = ''.join(c for c in plano if c.isalnum() or c == '_') or 'user'
+    sufijo_txt = str(sufijo)
+    return plano[:15 - len(sufijo_txt)] + sufijo_txt
+
+
+def generar_grafo_seguidores(num_users: int, m: int = 3) -> List[List[int]]:
+    """
+    Grafo dirigido de seguidores por enlace preferencial (Barabási–Albert).
+
+    Cada usuario nuevo sigue a m usuarios existentes elegidos con probabilidad
+    proporcional a su grado. La lista `destinos` contiene cada nodo tantas veces
+    como extremos de arista tiene, de modo que muestrear uniformemente en ella
+    equivale a muestrear por grado en O(1).
+
+    Returns:
+        followers[u] = lista de usuarios que siguen a u
+    """
+    followers: List[List[int]] = [[] for _ in range(num_users)]
+    semilla = min(num_users, m + 1)
+    destinos: List[int] = []
+
+    # Núcleo inicial completamente conectado
+    for u in range(semilla):
+        for v in range(semilla):
+            if u != v:
+                followers[v].append(u)
+                destinos.append(v)
+
+    for nuevo in range(semilla, num_users):
+        elegidos = set()
+        while len(elegidos) < m:
+            elegidos.add(random.choice(destinos))
+        for objetivo in elegidos:
+            followers[objetivo].append(nuevo)
+            destinos.append(objetivo)
+            destinos.append(nuevo)
+
+    return followers
+
+
+def _texto_original(handles_seguidos: List[str], prob_mencion: float) -> str:
+    """Texto de un tweet original (sin plantillas RT) con mención opcional a un usuario real."""
+    texto = generar_tweet_text()
+    while texto.startswith('RT @'):
+        texto = generar_tweet_text()
+    if handles_seguidos and random.random() < prob_mencion:
+        mencion = f" @{random.choice(handles_seguidos)}"
+        texto = texto[:280 - len(mencion)] + mencion
+    return texto
+
+
+def _texto_retweet(username: str, texto: str) -> str:
+    """
+    Formato de retweet de la API: truncado a 140 caracteres con elipsis.
+
+    Se recorta el cuerpo, nunca el @username del prefijo, y si el corte cae
+    dentro de una mención se descarta entera para no dejar handles inexistentes.
+    """
+    prefijo = f"RT @{username}: "
+    if len(prefijo) + len(texto) <= 140:
+        return prefijo + texto
+    cuerpo = texto[:139 - len(prefijo)]
+    mencion = re.search(r'@\w*$', cuerpo)
+    if mencion and re.match(r'\w', texto[len(cuerpo)]):
+        cuerpo = cuerpo[:mencion.start()].rstrip()
+    return prefijo + cuerpo + '…'
+
+
+def generar_dataset_grafo(num_users: int = 10000, num_tweets: int = 100000, m: int = 3,
+                          alpha_actividad: float = 1.2, alpha_cascada: float = 1.5,
+                          prob_mencion: float = 0.3, tasa_retweet: float = 0.05,
+                          cache: Optional[EnrichmentCache] = None,
+                          sketches: Optional[StreamSketches] = None) -> Dict[str, Any]:
+    """
+    Genera un dataset completo con grafo de seguidores, cascadas y menciones.
+
+    Args:
+        num_users: Número de usuarios (nodos)
+        num_tweets: Número total de tweets (originales + retweets)
+        m: Cuentas que sigue cada usuario nuevo en el modelo BA
+        alpha_actividad: Exponente Pareto de la actividad de autores
+        alpha_cascada: Exponente Pareto del tamaño de cascada
+        prob_mencion: Probabilidad de que un tweet original mencione a alguien que sigue
+        tasa_retweet: Fracción de los seguidores de cada nodo que retuitea en la cascada
+        cache: Caché de enriquecimiento opcional
+        sketches: Sketches top-K/HyperLogLog opcionales
+
+    Returns:
+        Dataset en el formato de generar_dataset
+    """
+    print(f"👥 Generando {num_users} usuarios y grafo de seguidores (m={m})...")
+    followers = generar_grafo_seguidores(num_users, m)
+    following: List[List[int]] = [[] for _ in range(num_users)]
+    for u, seguidores in enumerate(followers):
+        for f in seguidores:
+            following[f].append(u)
+
+    user_ids = [f"3{i:017d}" for i in range(num_users)]
+    usernames = [_handle_ascii(generar_nombre_usuario(), i) for i in range(num_users)]
+    usuarios: Dict[str, Dict[str, Any]] = {}
+    for i, user_id in enumerate(user_ids):
+        usuario = generar_usuario(user_id)
+        usuario["username"] = usernames[i]
+        usuario["public_metrics"]["followers_count"] = len(followers[i])
+        usuario["public_metrics"]["following_count"] = len(following[i])
+        usuarios[user_id] = usuario
+
+    # Actividad con cola pesada, amplificada por la audiencia
+    pesos = [random.paretovariate(alpha_actividad) * (1 + len(followers[i])) ** 0.5 for i in range(num_users)]
+    acumulados = list(itertools.accumulate(pesos))
+    total_peso = acumulados[-1]
+
+    print(f"📝 Generando {num_tweets} tweets con cascadas de retweets...")
+    base_time = datetime.now()
+    tweets: List[Dict[str, Any]] = []
+    contador_id = itertools.count()
+    cascadas = 0
+
+    while len(tweets) < num_tweets:
+        autor = bisect.bisect_right(acumulados, random.random() * total_peso)
+        autor = min(autor, num_users - 1)
+        tweet_id = f"19{next(contador_id):017d}"
+        original = generar_tweet(tweet_id, user_ids[autor], base_time)
+        original["text"] = _texto_original([usernames[v] for v in following[autor][:50]], prob_mencion)
+        tweets.append(original)
+
+        # Cascada: BFS por los seguidores, acotada por un tamaño Pareto
+        restantes = min(num_tweets - len(tweets), int(random.paretovariate(alpha_cascada)) - 1)
+        retweets: List[Tuple[int, datetime]] = []
+        hora_original = datetime.strptime(original["created_at"], "%Y-%m-%dT%H:%M:%S.000Z")
+        visitados = {autor}
+        frontera = deque([(autor, hora_original)])
+        while frontera and restantes > 0:
+            nodo, hora = frontera.popleft()
+            candidatos = followers[nodo]
+            k = min(restantes, len(candidatos), max(1, round(len(candidatos) * tasa_retweet)))
+            for seguidor in random.sample(candidatos, k):
+                if seguidor in visitados:
+                    continue
+                visitados.add(seguidor)
+                # Sin fechas futuras: las cascadas que llegarían después de base_time se quedan en base_time
+                hora_rt = min(hora + timedelta(seconds=random.expovariate(1 / 1800)), base_time)
+                retweets.append((seguidor, hora_rt))
+                frontera.append((seguidor, hora_rt))
+                restantes -= 1
+
+        original["public_metrics"]["retweet_count"] = len(retweets)
+        if retweets:
+            cascadas += 1
+        texto_rt = _texto_retweet(usernames[autor], original["text"])
+        for seguidor, hora_rt in retweets:
+            rt_id = f"19{next(contador_id):017d}"
+            tweets.append({
+                "id": rt_id,
+                "text": texto_rt,
+                "author_id": user_ids[seguidor],
+                "created_at": hora_rt.strftime("%Y-%m-%dT%H:%M:%S.000Z"),
+                "lang": "es",
+                "possibly_sensitive": original["possibly_sensitive"],
+                "edit_history_tweet_ids": [rt_id],
+                "public_metrics": {
+                    "retweet_count": len(retweets),
+                    "reply_count": 0,
+                    "like_count": 0,
+                    "quote_count": 0,
+                    "bookmark_count": 0,
+                    "impression_count": 0
+                }
+            })
+
+    print(f"   Cascadas con retweets: {cascadas}")
+    print(f"🧠 Enriqueciendo {len(tweets)} tweets...")
+    sentimientos = generar_sentimientos(tweets, cache)
+    if sketches is not None:
+        sketches.update_many(tweets, sentimientos, usuarios)
+
+    return {
+        "tweets": tweets,
+        "users": usuarios,
+        "places": {},
+        "sentimiento": sentimientos
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """Función principal para generar un dataset con estructura de grafo."""
+    parser = argparse.ArgumentParser(description='Dataset sintético con grafo social de ley de potencias')
+    parser.add_argument('--users', type=int, default=10000)
+    parser.add_argument('--tweets', type=int, default=100000)
+    parser.add_argument('--m', type=int, default=3, help='Enlaces por usuario nuevo (modelo BA)')
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--cache', default=None, help='Ruta de la caché SQLite de enriquecimiento')
+    parser.add_argument('--sketches', default=None, help='Guardar sketches top-K/HyperLogLog en este JSON')
+    parser.add_argument('--db', default=None, help='Materializar también el dataset en esta base SQLite')
+    parser.add_argument('--output', default='public/data/dataset_grafo.json')
+    args = parser.parse_args(argv)
+    if args.users < 1 or args.tweets < 1 or args.m < 1:
+        parser.error('--users, --tweets y --m deben ser al menos 1')
+
+    if args.seed is not None:
+        random.seed(args.seed)
+
+    print("=" * 60)
+    print("GENERADOR DE GRAFO SOCIAL - LEY DE POTENCIAS")
+    print("=" * 60)
+
+    inicio = time.perf_counter()
+    cache = EnrichmentCache(args.cache, ENRIQUECEDOR_VERSION) if args.cache else None
+    sketches = StreamSketches() if args.sketches else None
+    try:
+        dataset = generar_dataset_grafo(args.users, args.tweets, args.m, cache=cache, sketches=sketches)
+    finally:
+        if cache is not None:
+            cache.close()
+    if sketches is not None:
+        actualizar_fichero_sketches(args.sketches, sketches, dataset)
+        print(f"📈 Sketches guardados en {args.sketches}")
+
+    grados = sorted((u["public_metrics"]["followers_count"] for u in dataset["users"].values()), reverse=True)
+    retweets = sum(1 for t in dataset["tweets"] if t["text"].startswith("RT @"))
+    print(f"\n📊 Estadísticas:")
+    print(f"   - Usuarios: {len(dataset['users'])}")
+    print(f"   - Tweets: {len(dataset['tweets'])} ({retweets} retweets)")
+    print(f"   - Seguidores máx/mediana: {grados[0]} / {grados[len(grados) // 2]}")
+    print(f"   - Tiempo: {time.perf_counter() - inicio:.1f}s")
+
+    print(f"\n💾 Guardando dataset en {args.output}...")
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(dataset, f, ensure_ascii=False, indent=4)
+    print("✅ Dataset guardado exitosamente!")
+    if args.db:
+        from dataset_db import materialize
+        with materialize(dataset, args.db) as db:
+            print(f"🗄️ Base SQLite {args.db}: {db.counts()}")
+
+
+if __name__ == '__main__':
+    main()
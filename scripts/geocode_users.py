@@ -0,0 +1,441 @@
+"""
+Geocodificación local de user.location con un gazetteer colombiano
+
+La API solo devuelve `location` como texto libre ("Medellín, Antioquia",
+"BOGOTA D.C.", "Barranquilla 🌴", "Cali - Valle"), y generar_usuario deja sin
+coordenadas al 30 % de los usuarios. Este módulo asigna user.geo a partir de
+ese texto sin servicios externos:
+
+1. Normalización: minúsculas, sin tildes ni signos ("Bogotá D.C." -> "bogota d c").
+2. Búsqueda exacta por hash del texto completo en el índice de nombres y alias.
+3. Trie de tokens: coincidencia más larga en cualquier posición
+   ("vivo en santa marta" -> "santa marta"), resolviendo homónimos con el
+   departamento mencionado ("Rionegro, Santander").
+4. Búsqueda difusa (distancia de edición 1-2, índice de borrados tipo SymSpell)
+   para errores de tipeo ("Medelin", "Barranqilla").
+
+El gazetteer (gazetteer_colombia.csv) incluye los 32 departamentos y ~480
+municipios con población aproximada (en miles) para desempatar homónimos.
+Los resultados se cachean por texto con un LRU, y el relleno por lotes
+geocodifica cada texto distinto una sola vez.
+
+Uso:
+    python scripts/geocode_users.py fill public/data/dataset.json
+    python scripts/geocode_users.py lookup "Medelin, Antioquia" "Cali - Valle"
+    python scripts/geocode_users.py bench --users 1000000
+"""
+
+import argparse
+import functools
+import hashlib
+import json
+import math
+import os
+import random
+import re
+import time
+import unicodedata
+from collections import Counter, defaultdict
+from typing import Dict, Any, List, Optional, Set, Tuple
+
+GAZETTEER_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'gazetteer_colombia.csv')
+
+# Radio de dispersión alrededor del punto del gazetteer, para no apilar usuarios en un píxel
+RADIO_DISPERSION_KM = {'capital': 8.0, 'municipio': 4.0, 'departamento': 40.0}
+
+# Tokens que no aportan a la búsqueda difusa
+PALABRAS_VACIAS = {
+    'colombia', 'co', 'col', 'de', 'del', 'la', 'el', 'los', 'las', 'y', 'en', 'ciudad', 'city',
+    'dc', 'd', 'c', 'republica', 'desde', 'vivo', 'aqui', 'sur', 'norte', 'oriente', 'occidente',
+}
+
+# Si aparecen sin "colombia", el texto no se geocodifica (homónimos como Madrid o Florida)
+PAISES_EXTRANJEROS = {
+    'venezuela', 'ecuador', 'peru', 'mexico', 'argentina', 'chile', 'espana', 'spain', 'usa', 'eeuu',
+    'panama', 'brasil', 'brazil', 'canada', 'italia', 'italy', 'francia', 'france', 'alemania',
+    'germany', 'uk', 'london', 'londres', 'miami', 'nyc', 'caracas', 'quito', 'lima', 'uruguay',
+    'paraguay', 'bolivia', 'estados unidos', 'united states', 'reino unido', 'new york', 'nueva york',
+    'costa rica',
+}
+
+_NO_ALFANUMERICO = re.compile(r'[^a-z0-9]+')
+_SEPARADORES = re.compile(r'[,;/|()\[\]·•\-–—]+')
+_REPETIDAS = re.compile(r'(.)\1{2,}')  # "pereiraaa" -> "pereira"
+_FIN = ''  # Clave de fin de nombre en el trie (ningún token es vacío)
+
+
+def normalizar(texto: str) -> str:
+    """Minúsculas sin tildes y solo con [a-z0-9] separados por un espacio."""
+    plano = unicodedata.normalize('NFKD', texto)
+    plano = ''.join(c for c in plano if not unicodedata.combining(c)).lower()
+    return ' '.join(_NO_ALFANUMERICO.sub(' ', plano).split())
+
+
+def distancia_edicion(a: str, b: str, maximo: int) -> int:
+    """Distancia Damerau-Levenshtein restringida (OSA), cortando en maximo + 1."""
+    if abs(len(a) - len(b)) > maximo:
+        return maximo + 1
+    anterior2: List[int] = []
+    anterior = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        actual = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            costo = 0 if a[i - 1] == b[j - 1] else 1
+            actual[j] = min(anterior[j] + 1, actual[j - 1] + 1, anterior[j - 1] + costo)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                actual[j] = min(actual[j], anterior2[j - 2] + 1)
+        if min(actual) > maximo:
+            return maximo + 1
+        anterior2, anterior = anterior, actual
+    return anterior[-1]
+
+
+def _borrados(clave: str) -> Set[str]:
+    """La clave y todas sus variantes con un carácter borrado."""
+    return {clave} | {clave[:i] + clave[i + 1:] for i in range(len(clave))}
+
+
+def cargar_gazetteer(path: str = GAZETTEER_PATH) -> List[Dict[str, Any]]:
+    """Lee el CSV del gazetteer: nombre, departamento, tipo, lat, lon, poblacion, alias ('|')."""
+    import csv
+    lugares = []
+    with open(path, 'r', encoding='utf-8', newline='') as f:
+        for fila in csv.DictReader(f):
+            lugares.append({
+                'nombre': fila['nombre'],
+                'departamento': fila['departamento'],
+                'tipo': fila['tipo'],
+                'lat': float(fila['lat']),
+                'lon': float(fila['lon']),
+                'poblacion': int(fila['poblacion']),
+                'alias': [a for a in fila['alias'].split('|') if a],
+            })
+    return lugares
+
+
+class Geocodificador:
+    """
+    Resuelve textos de ubicación a un lugar del gazetteer.
+
+    `geocodificar(texto)` devuelve una copia del lugar con la clave `metodo`
+    ('exacto', 'trie' o 'difuso') o None, y está cacheada con un LRU.
+    """
+
+    def __init__(self, lugares: Optional[List[Dict[str, Any]]] = None, cache_size: int = 100_000):
+        self.lugares = lugares if lugares is not None else cargar_gazetteer()
+        self._indice: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+        self._trie: Dict[str, Any] = {}
+        self._borrados: Dict[str, Set[str]] = defaultdict(set)
+
+        for lugar in self.lugares:
+            claves = {normalizar(lugar['nombre'])} | {normalizar(a) for a in lugar['alias']}
+            if lugar['tipo'] != 'departamento':
+                # "Rionegro Antioquia", "Cali Valle del Cauca"
+                claves.add(normalizar(f"{lugar['nombre']} {lugar['departamento']}"))
+            for clave in claves:
+                self._indice[clave].append(lugar)
+                nodo = self._trie
+                for token in clave.split():
+                    nodo = nodo.setdefault(token, {})
+                nodo.setdefault(_FIN, []).append(lugar)
+                if len(clave) >= 5:
+                    for variante in _borrados(clave):
+                        self._borrados[variante].add(clave)
+
+        self.geocodificar = functools.lru_cache(maxsize=cache_size)(self._geocodificar)
+
+    def _geocodificar(self, texto: str) -> Optional[Dict[str, Any]]:
+        normalizado = normalizar(texto)
+        if not normalizado:
+            return None
+        relleno = f" {normalizado} "
+        if 'colombia' not in normalizado.split() and any(f" {p} " in relleno for p in PAISES_EXTRANJEROS):
+            return None
+
+        lugares = self._indice.get(normalizado)
+        if lugares:
+            return self._con_metodo(self._resolver([lugares]), 'exacto')
+
+        tokens = normalizado.split()
+        coincidencias = self._coincidencias(tokens)
+        lugar = self._resolver([ls for _, _, ls in coincidencias])
+        if lugar is not None and lugar['tipo'] != 'departamento':
+            return self._con_metodo(lugar, 'trie')
+
+        # Sin municipio exacto: buscar uno con errores de tipeo fuera de lo ya reconocido
+        cubiertos = {i for inicio, fin, _ in coincidencias for i in range(inicio, fin)}
+        segmentos = [normalizar(s).split() for s in _SEPARADORES.split(texto)]
+        difuso = self._difuso(segmentos, tokens, cubiertos)
+        if difuso is not None:
+            candidato = self._resolver([difuso] + [ls for _, _, ls in coincidencias])
+            if candidato is not None and candidato['tipo'] != 'departamento':
+                return self._con_metodo(candidato, 'difuso')
+        return self._con_metodo(lugar, 'trie')
+
+    @staticmethod
+    def _con_metodo(lugar: Optional[Dict[str, Any]], metodo: str) -> Optional[Dict[str, Any]]:
+        if lugar is None:
+            return None
+        resultado = {k: v for k, v in lugar.items() if k != 'alias'}
+        resultado['metodo'] = metodo
+        return resultado
+
+    def _coincidencias(self, tokens: List[str]) -> List[Tuple[int, int, List[Dict[str, Any]]]]:
+        """Coincidencias más largas y sin solapamiento del trie: [(inicio, fin, lugares)]."""
+        resultado = []
+        i = 0
+        while i < len(tokens):
+            nodo = self._trie
+            mejor = None
+            j = i
+            while j < len(tokens) and tokens[j] in nodo:
+                nodo = nodo[tokens[j]]
+                j += 1
+                if _FIN in nodo:
+                    mejor = (j, nodo[_FIN])
+            if mejor is not None:
+                resultado.append((i, mejor[0], mejor[1]))
+                i = mejor[0]
+            else:
+                i += 1
+        return resultado
+
+    def _difuso(self, segmentos: List[List[str]], tokens: List[str],
+                cubiertos: Set[int]) -> Optional[List[Dict[str, Any]]]:
+        """Mejor nombre a distancia 1 (2 si tiene 9+ letras) de algún n-grama de 1 a 3 tokens."""
+        # Posición global de cada token de cada segmento para excluir los ya reconocidos
+        posiciones = []
+        cursor = 0
+        for segmento in segmentos:
+            posiciones.append(list(range(cursor, cursor + len(segmento))))
+            cursor += len(segmento)
+        if cursor != len(tokens):
+            posiciones = [list(range(len(tokens)))]
+            segmentos = [tokens]
+
+        mejor: Optional[Tuple[int, int, str]] = None
+        for segmento, pos in zip(segmentos, posiciones):
+            for n in (3, 2, 1):
+                for i in range(len(segmento) - n + 1):
+                    span = segmento[i:i + n]
+                    if span[0] in PALABRAS_VACIAS or span[-1] in PALABRAS_VACIAS:
+                        continue
+                    if any(p in cubiertos for p in pos[i:i + n]):
+                        continue
+                    consulta = _REPETIDAS.sub(r'\1', ' '.join(span))
+                    if len(consulta) < 5:
+                        continue
+                    maximo = 2 if len(consulta) >= 9 else 1
+                    candidatas = set()
+                    for variante in _borrados(consulta):
+                        candidatas |= self._borrados.get(variante, set())
+                    for clave in candidatas:
+                        d = distancia_edicion(consulta, clave, maximo)
+                        if d > maximo:
+                            continue
+                        poblacion = max(l['poblacion'] for l in self._indice[clave])
+                        if mejor is None or (d, -poblacion) < (mejor[0], -mejor[1]):
+                            mejor = (d, poblacion, clave)
+        return self._indice[mejor[2]] if mejor is not None else None
+
+    @staticmethod
+    def _resolver(grupos: List[List[Dict[str, Any]]]) -> Optional[Dict[str, Any]]:
+        """
+        Elige un lugar entre las coincidencias, en orden de aparición.
+
+        Un municipio gana a un departamento; entre homónimos se prefiere el del
+        departamento mencionado y, si no, el más poblado. Un nombre que es a la
+        vez departamento y municipio ("Caldas", "Sucre", "Bolívar") se toma como
+        departamento salvo que otro token lo sitúe o que sea su capital ("Arauca").
+        """
+        departamentos = [[l for l in ls if l['tipo'] == 'departamento'] for ls in grupos]
+        for i, lugares in enumerate(grupos):
+            municipios = [l for l in lugares if l['tipo'] != 'departamento']
+            if not municipios:
+                continue
+            contexto = {l['departamento'] for j, ds in enumerate(departamentos) if j != i for l in ds}
+            en_contexto = [l for l in municipios if l['departamento'] in contexto]
+            if en_contexto:
+                return max(en_contexto, key=lambda l: l['poblacion'])
+            if departamentos[i]:
+                nombre = departamentos[i][0]['nombre']
+                capitales = [l for l in municipios if l['tipo'] == 'capital' and l['departamento'] == nombre]
+                if capitales:
+                    return capitales[0]
+                continue
+            return max(municipios, key=lambda l: l['poblacion'])
+        for ds in departamentos:
+            if ds:
+                return ds[0]
+        return None
+
+    def cache_info(self):
+        return self.geocodificar.cache_info()
+
+
+def coordenadas_dispersas(lugar: Dict[str, Any], user_id: str, seed: int = 42) -> Dict[str, float]:
+    """
+    Punto uniforme en un disco alrededor del lugar, determinista por usuario.
+
+    Así los usuarios de una misma ciudad no caen en un único punto del mapa y
+    volver a ejecutar el relleno produce las mismas coordenadas.
+    """
+    digest = hashlib.blake2b(f"{seed}:{user_id}".encode('utf-8'), digest_size=8).digest()
+    angulo = 2 * math.pi * int.from_bytes(digest[:4], 'big') / 2 ** 32
+    radio_km = RADIO_DISPERSION_KM.get(lugar['tipo'], 4.0) * math.sqrt(int.from_bytes(digest[4:], 'big') / 2 ** 32)
+    lat = lugar['lat'] + radio_km / 111.32 * math.sin(angulo)
+    lon = lugar['lon'] + radio_km / (111.32 * math.cos(math.radians(lugar['lat']))) * math.cos(angulo)
+    return {"x": round(lon, 6), "y": round(lat, 6)}
+
+
+def geocodificar_usuarios(users: Dict[str, Dict[str, Any]], geocodificador: Optional[Geocodificador] = None,
+                          sobrescribir: bool = False, seed: int = 42) -> Dict[str, Any]:
+    """
+    Rellena user.geo en una pasada para los usuarios con location y sin geo.
+
+    Los textos se agrupan antes de geocodificar, de modo que cada texto
+    distinto se resuelve una sola vez aunque lo compartan millones de usuarios.
+
+    Args:
+        users: Diccionario de usuarios del dataset (se modifica en el lugar)
+        geocodificador: Instancia a reutilizar (conserva su caché LRU entre lotes)
+        sobrescribir: Recalcular también los usuarios que ya tienen geo
+        seed: Semilla de la dispersión alrededor de cada lugar
+
+    Returns:
+        Estadísticas del relleno
+    """
+    geocodificador = geocodificador or Geocodificador()
+    pendientes = [(uid, u) for uid, u in users.items()
+                  if u.get('location') and (sobrescribir or not u.get('geo'))]
+    textos = Counter(u['location'] for _, u in pendientes)
+    resultados = {texto: geocodificador.geocodificar(texto) for texto in textos}
+
+    metodos: Counter = Counter()
+    precision: Counter = Counter()
+    for uid, usuario in pendientes:
+        lugar = resultados[usuario['location']]
+        if lugar is None:
+            metodos['sin_resultado'] += 1
+            continue
+        usuario['geo'] = coordenadas_dispersas(lugar, uid, seed)
+        metodos[lugar['metodo']] += 1
+        precision[lugar['tipo']] += 1
+
+    return {
+        'usuarios': len(users),
+        'pendientes': len(pendientes),
+        'geocodificados': len(pendientes) - metodos['sin_resultado'],
+        'textos_distintos': len(textos),
+        'metodos': dict(metodos),
+        'precision': dict(precision),
+        'con_geo': sum(1 for u in users.values() if u.get('geo')),
+    }
+
+
+def _variante_ruidosa(lugar: Dict[str, Any], rng: random.Random) -> str:
+    """Texto de ubicación como lo escriben los usuarios (mayúsculas, sin tildes, typos, departamento)."""
+    texto = rng.choice([lugar['nombre']] + lugar['alias']) if lugar['alias'] and rng.random() < 0.2 else lugar['nombre']
+    r = rng.random()
+    if r < 0.25:
+        texto = f"{texto}, {lugar['departamento']}"
+    elif r < 0.35:
+        texto = f"{texto} - Colombia"
+    elif r < 0.45:
+        texto = texto.upper()
+    elif r < 0.55:
+        texto = normalizar(texto)
+    elif r < 0.65 and len(texto) > 6:
+        i = rng.randrange(1, len(texto) - 1)
+        texto = texto[:i] + texto[i + 1:]
+    elif r < 0.70:
+        texto = f"{texto} 🇨🇴"
+    return texto
+
+
+def benchmark(num_users: int = 1_000_000, seed: int = 42) -> None:
+    """Rellena geo de usuarios sintéticos con ubicaciones ruidosas y mide el rendimiento."""
+    rng = random.Random(seed)
+    geocodificador = Geocodificador()
+    municipios = [l for l in geocodificador.lugares if l['tipo'] != 'departamento']
+    pesos = [l['poblacion'] for l in municipios]
+
+    print(f"Generando {num_users} usuarios con ubicaciones ruidosas...")
+    textos_base = [_variante_ruidosa(l, rng) for l in rng.choices(municipios, weights=pesos, k=20_000)]
+    textos_base += ['Colombia', 'En algún lugar', 'Madrid, España', 'Tierra 🌍', 'Caracas, Venezuela']
+    users = {str(i): {'id': str(i), 'location': rng.choice(textos_base)} for i in range(num_users)}
+
+    inicio = time.perf_counter()
+    stats = geocodificar_usuarios(users, geocodificador)
+    elapsed = time.perf_counter() - inicio
+    print(f"  {stats['geocodificados']}/{stats['pendientes']} geocodificados en {elapsed:.2f}s "
+          f"({stats['pendientes'] / elapsed:,.0f} usuarios/s, {stats['textos_distintos']} textos distintos)")
+    print(f"  Métodos: {stats['metodos']}")
+
+    # Segundo lote con los mismos textos: todo sale de la caché LRU
+    inicio = time.perf_counter()
+    for texto in textos_base:
+        geocodificador.geocodificar(texto)
+    print(f"  Relectura de {len(textos_base)} textos desde la caché: {(time.perf_counter() - inicio) * 1000:.1f} ms")
+    print(f"  {geocodificador.cache_info()}")
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """Función principal: relleno de geo, consultas sueltas y benchmark."""
+    parser = argparse.ArgumentParser(description='Geocodificación local de user.location')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    p_fill = sub.add_parser('fill', help='Rellenar user.geo en el dataset')
+    p_fill.add_argument('dataset')
+    p_fill.add_argument('--output', default=None, help='Por defecto sobrescribe el dataset')
+    p_fill.add_argument('--overwrite', action='store_true', help='Recalcular también usuarios con geo')
+    p_fill.add_argument('--seed', type=int, default=42)
+
+    p_lookup = sub.add_parser('lookup', help='Geocodificar textos sueltos')
+    p_lookup.add_argument('texts', nargs='+')
+
+    p_bench = sub.add_parser('bench', help='Benchmark con usuarios sintéticos')
+    p_bench.add_argument('--users', type=int, default=1_000_000)
+
+    args = parser.parse_args(argv)
+
+    if args.command == 'lookup':
+        geocodificador = Geocodificador()
+        for texto in args.texts:
+            lugar = geocodificador.geocodificar(texto)
+            if lugar is None:
+                print(f"  {texto!r}: sin resultado")
+            else:
+                print(f"  {texto!r}: {lugar['nombre']}, {lugar['departamento']} "
+                      f"({lugar['tipo']}, {lugar['metodo']}) {lugar['lat']:.4f}, {lugar['lon']:.4f}")
+    elif args.command == 'bench':
+        benchmark(args.users)
+    else:
+        output = args.output or args.dataset
+        with open(args.dataset, 'r', encoding='utf-8') as f:
+            dataset = json.load(f)
+
+        from dataset_snapshots import SnapshotStore, snapshot_dir_for
+        store = SnapshotStore(snapshot_dir_for(output)) if output == args.dataset else None
+        if store is not None:
+            store.commit(dataset, "Antes de geocodificar usuarios")
+
+        stats = geocodificar_usuarios(dataset.get('users', {}), sobrescribir=args.overwrite, seed=args.seed)
+        print(f"✓ {stats['geocodificados']}/{stats['pendientes']} usuarios geocodificados "
+              f"({stats['textos_distintos']} textos distintos)")
+        print(f"  Métodos: {stats['metodos']}")
+        print(f"  Precisión: {stats['precision']}")
+        print(f"  Usuarios con geo: {stats['con_geo']}/{stats['usuarios']}")
+
+        with open(output, 'w', encoding='utf-8') as f:
+            json.dump(dataset, f, ensure_ascii=False, indent=2)
+        if store is not None:
+            store.commit(dataset, "Usuarios geocodificados desde location")
+
+        # El índice espacial depende de user.geo
+        from spatial_index import build_for_dataset
+        print(f"✓ Índice espacial: {build_for_dataset(dataset, output)}")
+
+
+if __name__ == '__main__':
+    main()
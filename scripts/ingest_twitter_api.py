@@ -0,0 +1,551 @@
+"""
+Cliente asíncrono de ingesta para la API v2 de Twitter/X
+
+Descarga tweets de /2/tweets/search/recent con paginación (next_token),
+varias consultas en paralelo bajo un token bucket, pool de conexiones HTTP/1.1
+keep-alive y reintentos con backoff exponencial. Los registros se escriben con el
+mismo formato que produce generar_dataset (tweets, users, places, sentimiento).
+
+Uso:
+    # Contra la API real (requiere TWITTER_BEARER_TOKEN)
+    python scripts/ingest_twitter_api.py --query "Petro lang:es" --max-pages 10
+
+    # Contra el servidor simulado local (sin red)
+    python scripts/ingest_twitter_api.py --mock --query "elecciones" --query "Uribe"
+"""
+
+import argparse
+import asyncio
+import gzip
+import json
+import os
+import random
+import ssl
+import time
+from typing import Dict, Any, List, Optional, Tuple, AsyncIterator
+from urllib.parse import urlencode, urlsplit
+
+from enrichment_cache import EnrichmentCache
+from generate_mock_data import ENRIQUECEDOR_VERSION, generar_sentimientos
+from stream_sketches import StreamSketches, actualizar_fichero_sketches
+
+DEFAULT_BASE_URL = 'https://api.twitter.com'
+SEARCH_PATH = '/2/tweets/search/recent'
+
+# Campos solicitados a la API para reproducir el formato del dataset
+TWEET_FIELDS = 'author_id,created_at,edit_history_tweet_ids,lang,possibly_sensitive,public_metrics'
+USER_FIELDS = 'created_at,location,public_metrics,verified'
+
+# Claves que se conservan de cada tweet (las mismas que genera generar_tweet)
+TWEET_KEYS = ('id', 'text', 'author_id', 'created_at', 'lang', 'possibly_sensitive',
+              'edit_history_tweet_ids', 'public_metrics')
+
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+
+class IngestError(Exception):
+    """Error no recuperable durante la ingesta (status no reintentable o reintentos agotados)."""
+
+
+class TokenBucket:
+    """
+    Limitador token bucket compartido por todas las peticiones.
+
+    Args:
+        rate: Tokens repuestos por segundo
+        capacity: Tamaño máximo de ráfaga
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = asyncio.Lock()
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self) -> None:
+        """Espera hasta disponer de un token (y hasta que termine cualquier pausa del servidor)."""
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self._paused_until:
+                    await asyncio.sleep(self._paused_until - now)
+                    continue
+                self._refill(now)
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+    def pause_until(self, epoch_seconds: float) -> None:
+        """
+        Bloquea el bucket hasta un instante epoch (cabecera x-rate-limit-reset).
+
+        Se vacía el bucket para que, al reanudar, no se dispare una ráfaga completa.
+        """
+        delay = max(0.0, epoch_seconds - time.time())
+        self._paused_until = max(self._paused_until, time.monotonic() + delay)
+        self._tokens = 0.0
+
+
+class HttpResponse:
+    """Respuesta HTTP ya leída completamente."""
+
+    def __init__(self, status: int, headers: Dict[str, str], body: bytes):
+        self.status = status
+        self.headers = headers
+        self.body = body
+
+    def json(self) -> Any:
+        return json.loads(self.body.decode('utf-8'))
+
+
+class ConnectionPool:
+    """
+    Pool de conexiones keep-alive hacia un único host.
+
+    Las conexiones libres se reutilizan en orden LIFO; un semáforo limita el
+    número total de conexiones abiertas, lo que actúa también como backpressure
+    cuando todas están ocupadas.
+    """
+
+    def __init__(self, host: str, port: int, use_ssl: bool, max_connections: int = 10):
+        self.host = host
+        self.port = port
+        self._ssl = ssl.create_default_context() if use_ssl else None
+        self._idle: List[Tuple[asyncio.StreamReader, asyncio.StreamWriter]] = []
+        self._slots = asyncio.Semaphore(max_connections)
+        self.opened = 0
+
+    async def acquire(self) -> Tuple[asyncio.StreamReader, asyncio.StreamWriter]:
+        await self._slots.acquire()
+        while self._idle:
+            reader, writer = self._idle.pop()
+            if not writer.is_closing() and not reader.at_eof():
+                return reader, writer
+            writer.close()
+        try:
+            conn = await asyncio.open_connection(self.host, self.port, ssl=self._ssl)
+        except BaseException:
+            self._slots.release()
+            raise
+        self.opened += 1
+        return conn
+
+    def release(self, conn: Tuple[asyncio.StreamReader, asyncio.StreamWriter], reusable: bool) -> None:
+        if reusable:
+            self._idle.append(conn)
+        else:
+            conn[1].close()
+        self._slots.release()
+
+    async def close(self) -> None:
+        while self._idle:
+            _, writer = self._idle.pop()
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except OSError:
+                pass
+
+
+async def _read_response(reader: asyncio.StreamReader) -> HttpResponse:
+    """Lee una respuesta HTTP/1.1 (Content-Length o chunked, opcionalmente gzip)."""
+    status_line = await reader.readline()
+    if not status_line:
+        raise ConnectionResetError('Conexión cerrada por el servidor')
+    status = int(status_line.split()[1])
+
+    headers: Dict[str, str] = {}
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b'\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        headers[name.strip().lower()] = value.strip()
+
+    if headers.get('transfer-encoding', '').lower() == 'chunked':
+        chunks = []
+        while True:
+            size = int((await reader.readline()).split(b';')[0], 16)
+            if size == 0:
+                await reader.readline()
+                break
+            chunks.append(await reader.readexactly(size))
+            await reader.readexactly(2)
+        body = b''.join(chunks)
+    elif 'content-length' in headers:
+        body = await reader.readexactly(int(headers['content-length']))
+    else:
+        body = await reader.read()
+        headers['connection'] = 'close'
+
+    if headers.get('content-encoding') == 'gzip':
+        body = gzip.decompress(body)
+    return HttpResponse(status, headers, body)
+
+
+class HttpClient:
+    """
+    Cliente HTTP/1.1 mínimo sobre asyncio con pool de conexiones.
+
+    Args:
+        base_url: URL base (p.ej. https://api.twitter.com)
+        headers: Cabeceras enviadas en cada petición
+        max_connections: Conexiones simultáneas máximas
+    """
+
+    def __init__(self, base_url: str, headers: Optional[Dict[str, str]] = None, max_connections: int = 10):
+        url = urlsplit(base_url)
+        use_ssl = url.scheme == 'https'
+        self.host = url.hostname or 'localhost'
+        self.port = url.port or (443 if use_ssl else 80)
+        self.headers = headers or {}
+        self.pool = ConnectionPool(self.host, self.port, use_ssl, max_connections)
+
+    async def get(self, path: str, params: Optional[Dict[str, Any]] = None) -> HttpResponse:
+        target = f"{path}?{urlencode(params)}" if params else path
+        request_headers = {
+            'host': self.host if self.port in (80, 443) else f"{self.host}:{self.port}",
+            'accept': 'application/json',
+            'accept-encoding': 'gzip',
+            'connection': 'keep-alive',
+            **self.headers,
+        }
+        request = f"GET {target} HTTP/1.1\r\n"
+        request += ''.join(f"{k}: {v}\r\n" for k, v in request_headers.items())
+        request += '\r\n'
+
+        conn = await self.pool.acquire()
+        reusable = False
+        try:
+            reader, writer = conn
+            writer.write(request.encode('latin-1'))
+            await writer.drain()
+            response = await _read_response(reader)
+            reusable = response.headers.get('connection', '').lower() != 'close'
+            return response
+        finally:
+            self.pool.release(conn, reusable)
+
+    async def close(self) -> None:
+        await self.pool.close()
+
+
+class DatasetBuilder:
+    """
+    Acumula páginas de la API en el formato de generar_dataset.
+
+    Los tweets se deduplican por id y cada lote de tweets nuevos pasa por
+    generar_sentimientos (con caché opcional) para producir sus registros de "sentimiento".
+    Si se pasan sketches, se actualizan con cada tweet nuevo en la misma pasada.
+    """
+
+    def __init__(self, dataset_existente: Optional[Dict[str, Any]] = None,
+                 cache: Optional[EnrichmentCache] = None,
+                 sketches: Optional[StreamSketches] = None):
+        base = dataset_existente or {"tweets": [], "users": {}, "places": {}, "sentimiento": []}
+        self.tweets: List[Dict[str, Any]] = list(base.get("tweets", []))
+        self.users: Dict[str, Dict[str, Any]] = dict(base.get("users", {}))
+        self.places: Dict[str, Any] = dict(base.get("places", {}))
+        self.sentimiento: List[Dict[str, Any]] = list(base.get("sentimiento", []))
+        self._seen = {t["id"] for t in self.tweets}
+        self.cache = cache
+        self.sketches = sketches
+        self.added_tweets = 0
+
+    def add_page(self, page: Dict[str, Any]) -> int:
+        """Incorpora una página de respuesta. Devuelve el número de tweets nuevos."""
+        for user in page.get('includes', {}).get('users', []):
+            # No se pisan datos locales (p.ej. geo asignado por redistribución)
+            self.users[user['id']] = {**user, **self.users.get(user['id'], {})}
+        for place in page.get('includes', {}).get('places', []):
+            self.places[place['id']] = place
+
+        nuevos = []
+        for raw in page.get('data', []):
+            if raw['id'] in self._seen:
+                continue
+            tweet = {k: raw[k] for k in TWEET_KEYS if k in raw}
+            tweet.setdefault('edit_history_tweet_ids', [tweet['id']])
+            self._seen.add(tweet['id'])
+            nuevos.append(tweet)
+
+        enriquecidos = generar_sentimientos(nuevos, self.cache)
+        self.tweets.extend(nuevos)
+        self.sentimiento.extend(enriquecidos)
+        if self.sketches is not None:
+            self.sketches.update_many(nuevos, enriquecidos, self.users)
+        self.added_tweets += len(nuevos)
+        return len(nuevos)
+
+    def to_dataset(self) -> Dict[str, Any]:
+        return {
+            "tweets": self.tweets,
+            "users": self.users,
+            "places": self.places,
+            "sentimiento": self.sentimiento,
+        }
+
+
+class TwitterIngestor:
+    """
+    Orquesta la descarga concurrente de varias consultas paginadas.
+
+    Cada consulta recorre sus páginas secuencialmente (next_token) y publica las
+    páginas en una cola acotada; un único consumidor las incorpora al
+    DatasetBuilder. Si el consumidor se retrasa, la cola llena detiene a los
+    productores (backpressure) en vez de acumular respuestas en memoria.
+
+    Args:
+        client: HttpClient configurado con base_url y autenticación
+        bucket: TokenBucket compartido
+        max_retries: Reintentos por petición ante 429/5xx o errores de red
+        backoff_base: Retardo base (s) del backoff exponencial
+        backoff_max: Retardo máximo (s) entre reintentos
+        queue_size: Páginas en vuelo entre productores y consumidor
+    """
+
+    def __init__(self, client: HttpClient, bucket: TokenBucket, max_retries: int = 5,
+                 backoff_base: float = 0.5, backoff_max: float = 30.0, queue_size: int = 16):
+        self.client = client
+        self.bucket = bucket
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.queue_size = queue_size
+        self.stats = {
+            'requests': 0,
+            'pages': 0,
+            'tweets': 0,
+            'retries': 0,
+            'rate_limited': 0,
+            'queue_peak': 0,
+        }
+
+    def _backoff(self, attempt: int) -> float:
+        """Backoff exponencial con jitter completo."""
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    async def request(self, path: str, params: Dict[str, Any]) -> Dict[str, Any]:
+        """Petición GET con rate limiting y reintentos. Devuelve el JSON de respuesta."""
+        for attempt in range(self.max_retries + 1):
+            await self.bucket.acquire()
+            self.stats['requests'] += 1
+            try:
+                response = await self.client.get(path, params)
+            except (OSError, asyncio.IncompleteReadError, ValueError) as e:
+                if attempt == self.max_retries:
+                    raise IngestError(f"Error de red tras {attempt + 1} intentos: {e}") from e
+                self.stats['retries'] += 1
+                await asyncio.sleep(self._backoff(attempt))
+                continue
+
+            remaining = response.headers.get('x-rate-limit-remaining')
+            reset = response.headers.get('x-rate-limit-reset')
+            if remaining == '0' and reset:
+                self.bucket.pause_until(float(reset))
+
+            if response.status == 200:
+                return response.json()
+
+            if response.status not in RETRYABLE_STATUS or attempt == self.max_retries:
+                raise IngestError(f"HTTP {response.status} en {path}: {response.body[:200]!r}")
+
+            self.stats['retries'] += 1
+            if response.status == 429:
+                self.stats['rate_limited'] += 1
+                if reset and float(reset) > time.time():
+                    self.bucket.pause_until(float(reset))
+                    continue
+            await asyncio.sleep(self._backoff(attempt))
+
+        raise IngestError(f"Reintentos agotados en {path}")
+
+    async def paginate_search(self, query: str, max_pages: int = 10,
+                              page_size: int = 100) -> AsyncIterator[Dict[str, Any]]:
+        """Recorre las páginas de una búsqueda reciente siguiendo meta.next_token."""
+        params: Dict[str, Any] = {
+            'query': query,
+            'max_results': page_size,
+            'tweet.fields': TWEET_FIELDS,
+            'user.fields': USER_FIELDS,
+            'expansions': 'author_id',
+        }
+        for _ in range(max_pages):
+            page = await self.request(SEARCH_PATH, params)
+            yield page
+            next_token = page.get('meta', {}).get('next_token')
+            if not next_token:
+                break
+            params['next_token'] = next_token
+
+    async def ingest(self, queries: List[str], builder: DatasetBuilder,
+                     max_pages: int = 10, page_size: int = 100) -> DatasetBuilder:
+        """Ejecuta todas las consultas en paralelo y vuelca las páginas en el builder."""
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        done = object()
+
+        async def produce(query: str) -> None:
+            try:
+                async for page in self.paginate_search(query, max_pages, page_size):
+                    await queue.put(page)
+                    self.stats['queue_peak'] = max(self.stats['queue_peak'], queue.qsize())
+            finally:
+                await queue.put(done)
+
+        producers = [asyncio.create_task(produce(q)) for q in queries]
+        pending = len(producers)
+        try:
+            while pending:
+                page = await queue.get()
+                if page is done:
+                    pending -= 1
+                    continue
+                self.stats['pages'] += 1
+                self.stats['tweets'] += builder.add_page(page)
+            # Propaga el primer error de cualquier productor
+            for task in producers:
+                task.result()
+        finally:
+            for task in producers:
+                task.cancel()
+            await asyncio.gather(*producers, return_exceptions=True)
+        return builder
+
+
+async def run_ingest(args: argparse.Namespace) -> Dict[str, Any]:
+    """Configura cliente, limitador e ingestor y ejecuta la ingesta completa."""
+    server = None
+    if args.mock:
+        from mock_twitter_api import MockTwitterAPI, start_mock_server
+        api = MockTwitterAPI(results_per_query=args.max_pages * args.page_size,
+                             latency=args.mock_latency, error_rate=args.mock_error_rate)
+        server, base_url = await start_mock_server(api)
+        headers = {}
+        print(f"   ✓ API simulada en {base_url}")
+    else:
+        token = os.environ.get('TWITTER_BEARER_TOKEN')
+        if not token:
+            raise IngestError('Falta la variable de entorno TWITTER_BEARER_TOKEN')
+        base_url = args.base_url
+        headers = {'authorization': f'Bearer {token}'}
+
+    try:
+        existente = None
+        if args.merge and os.path.exists(args.output):
+            with open(args.output, 'r', encoding='utf-8') as f:
+                existente = json.load(f)
+
+        client = HttpClient(base_url, headers, max_connections=args.connections)
+        bucket = TokenBucket(rate=args.rate, capacity=args.burst)
+        ingestor = TwitterIngestor(client, bucket, max_retries=args.max_retries)
+        cache = EnrichmentCache(args.cache, ENRIQUECEDOR_VERSION) if args.cache else None
+        sketches = StreamSketches() if args.sketches else None
+        builder = DatasetBuilder(existente, cache, sketches)
+
+        start = time.perf_counter()
+        try:
+            await ingestor.ingest(args.query, builder, args.max_pages, args.page_size)
+        finally:
+            await client.close()
+            if cache is not None:
+                cache.close()
+        elapsed = time.perf_counter() - start
+
+        print(f"\n📊 Ingesta completada en {elapsed:.2f}s")
+        print(f"   Peticiones:        {ingestor.stats['requests']}")
+        print(f"   Páginas:           {ingestor.stats['pages']}")
+        print(f"   Tweets nuevos:     {ingestor.stats['tweets']}")
+        print(f"   Reintentos:        {ingestor.stats['retries']} (429: {ingestor.stats['rate_limited']})")
+        print(f"   Conexiones:        {client.pool.opened}")
+        print(f"   Cola (pico):       {ingestor.stats['queue_peak']}/{ingestor.queue_size}")
+        if elapsed > 0:
+            print(f"   Throughput:        {ingestor.stats['tweets'] / elapsed:.0f} tweets/s")
+        if cache is not None:
+            print(f"   Caché:             {cache.hits} aciertos, {cache.misses} fallos")
+
+        dataset = builder.to_dataset()
+        if sketches is not None:
+            sketches = actualizar_fichero_sketches(args.sketches, sketches, dataset)
+            print(f"   Sketches:          {sketches.tweets} tweets, "
+                  f"~{sketches.distinct_users.count()} usuarios distintos -> {args.sketches}")
+        return dataset
+    finally:
+        if server is not None:
+            server.close()
+            await server.wait_closed()
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """Función principal para ejecutar la ingesta."""
+    parser = argparse.ArgumentParser(description='Ingesta asíncrona desde la API v2 de Twitter/X')
+    parser.add_argument('--query', action='append', required=True, help='Consulta de búsqueda (repetible)')
+    parser.add_argument('--max-pages', type=int, default=10, help='Páginas máximas por consulta')
+    parser.add_argument('--page-size', type=int, default=100, help='Tweets por página (10-100)')
+    parser.add_argument('--rate', type=float, default=0.5, help='Peticiones por segundo (token bucket)')
+    parser.add_argument('--burst', type=float, default=5, help='Ráfaga máxima del token bucket')
+    parser.add_argument('--connections', type=int, default=4, help='Conexiones simultáneas')
+    parser.add_argument('--max-retries', type=int, default=5)
+    parser.add_argument('--base-url', default=DEFAULT_BASE_URL)
+    parser.add_argument('--output', default='public/data/dataset_ingesta.json',
+                        help='Dataset de salida (por defecto no pisa public/data/dataset.json)')
+    parser.add_argument('--cache', default=None, help='Ruta de la caché SQLite de enriquecimiento')
+    parser.add_argument('--merge', action='store_true', help='Combinar con el dataset existente')
+    parser.add_argument('--sketches', default=None, help='Mantener sketches top-K/HyperLogLog en este JSON')
+    parser.add_argument('--db', default=None, help='Materializar también el dataset en esta base SQLite')
+    parser.add_argument('--geocode', action='store_true', help='Rellenar user.geo a partir de user.location')
+    parser.add_argument('--mock', action='store_true', help='Usar el servidor simulado local')
+    parser.add_argument('--mock-latency', type=float, default=0.01)
+    parser.add_argument('--mock-error-rate', type=float, default=0.0)
+    args = parser.parse_args(argv)
+
+    print("=" * 60)
+    print("INGESTA ASÍNCRONA - API v2 TWITTER/X")
+    print("=" * 60)
+
+    try:
+        dataset = asyncio.run(run_ingest(args))
+    except IngestError as e:
+        print(f"   ✗ Error: {e}")
+        return
+
+    if args.geocode:
+        # Los usuarios de la API casi nunca traen coordenadas, solo location en texto libre
+        from geocode_users import geocodificar_usuarios
+        stats = geocodificar_usuarios(dataset['users'])
+        print(f"\n📍 Geocodificados {stats['geocodificados']}/{stats['pendientes']} usuarios "
+              f"({stats['textos_distintos']} ubicaciones distintas)")
+
+    # Si se va a sobrescribir un dataset, su versión anterior queda en snapshots
+    store = None
+    if os.path.exists(args.output):
+        from dataset_snapshots import SnapshotStore, snapshot_dir_for
+        store = SnapshotStore(snapshot_dir_for(args.output))
+        with open(args.output, 'r', encoding='utf-8') as f:
+            store.commit(json.load(f), "Antes de la ingesta")
+        version = store.latest()['version']
+        print(f"\n📸 Versión anterior en snapshots: {version} "
+              f"(restaurar con: python scripts/dataset_snapshots.py rollback {args.output} {version})")
+        if not args.merge:
+            print("   ⚠️ Sin --merge el dataset se reemplaza solo con los tweets ingeridos")
+
+    print(f"\n💾 Guardando dataset en {args.output}...")
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(dataset, f, ensure_ascii=False, indent=4)
+    print(f"✅ Dataset guardado: {len(dataset['tweets'])} tweets, {len(dataset['users'])} usuarios")
+    if store is not None:
+        store.commit(dataset, f"Ingesta: {', '.join(args.query)}")
+    if args.db:
+        from dataset_db import materialize
+        with materialize(dataset, args.db) as db:
+            print(f"🗄️ Base SQLite {args.db}: {db.counts()}")
+
+
+if __name__ == '__main__':
+    main()
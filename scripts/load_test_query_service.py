@@ -0,0 +1,216 @@
+"""
+Prueba de carga del servicio de consultas (query_service.py)
+
+Lanza muchos clientes concurrentes en la misma máquina, cada uno con su propia
+conexión keep-alive (HttpClient de ingest_twitter_api), que repiten durante
+`--duration` segundos una mezcla de peticiones realista: páginas de tweets,
+filtros de fecha y sentimiento, agregados top-K, series temporales y subgrafos.
+Informa peticiones por segundo y latencias p50/p90/p99/máx. globales y por ruta.
+
+Si no se indica --url, arranca el servicio en un subproceso con el dataset dado
+para que servidor y clientes no compartan el mismo loop ni el mismo GIL.
+
+Uso:
+    python scripts/load_test_query_service.py public/data/dataset.json --clients 200 --duration 15
+    python scripts/load_test_query_service.py --url http://127.0.0.1:8787 --clients 50
+"""
+
+import argparse
+import asyncio
+import math
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+from collections import Counter, defaultdict
+from typing import Dict, Any, List, Optional, Tuple
+
+from ingest_twitter_api import HttpClient
+
+SENTIMIENTOS = ('positive', 'neutral', 'negative')
+
+
+def percentil(valores: List[float], p: float) -> float:
+    """Percentil por rango más cercano sobre una lista ya ordenada."""
+    if not valores:
+        return 0.0
+    return valores[min(len(valores) - 1, max(0, math.ceil(p * len(valores)) - 1))]
+
+
+def _mezcla(rng: random.Random, info: Dict[str, Any]) -> Tuple[str, str, Dict[str, Any]]:
+    """Petición aleatoria (etiqueta, ruta, parámetros) con pesos parecidos a un dashboard."""
+    dias = info['dias']
+    r = rng.random()
+    if r < 0.30:
+        params: Dict[str, Any] = {'page': rng.randint(1, 20), 'page_size': 50}
+        if rng.random() < 0.5:
+            params['sentiment'] = rng.choice(SENTIMIENTOS)
+        if dias and rng.random() < 0.5:
+            params['from'] = params['to'] = rng.choice(dias)
+        return 'tweets', '/tweets', params
+    if r < 0.45:
+        params = {'sentiment': rng.choice(SENTIMIENTOS)}
+        if dias:
+            params['from'] = rng.choice(dias)
+        return 'tweets_filtro', '/tweets', params
+    if r < 0.60:
+        params = {'by': rng.choice(('entities', 'authors', 'mentions', 'locations', 'followers')), 'k': 10}
+        if dias and rng.random() < 0.5:
+            params['from'] = params['to'] = rng.choice(dias)
+        return 'top', '/aggregates/top', params
+    if r < 0.70:
+        params = {'from': rng.choice(dias)} if dias and rng.random() < 0.5 else {}
+        return 'sentiment', '/aggregates/sentiment', params
+    if r < 0.80:
+        return 'timeseries', '/aggregates/timeseries', {'interval': rng.choice(('hour', 'day'))}
+    if r < 0.90 and info['usuarios']:
+        return 'network', '/network', {'user': rng.choice(info['usuarios']), 'depth': rng.choice((1, 2)), 'limit': 100}
+    if info['usuarios']:
+        return 'user', f"/users/{rng.choice(info['usuarios'])}", {}
+    return 'stats', '/stats', {}
+
+
+async def _descubrir(base_url: str) -> Dict[str, Any]:
+    """Días y usuarios reales del dataset para construir peticiones válidas."""
+    client = HttpClient(base_url, max_connections=1)
+    try:
+        stats = (await client.get('/stats')).json()
+        pagina = (await client.get('/tweets', {'page_size': 500})).json()
+        serie = (await client.get('/aggregates/timeseries', {'interval': 'day'})).json()
+    finally:
+        await client.close()
+    usuarios = sorted({t['author_id'] for t in pagina.get('data', [])})
+    return {'stats': stats, 'dias': [p['date'] for p in serie], 'usuarios': usuarios}
+
+
+async def _cliente(base_url: str, rng: random.Random, info: Dict[str, Any], fin: float,
+                   latencias: Dict[str, List[float]], estados: Counter, cache: Counter) -> None:
+    client = HttpClient(base_url, max_connections=1)
+    try:
+        while time.perf_counter() < fin:
+            etiqueta, ruta, params = _mezcla(rng, info)
+            inicio = time.perf_counter()
+            try:
+                respuesta = await client.get(ruta, params)
+            except (OSError, asyncio.IncompleteReadError) as e:
+                estados[type(e).__name__] += 1
+                continue
+            latencias[etiqueta].append(time.perf_counter() - inicio)
+            estados[respuesta.status] += 1
+            cache[respuesta.headers.get('x-cache', '-')] += 1
+    finally:
+        await client.close()
+
+
+async def run_load_test(base_url: str, clients: int = 100, duration: float = 10.0, seed: int = 42) -> Dict[str, Any]:
+    """Ejecuta la prueba y devuelve el resumen (rps, percentiles por ruta, estados)."""
+    info = await _descubrir(base_url)
+    latencias: Dict[str, List[float]] = defaultdict(list)
+    estados: Counter = Counter()
+    cache: Counter = Counter()
+
+    inicio = time.perf_counter()
+    fin = inicio + duration
+    await asyncio.gather(*(
+        _cliente(base_url, random.Random(seed + i), info, fin, latencias, estados, cache) for i in range(clients)
+    ))
+    elapsed = time.perf_counter() - inicio
+
+    todas = sorted(l for ls in latencias.values() for l in ls)
+
+    def resumen(valores: List[float]) -> Dict[str, float]:
+        valores = sorted(valores)
+        return {
+            'requests': len(valores),
+            'p50_ms': percentil(valores, 0.50) * 1000,
+            'p90_ms': percentil(valores, 0.90) * 1000,
+            'p99_ms': percentil(valores, 0.99) * 1000,
+            'max_ms': (valores[-1] if valores else 0.0) * 1000,
+        }
+
+    return {
+        'clients': clients,
+        'duration_s': elapsed,
+        'requests': len(todas),
+        'rps': len(todas) / elapsed if elapsed > 0 else 0.0,
+        'latency': resumen(todas),
+        'routes': {etiqueta: resumen(ls) for etiqueta, ls in sorted(latencias.items())},
+        'status': dict(estados),
+        'cache': dict(cache),
+    }
+
+
+def _puerto_libre() -> int:
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+async def _esperar_servicio(base_url: str, proceso: subprocess.Popen, timeout: float) -> None:
+    """Espera a que /health responda (la carga del dataset puede tardar)."""
+    limite = time.perf_counter() + timeout
+    while time.perf_counter() < limite:
+        if proceso.poll() is not None:
+            raise RuntimeError(f"El servicio terminó con código {proceso.returncode}")
+        client = HttpClient(base_url, max_connections=1)
+        try:
+            if (await client.get('/health')).status == 200:
+                return
+        except OSError:
+            await asyncio.sleep(0.5)
+        finally:
+            await client.close()
+    raise RuntimeError('El servicio no respondió a tiempo')
+
+
+async def _main_async(args: argparse.Namespace) -> None:
+    proceso = None
+    base_url = args.url
+    if base_url is None:
+        puerto = _puerto_libre()
+        base_url = f"http://127.0.0.1:{puerto}"
+        script = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'query_service.py')
+        proceso = subprocess.Popen([sys.executable, script, args.dataset, '--port', str(puerto),
+                                    '--cache-size', str(args.cache_size), '--reload-interval', '0'])
+        print(f"⏳ Arrancando servicio en {base_url}...")
+        await _esperar_servicio(base_url, proceso, args.startup_timeout)
+
+    try:
+        print(f"🚀 {args.clients} clientes durante {args.duration:.0f}s contra {base_url}")
+        r = await run_load_test(base_url, args.clients, args.duration, args.seed)
+    finally:
+        if proceso is not None:
+            proceso.terminate()
+            proceso.wait()
+
+    print(f"\n📊 Resultados ({r['requests']} peticiones en {r['duration_s']:.1f}s)")
+    print(f"   Throughput:  {r['rps']:,.0f} peticiones/s")
+    lat = r['latency']
+    print(f"   Latencia:    p50 {lat['p50_ms']:.1f} ms | p90 {lat['p90_ms']:.1f} ms | "
+          f"p99 {lat['p99_ms']:.1f} ms | máx {lat['max_ms']:.1f} ms")
+    print(f"   Estados:     {r['status']}")
+    print(f"   Caché:       {r['cache']}")
+    print(f"\n   {'Ruta':<14}{'peticiones':>11}{'p50 ms':>9}{'p99 ms':>9}")
+    for etiqueta, s in r['routes'].items():
+        print(f"   {etiqueta:<14}{s['requests']:>11}{s['p50_ms']:>9.1f}{s['p99_ms']:>9.1f}")
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """Función principal de la prueba de carga."""
+    parser = argparse.ArgumentParser(description='Prueba de carga del servicio de consultas')
+    parser.add_argument('dataset', nargs='?', default='public/data/dataset.json')
+    parser.add_argument('--url', default=None, help='Servicio ya en ejecución (si no, se arranca uno)')
+    parser.add_argument('--clients', type=int, default=100, help='Clientes concurrentes')
+    parser.add_argument('--duration', type=float, default=10.0, help='Duración en segundos')
+    parser.add_argument('--cache-size', type=int, default=1024, help='Caché del servicio arrancado (0 = sin caché)')
+    parser.add_argument('--startup-timeout', type=float, default=300.0)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args(argv)
+
+    asyncio.run(_main_async(args))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,247 @@
+"""
+Servidor HTTP local que imita la API v2 de Twitter/X
+
+Sirve el endpoint de búsqueda reciente (/2/tweets/search/recent) con paginación
+por next_token, cabeceras de rate limit (x-rate-limit-*) y respuestas 429/503,
+usando los generadores de generate_mock_data.py. Permite probar throughput,
+backpressure y reintentos del cliente de ingesta sin conexión a internet.
+
+Uso:
+    python scripts/mock_twitter_api.py --port 8765 --limit 450 --window 900
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import random
+import time
+from datetime import datetime
+from typing import Dict, Any, List, Optional, Tuple
+from urllib.parse import urlsplit, parse_qs
+
+from generate_mock_data import generar_usuario, generar_tweet
+
+SEARCH_PATH = '/2/tweets/search/recent'
+
+# Campos que la API real no expone para usuarios (las coordenadas vienen de otra fuente)
+USER_FIELDS_OCULTOS = ('geo',)
+
+
+class MockTwitterAPI:
+    """
+    Estado del servidor simulado: pool de usuarios, ventana de rate limit y métricas.
+
+    Args:
+        num_users: Número de usuarios ficticios que actúan como autores
+        results_per_query: Total de tweets que devuelve cada consulta antes de agotarse
+        rate_limit: Peticiones permitidas por ventana
+        window_seconds: Duración de la ventana de rate limit
+        latency: Latencia simulada por petición (segundos)
+        error_rate: Probabilidad de responder 503 para probar reintentos
+    """
+
+    def __init__(self, num_users: int = 1000, results_per_query: int = 1000,
+                 rate_limit: int = 450, window_seconds: float = 900.0,
+                 latency: float = 0.0, error_rate: float = 0.0):
+        self.users = [generar_usuario(f"2{i:017d}") for i in range(num_users)]
+        self.results_per_query = results_per_query
+        self.rate_limit = rate_limit
+        self.window_seconds = window_seconds
+        self.latency = latency
+        self.error_rate = error_rate
+
+        self._window_start = time.time()
+        self._window_count = 0
+
+        self.stats = {
+            'requests': 0,
+            'rate_limited': 0,
+            'errors': 0,
+            'tweets_served': 0,
+            'in_flight': 0,
+            'peak_in_flight': 0,
+            'connections': 0,
+        }
+
+    def _check_rate_limit(self) -> Tuple[bool, Dict[str, str]]:
+        """Aplica la ventana fija de rate limit y construye las cabeceras x-rate-limit-*."""
+        now = time.time()
+        if now - self._window_start >= self.window_seconds:
+            self._window_start = now
+            self._window_count = 0
+
+        allowed = self._window_count < self.rate_limit
+        if allowed:
+            self._window_count += 1
+
+        reset = math.ceil(self._window_start + self.window_seconds)
+        headers = {
+            'x-rate-limit-limit': str(self.rate_limit),
+            'x-rate-limit-remaining': str(max(0, self.rate_limit - self._window_count)),
+            'x-rate-limit-reset': str(reset),
+        }
+        return allowed, headers
+
+    def search_page(self, params: Dict[str, str]) -> Dict[str, Any]:
+        """
+        Construye una página de resultados con el formato de la API v2.
+
+        El next_token codifica el offset dentro de la consulta, de modo que cada
+        consulta se agota tras results_per_query tweets.
+        """
+        max_results = max(10, min(100, int(params.get('max_results', 10))))
+        offset = int(params.get('next_token') or 0)
+        count = max(0, min(max_results, self.results_per_query - offset))
+
+        base_time = datetime.now()
+        tweets = []
+        autores: Dict[str, Dict[str, Any]] = {}
+        for _ in range(count):
+            autor = random.choice(self.users)
+            tweet_id = f"1{random.randint(100000000000000000, 999999999999999999)}"
+            tweets.append(generar_tweet(tweet_id, autor['id'], base_time))
+            autores[autor['id']] = {k: v for k, v in autor.items() if k not in USER_FIELDS_OCULTOS}
+
+        meta: Dict[str, Any] = {'result_count': count}
+        if tweets:
+            meta['newest_id'] = tweets[0]['id']
+            meta['oldest_id'] = tweets[-1]['id']
+        if offset + count < self.results_per_query:
+            meta['next_token'] = str(offset + count)
+
+        self.stats['tweets_served'] += count
+
+        page: Dict[str, Any] = {'meta': meta}
+        if tweets:
+            page['data'] = tweets
+            page['includes'] = {'users': list(autores.values())}
+        return page
+
+    async def handle_request(self, method: str, target: str) -> Tuple[int, Dict[str, str], Dict[str, Any]]:
+        """Resuelve una petición y devuelve (status, cabeceras extra, cuerpo JSON)."""
+        self.stats['requests'] += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+        url = urlsplit(target)
+        if method != 'GET' or url.path != SEARCH_PATH:
+            return 404, {}, {'title': 'Not Found Error', 'detail': f'{method} {url.path}'}
+
+        allowed, headers = self._check_rate_limit()
+        if not allowed:
+            self.stats['rate_limited'] += 1
+            return 429, headers, {'title': 'Too Many Requests', 'status': 429}
+
+        if self.error_rate and random.random() < self.error_rate:
+            self.stats['errors'] += 1
+            return 503, headers, {'title': 'Service Unavailable', 'status': 503}
+
+        params = {k: v[0] for k, v in parse_qs(url.query).items()}
+        return 200, headers, self.search_page(params)
+
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """Atiende una conexión HTTP/1.1 con keep-alive hasta que el cliente la cierre."""
+        self.stats['connections'] += 1
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                try:
+                    method, target, _ = request_line.decode('latin-1').split(' ', 2)
+                except ValueError:
+                    break
+
+                headers: Dict[str, str] = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+
+                length = int(headers.get('content-length', 0))
+                if length:
+                    await reader.readexactly(length)
+
+                self.stats['in_flight'] += 1
+                self.stats['peak_in_flight'] = max(self.stats['peak_in_flight'], self.stats['in_flight'])
+                try:
+                    status, extra_headers, body = await self.handle_request(method, target)
+                finally:
+                    self.stats['in_flight'] -= 1
+
+                keep_alive = headers.get('connection', '').lower() != 'close'
+                payload = json.dumps(body, ensure_ascii=False).encode('utf-8')
+                response_headers = {
+                    'content-type': 'application/json; charset=utf-8',
+                    'content-length': str(len(payload)),
+                    'connection': 'keep-alive' if keep_alive else 'close',
+                    **extra_headers,
+                }
+                head = f"HTTP/1.1 {status} {_REASONS.get(status, 'OK')}\r\n"
+                head += ''.join(f"{k}: {v}\r\n" for k, v in response_headers.items())
+                writer.write(head.encode('latin-1') + b'\r\n' + payload)
+                await writer.drain()
+
+                if not keep_alive:
+                    break
+        except (ConnectionResetError, asyncio.IncompleteReadError, BrokenPipeError):
+            pass
+        finally:
+            writer.close()
+
+
+_REASONS = {200: 'OK', 404: 'Not Found', 429: 'Too Many Requests', 503: 'Service Unavailable'}
+
+
+async def start_mock_server(api: MockTwitterAPI, host: str = '127.0.0.1', port: int = 0) -> Tuple[asyncio.AbstractServer, str]:
+    """
+    Arranca el servidor simulado en el loop actual.
+
+    Returns:
+        Tupla (servidor, base_url). Con port=0 el sistema asigna un puerto libre.
+    """
+    server = await asyncio.start_server(api.handle_connection, host, port)
+    sock_host, sock_port = server.sockets[0].getsockname()[:2]
+    return server, f"http://{sock_host}:{sock_port}"
+
+
+async def _serve(args: argparse.Namespace) -> None:
+    api = MockTwitterAPI(
+        num_users=args.users,
+        results_per_query=args.results,
+        rate_limit=args.limit,
+        window_seconds=args.window,
+        latency=args.latency,
+        error_rate=args.error_rate,
+    )
+    server, base_url = await start_mock_server(api, args.host, args.port)
+    print(f"✓ API simulada escuchando en {base_url}{SEARCH_PATH}")
+    print(f"  Rate limit: {args.limit} peticiones / {args.window:.0f}s")
+    async with server:
+        await server.serve_forever()
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """Función principal para ejecutar el servidor simulado."""
+    parser = argparse.ArgumentParser(description='API v2 de Twitter/X simulada para pruebas locales')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--users', type=int, default=1000, help='Usuarios ficticios')
+    parser.add_argument('--results', type=int, default=1000, help='Tweets por consulta')
+    parser.add_argument('--limit', type=int, default=450, help='Peticiones por ventana')
+    parser.add_argument('--window', type=float, default=900.0, help='Ventana de rate limit (s)')
+    parser.add_argument('--latency', type=float, default=0.0, help='Latencia simulada (s)')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Probabilidad de 503')
+    args = parser.parse_args(argv)
+
+    try:
+        asyncio.run(_serve(args))
+    except KeyboardInterrupt:
+        print("\nServidor detenido")
+
+
+if __name__ == '__main__':
+    main()
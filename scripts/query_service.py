@@ -0,0 +1,646 @@
+"""
+Servicio HTTP local de consultas sobre el dataset
+
+En lugar de que el navegador descargue public/data/dataset.json completo y
+calcule todo en loader.ts / analytics.ts / network-builder.ts, este servicio
+carga el dataset una vez en estructuras indexadas en memoria y responde:
+
+    GET /health                       estado, versión cargada y estadísticas de caché
+    GET /stats                        resumen tipo calculateDatasetStats
+    GET /tweets                       tweets paginados (page, page_size, sentiment, from, to, user, q)
+    GET /users/<id>                   usuario y número de tweets
+    GET /aggregates/sentiment         distribución de sentimiento (mismos filtros)
+    GET /aggregates/timeseries        serie por hora/día (interval=hour|day)
+    GET /aggregates/top               top-K (by=entities|authors|mentions|locations|followers, k)
+    GET /network                      subgrafo ego (user, depth, limit) o de los nodos más conectados (top)
+
+Índices: tweets ordenados por created_at (rango de fechas por bisect), listas
+de posiciones por sentimiento y por autor, y grafo de retweets/menciones con los
+mismos pesos que buildNetworkFromDataset. Las respuestas se guardan en una caché
+LRU (el gzip se calcula una vez por entrada) y el dataset se recarga en caliente
+cuando cambia su mtime, sin cortar las peticiones en curso.
+
+Uso:
+    python scripts/query_service.py public/data/dataset.json --port 8787
+"""
+
+import argparse
+import asyncio
+import bisect
+import gzip
+import heapq
+import json
+import os
+import re
+import time
+from array import array
+from collections import Counter, OrderedDict, defaultdict
+from itertools import chain
+from typing import Dict, Any, Iterable, List, Optional, Sequence, Tuple
+from urllib.parse import urlsplit, parse_qs, unquote
+
+from stream_sketches import MENCION_RE
+
+SENTIMIENTOS = ('positive', 'neutral', 'negative')
+RETWEET_RE = re.compile(r'^RT @(\w+):')
+
+# Pesos de arista de buildNetworkFromDataset
+PESO_RETWEET = 2.0
+PESO_MENCION = 1.0
+
+# Métricas de public_metrics sumadas en la serie temporal y su nombre en la respuesta
+METRICAS = {'retweet_count': 'retweets', 'like_count': 'likes', 'impression_count': 'impressions'}
+
+MAX_PAGE_SIZE = 500
+GZIP_MIN_BYTES = 1024
+
+
+class QueryError(Exception):
+    """Parámetros inválidos o recurso inexistente; se responde con `status`."""
+
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+def _entero(params: Dict[str, str], nombre: str, defecto: int, minimo: int = 0, maximo: Optional[int] = None) -> int:
+    try:
+        valor = int(params.get(nombre, defecto))
+    except ValueError:
+        raise QueryError(400, f"'{nombre}' debe ser un entero")
+    if valor < minimo or (maximo is not None and valor > maximo):
+        raise QueryError(400, f"'{nombre}' fuera de rango [{minimo}, {maximo if maximo is not None else '∞'}]")
+    return valor
+
+
+class DatasetIndex:
+    """Dataset cargado en memoria con índices para las consultas del servicio."""
+
+    def __init__(self, dataset: Dict[str, Any], version: str):
+        self.version = version
+        self.tweets: List[Dict[str, Any]] = sorted(dataset.get('tweets', []), key=lambda t: t.get('created_at', ''))
+        self.fechas = [t.get('created_at', '') for t in self.tweets]
+        self.users: Dict[str, Dict[str, Any]] = dataset.get('users', {})
+        # El dataset real usa "sentimiento" en lugar de "enriched_tweets"
+        enriched = dataset.get('sentimiento') or dataset.get('enriched_tweets') or []
+        self.enriched: Dict[str, Dict[str, Any]] = {e['id']: e for e in enriched}
+        self.por_username = {u['username'].lower(): uid for uid, u in self.users.items() if u.get('username')}
+
+        # Posiciones (en orden temporal) por sentimiento y por autor
+        self.por_sentimiento: Dict[str, List[int]] = defaultdict(list)
+        self.por_autor: Dict[str, List[int]] = defaultdict(list)
+        # Grafo no dirigido de interacciones: vecinos[u][v] = peso acumulado
+        self.vecinos: Dict[str, Counter] = defaultdict(Counter)
+        # Columnas por posición: los agregados usan Counter sobre slices/map (bucle en C)
+        self.autores: List[str] = []
+        self.sentimientos: List[Optional[str]] = []
+        self.menciones: List[Tuple[str, ...]] = []
+        self.entidades: List[Tuple[Tuple[str, Any], ...]] = []
+        self.ubicaciones: List[Optional[str]] = []
+        # Sumas prefijas de métricas: suma en [a, b) = acumulado[b] - acumulado[a]
+        self.acumulados: Dict[str, array] = {m: array('q', [0]) for m in METRICAS}
+        self.acumulados_sentimiento: Dict[str, Dict[str, array]] = {
+            s: {m: array('q', [0]) for m in METRICAS} for s in SENTIMIENTOS}
+
+        for posicion, tweet in enumerate(self.tweets):
+            registro = self.enriched.get(tweet['id'])
+            metricas = tweet.get('public_metrics', {})
+            for m in METRICAS:
+                acumulado = self.acumulados[m]
+                acumulado.append(acumulado[-1] + metricas.get(m, 0))
+            if registro is not None:
+                self.por_sentimiento[registro['sentiment']].append(posicion)
+                if registro['sentiment'] in self.acumulados_sentimiento:
+                    for m, acumulado in self.acumulados_sentimiento[registro['sentiment']].items():
+                        acumulado.append(acumulado[-1] + metricas.get(m, 0))
+            self.sentimientos.append(registro['sentiment'] if registro is not None else None)
+            autor = tweet['author_id']
+            self.por_autor[autor].append(posicion)
+            self.autores.append(autor)
+            ubicacion = (self.users.get(autor) or {}).get('location')
+            self.ubicaciones.append(ubicacion.strip() if ubicacion else None)
+            self.entidades.append(tuple((e['text'], e.get('category')) for e in (registro or {}).get('entities', [])))
+
+            texto = tweet.get('text', '')
+            menciones = MENCION_RE.findall(texto)
+            self.menciones.append(tuple(u.lower() for u in menciones))
+            retweet = RETWEET_RE.match(texto)
+            if retweet:
+                self._enlazar(autor, retweet.group(1), PESO_RETWEET)
+            for username in menciones:
+                self._enlazar(autor, username, PESO_MENCION)
+
+        # Inicio de cada hora/día: los tweets están ordenados, así que cada intervalo es un rango contiguo
+        self.cortes: Dict[str, Tuple[List[str], List[int]]] = {}
+        for intervalo, largo in (('hour', 13), ('day', 10)):
+            claves: List[str] = []
+            inicios: List[int] = []
+            for posicion, fecha in enumerate(self.fechas):
+                if not claves or fecha[:largo] != claves[-1]:
+                    claves.append(fecha[:largo])
+                    inicios.append(posicion)
+            self.cortes[intervalo] = (claves, inicios)
+
+        self.resumen = self._resumen()
+
+    def _enlazar(self, autor: str, username: str, peso: float) -> None:
+        destino = self.por_username.get(username.lower())
+        if destino is not None and destino != autor:
+            self.vecinos[autor][destino] += peso
+            self.vecinos[destino][autor] += peso
+
+    def _resumen(self) -> Dict[str, Any]:
+        entidades = Counter(chain.from_iterable(self.entidades))
+        return {
+            'totalTweets': len(self.tweets),
+            'totalUsers': len(self.users),
+            'totalEnrichedTweets': len(self.enriched),
+            'dateRange': {'start': self.fechas[0] if self.fechas else None,
+                          'end': self.fechas[-1] if self.fechas else None},
+            'sentimentDistribution': {s: len(self.por_sentimiento.get(s, [])) for s in SENTIMIENTOS},
+            'topEntities': [{'text': t, 'category': c, 'count': n} for (t, c), n in entidades.most_common(20)],
+            'usersWithGeo': sum(1 for u in self.users.values() if u.get('geo')),
+            'networkEdges': sum(len(v) for v in self.vecinos.values()) // 2,
+        }
+
+    # -- selección -------------------------------------------------------
+
+    def resolver_usuario(self, valor: str) -> str:
+        """Acepta id o @username."""
+        if valor in self.users:
+            return valor
+        uid = self.por_username.get(valor.lstrip('@').lower())
+        if uid is None:
+            raise QueryError(404, f"Usuario no encontrado: {valor}")
+        return uid
+
+    def rango_fechas(self, params: Dict[str, str]) -> Tuple[int, int]:
+        """Posiciones [lo, hi) con from <= created_at <= to (to admite un prefijo como '2025-11-12')."""
+        lo = bisect.bisect_left(self.fechas, params['from']) if params.get('from') else 0
+        hi = bisect.bisect_right(self.fechas, params['to'] + '\uffff') if params.get('to') else len(self.fechas)
+        return lo, max(lo, hi)
+
+    def _sentimientos(self, params: Dict[str, str]) -> Optional[List[str]]:
+        if not params.get('sentiment'):
+            return None
+        valores = params['sentiment'].split(',')
+        invalidos = [v for v in valores if v not in SENTIMIENTOS]
+        if invalidos:
+            raise QueryError(400, f"Sentimiento inválido: {', '.join(invalidos)}")
+        return valores
+
+    def seleccionar(self, params: Dict[str, str]) -> Sequence[int]:
+        """Posiciones (ordenadas por fecha) de los tweets que cumplen todos los filtros."""
+        lo, hi = self.rango_fechas(params)
+        sentimientos = self._sentimientos(params)
+
+        def acotar(posiciones: List[int]) -> List[int]:
+            return posiciones[bisect.bisect_left(posiciones, lo):bisect.bisect_left(posiciones, hi)]
+
+        seleccion: Sequence[int]
+        if params.get('user'):
+            # La lista del autor es corta: se filtra por sentimiento posición a posición
+            seleccion = acotar(self.por_autor.get(self.resolver_usuario(params['user']), []))
+            if sentimientos is not None:
+                permitidos = set(sentimientos)
+                seleccion = [p for p in seleccion if self.sentimientos[p] in permitidos]
+        elif sentimientos is not None:
+            tramos = [acotar(self.por_sentimiento.get(s, [])) for s in dict.fromkeys(sentimientos)]
+            seleccion = tramos[0] if len(tramos) == 1 else list(heapq.merge(*tramos))
+        else:
+            seleccion = range(lo, hi)
+
+        if params.get('q'):
+            termino = params['q'].lower()
+            seleccion = [p for p in seleccion if termino in self.tweets[p].get('text', '').lower()]
+        return seleccion
+
+    # -- consultas -------------------------------------------------------
+
+    def pagina_tweets(self, params: Dict[str, str]) -> Dict[str, Any]:
+        page = _entero(params, 'page', 1, minimo=1)
+        page_size = _entero(params, 'page_size', 50, minimo=1, maximo=MAX_PAGE_SIZE)
+        seleccion = self.seleccionar(params)
+        # Más recientes primero, como la búsqueda de la API
+        total = len(seleccion)
+        fin = total - (page - 1) * page_size
+        posiciones = [seleccion[i] for i in range(fin - 1, max(fin - page_size, 0) - 1, -1)] if fin > 0 else []
+
+        tweets = [self.tweets[p] for p in posiciones]
+        autores = {t['author_id'] for t in tweets}
+        return {
+            'data': tweets,
+            'includes': {
+                'users': [self.users[a] for a in autores if a in self.users],
+                'sentimiento': [self.enriched[t['id']] for t in tweets if t['id'] in self.enriched],
+            },
+            'meta': {
+                'page': page,
+                'page_size': page_size,
+                'total': total,
+                'pages': (total + page_size - 1) // page_size,
+            },
+        }
+
+    def usuario(self, user_id: str) -> Dict[str, Any]:
+        uid = self.resolver_usuario(user_id)
+        return {'data': self.users[uid], 'meta': {'tweets': len(self.por_autor.get(uid, [])),
+                                                  'connections': len(self.vecinos.get(uid, {}))}}
+
+    def sentimiento(self, params: Dict[str, str]) -> Dict[str, int]:
+        """Conteo por sentimiento; los excluidos por el filtro 'sentiment' valen 0."""
+        if not params.get('user') and not params.get('q'):
+            # Solo rango de fechas: cada conteo son dos bisect sobre la lista del sentimiento
+            lo, hi = self.rango_fechas(params)
+            sentimientos = self._sentimientos(params) or SENTIMIENTOS
+            return {s: bisect.bisect_left(self.por_sentimiento.get(s, []), hi)
+                    - bisect.bisect_left(self.por_sentimiento.get(s, []), lo) if s in sentimientos else 0
+                    for s in SENTIMIENTOS}
+        conteos = Counter(map(self.sentimientos.__getitem__, self.seleccionar(params)))
+        return {s: conteos[s] for s in SENTIMIENTOS}
+
+    def serie_temporal(self, params: Dict[str, str]) -> List[Dict[str, Any]]:
+        """Como getTimeSeriesData: tweets, retweets, likes e impresiones por hora (o día)."""
+        intervalo = params.get('interval', 'hour')
+        if intervalo not in ('hour', 'day'):
+            raise QueryError(400, "'interval' debe ser hour o day")
+        sentimientos = self._sentimientos(params)
+        if params.get('user') or params.get('q') or (sentimientos is not None and len(sentimientos) > 1):
+            return self._serie_recorriendo(self.seleccionar(params), intervalo)
+
+        # Cada intervalo es un rango contiguo de posiciones: conteos y sumas salen de bisect y sumas prefijas
+        lo, hi = self.rango_fechas(params)
+        posiciones = self.por_sentimiento.get(sentimientos[0], []) if sentimientos else None
+        acumulados = self.acumulados_sentimiento[sentimientos[0]] if sentimientos else self.acumulados
+        claves, inicios = self.cortes[intervalo]
+        puntos = []
+        primero = max(0, bisect.bisect_right(inicios, lo) - 1)
+        for i in range(primero, len(claves)):
+            fin = inicios[i + 1] if i + 1 < len(inicios) else len(self.fechas)
+            a, b = max(inicios[i], lo), min(fin, hi)
+            if a >= b:
+                if inicios[i] >= hi:
+                    break
+                continue
+            if posiciones is not None:
+                a, b = bisect.bisect_left(posiciones, a), bisect.bisect_left(posiciones, b)
+                if a == b:
+                    continue
+            clave = claves[i]
+            puntos.append({
+                'date': f"{clave[:10]} {clave[11:13]}:00" if intervalo == 'hour' else clave,
+                'tweets': b - a,
+                **{nombre: acumulados[m][b] - acumulados[m][a] for m, nombre in METRICAS.items()},
+            })
+        return puntos
+
+    def _serie_recorriendo(self, seleccion: Sequence[int], intervalo: str) -> List[Dict[str, Any]]:
+        puntos: Dict[str, Dict[str, Any]] = {}
+        for p in seleccion:
+            tweet = self.tweets[p]
+            fecha = tweet.get('created_at', '')
+            clave = f"{fecha[:10]} {fecha[11:13]}:00" if intervalo == 'hour' else fecha[:10]
+            punto = puntos.get(clave)
+            if punto is None:
+                punto = puntos[clave] = {'date': clave, 'tweets': 0, **{nombre: 0 for nombre in METRICAS.values()}}
+            metricas = tweet.get('public_metrics', {})
+            punto['tweets'] += 1
+            for m, nombre in METRICAS.items():
+                punto[nombre] += metricas.get(m, 0)
+        # Las posiciones ya están en orden temporal
+        return list(puntos.values())
+
+    def top(self, params: Dict[str, str]) -> List[Dict[str, Any]]:
+        por = params.get('by', 'entities')
+        k = _entero(params, 'k', 10, minimo=1, maximo=1000)
+        if por == 'followers':
+            # No depende de los filtros de tweets
+            mejores = heapq.nlargest(k, self.users.values(),
+                                     key=lambda u: u.get('public_metrics', {}).get('followers_count', 0))
+            return [{'id': u['id'], 'username': u.get('username'), 'name': u.get('name'),
+                     'count': u.get('public_metrics', {}).get('followers_count', 0)} for u in mejores]
+
+        seleccion = self.seleccionar(params)
+
+        def columna(valores: List[Any]) -> Iterable[Any]:
+            if isinstance(seleccion, range):
+                return valores[seleccion.start:seleccion.stop]
+            return map(valores.__getitem__, seleccion)
+
+        if por == 'entities':
+            conteos = Counter(chain.from_iterable(columna(self.entidades)))
+            return [{'text': t, 'category': c, 'count': n} for (t, c), n in conteos.most_common(k)]
+        if por == 'mentions':
+            conteos = Counter(chain.from_iterable(columna(self.menciones)))
+            return [{'username': u, 'count': n} for u, n in conteos.most_common(k)]
+        if por == 'locations':
+            conteos = Counter(columna(self.ubicaciones))
+            conteos.pop(None, None)
+            return [{'name': l, 'count': n} for l, n in conteos.most_common(k)]
+        if por == 'authors':
+            conteos = Counter(columna(self.autores))
+            return [{'id': uid, 'username': (self.users.get(uid) or {}).get('username'), 'count': n}
+                    for uid, n in conteos.most_common(k)]
+        raise QueryError(400, "'by' debe ser entities, authors, mentions, locations o followers")
+
+    def _nodo(self, uid: str) -> Dict[str, Any]:
+        """Nodo con los campos que produce buildNetworkFromDataset."""
+        user = self.users.get(uid, {'id': uid, 'username': uid})
+        sentimientos = {s: 0 for s in SENTIMIENTOS}
+        for p in self.por_autor.get(uid, []):
+            registro = self.enriched.get(self.tweets[p]['id'])
+            if registro is not None and registro['sentiment'] in sentimientos:
+                sentimientos[registro['sentiment']] += 1
+        dominante = 'neutral'
+        if sentimientos['positive'] > max(sentimientos['neutral'], sentimientos['negative']):
+            dominante = 'positive'
+        elif sentimientos['negative'] > max(sentimientos['neutral'], sentimientos['positive']):
+            dominante = 'negative'
+        metricas = user.get('public_metrics', {})
+        num_tweets = len(self.por_autor.get(uid, []))
+        return {
+            'id': uid,
+            'label': user.get('username'),
+            'type': dominante,
+            'degree': num_tweets,
+            'name': user.get('name'),
+            'location': user.get('location'),
+            'geo': user.get('geo'),
+            'followers': metricas.get('followers_count', 0),
+            'following': metricas.get('following_count', 0),
+            'tweetCount': num_tweets,
+            'verified': user.get('verified', False),
+            'sentimentDistribution': sentimientos,
+            'profileImageUrl': f"https://x.com/{user.get('username')}/photo",
+        }
+
+    def red(self, params: Dict[str, str]) -> Dict[str, Any]:
+        """Subgrafo ego de `user` hasta `depth` saltos, o inducido por los `top` nodos de mayor grado ponderado."""
+        limite = _entero(params, 'limit', 200, minimo=1, maximo=5000)
+        if params.get('user'):
+            origen = self.resolver_usuario(params['user'])
+            profundidad = _entero(params, 'depth', 1, minimo=1, maximo=3)
+            nodos = {origen}
+            frontera = [origen]
+            for _ in range(profundidad):
+                siguiente = []
+                for uid in frontera:
+                    # Vecinos más fuertes primero, hasta completar el límite
+                    for vecino, _peso in self.vecinos.get(uid, Counter()).most_common():
+                        if len(nodos) >= limite:
+                            break
+                        if vecino not in nodos:
+                            nodos.add(vecino)
+                            siguiente.append(vecino)
+                frontera = siguiente
+        else:
+            top = _entero(params, 'top', 100, minimo=1, maximo=limite)
+            nodos = set(heapq.nlargest(top, self.vecinos, key=lambda u: sum(self.vecinos[u].values())))
+
+        aristas = [{'source': u, 'target': v, 'weight': peso, 'type': 'interaction'}
+                   for u in nodos for v, peso in self.vecinos.get(u, {}).items() if v in nodos and u < v]
+        return {'nodes': [self._nodo(uid) for uid in nodos], 'edges': aristas}
+
+
+class QueryService:
+    """
+    Servidor HTTP/1.1 keep-alive con caché LRU de respuestas y recarga en caliente.
+
+    Args:
+        dataset_path: Ruta de dataset.json
+        cache_size: Respuestas máximas en caché (0 la desactiva)
+        reload_interval: Segundos entre comprobaciones del mtime del dataset
+    """
+
+    def __init__(self, dataset_path: str, cache_size: int = 1024, reload_interval: float = 2.0):
+        self.dataset_path = dataset_path
+        self.cache_size = cache_size
+        self.reload_interval = reload_interval
+        self.cache: 'OrderedDict[Tuple, List[Optional[bytes]]]' = OrderedDict()
+        self.stats = Counter()
+        self.index: Optional[DatasetIndex] = None
+        self._firma: Optional[Tuple[int, int]] = None
+
+    def _firma_actual(self) -> Optional[Tuple[int, int]]:
+        try:
+            st = os.stat(self.dataset_path)
+        except OSError:
+            return None
+        return st.st_mtime_ns, st.st_size
+
+    def _construir_indice(self) -> Tuple[DatasetIndex, Optional[Tuple[int, int]]]:
+        """Lee el dataset y construye su índice sin tocar el estado del servicio (seguro en un hilo)."""
+        firma = self._firma_actual()
+        inicio = time.perf_counter()
+        with open(self.dataset_path, 'r', encoding='utf-8') as f:
+            dataset = json.load(f)
+        index = DatasetIndex(dataset, version=f"{firma[0] if firma else 0:x}")
+        print(f"✓ Dataset cargado: {index.resumen['totalTweets']} tweets, {index.resumen['totalUsers']} usuarios "
+              f"en {time.perf_counter() - inicio:.1f}s")
+        return index, firma
+
+    def _activar(self, index: DatasetIndex, firma: Optional[Tuple[int, int]]) -> None:
+        """Publica un índice nuevo; solo se llama desde el hilo del loop, entre peticiones."""
+        self.index, self._firma = index, firma
+        self.cache.clear()
+
+    def cargar(self) -> DatasetIndex:
+        """Carga inicial (bloqueante)."""
+        index, firma = self._construir_indice()
+        self._activar(index, firma)
+        return index
+
+    async def vigilar(self) -> None:
+        """Recarga el dataset cuando cambia; si está a medio escribir se reintenta en la siguiente vuelta."""
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(self.reload_interval)
+            firma = self._firma_actual()
+            if firma is None or firma == self._firma:
+                continue
+            try:
+                # Solo la construcción va al hilo; el cambio de índice y la caché se tocan en el loop
+                index, firma = await loop.run_in_executor(None, self._construir_indice)
+                self._activar(index, firma)
+                self.stats['reloads'] += 1
+            except (OSError, ValueError) as e:
+                print(f"⚠️ No se pudo recargar el dataset: {e}")
+
+    def consultar(self, index: DatasetIndex, path: str, params: Dict[str, str]) -> Any:
+        """Enruta una petición GET sobre un índice concreto y devuelve el cuerpo JSON."""
+        if path == '/health':
+            return {
+                'status': 'ok',
+                'version': index.version,
+                'tweets': len(index.tweets),
+                'users': len(index.users),
+                'cache': {'entries': len(self.cache), 'hits': self.stats['cache_hits'],
+                          'misses': self.stats['cache_misses']},
+                'reloads': self.stats['reloads'],
+                'requests': self.stats['requests'],
+            }
+        if path == '/stats':
+            return index.resumen
+        if path == '/tweets':
+            return index.pagina_tweets(params)
+        if path.startswith('/users/'):
+            return index.usuario(unquote(path[len('/users/'):]))
+        if path == '/aggregates/sentiment':
+            return index.sentimiento(params)
+        if path == '/aggregates/timeseries':
+            return index.serie_temporal(params)
+        if path == '/aggregates/top':
+            return index.top(params)
+        if path == '/network':
+            return index.red(params)
+        raise QueryError(404, f"Ruta desconocida: {path}")
+
+    def responder(self, target: str, acepta_gzip: bool) -> Tuple[int, Dict[str, str], bytes]:
+        """Resuelve una petición pasando por la caché LRU; devuelve (status, cabeceras, cuerpo)."""
+        url = urlsplit(target)
+        params = {k: v[0] for k, v in parse_qs(url.query).items()}
+        # /health no se cachea: refleja contadores en vivo
+        cacheable = self.cache_size > 0 and url.path != '/health'
+        # El índice se fija una vez: la clave y la respuesta corresponden a la misma versión
+        index = self.index
+        clave = (index.version, url.path, tuple(sorted(params.items())))
+
+        entrada = self.cache.get(clave) if cacheable else None
+        if entrada is not None:
+            self.cache.move_to_end(clave)
+            self.stats['cache_hits'] += 1
+            estado_cache = 'HIT'
+        else:
+            try:
+                cuerpo = self.consultar(index, url.path, params)
+            except QueryError as e:
+                payload = json.dumps({'error': str(e)}, ensure_ascii=False).encode('utf-8')
+                return e.status, {}, payload
+            entrada = [json.dumps(cuerpo, ensure_ascii=False, separators=(',', ':')).encode('utf-8'), None]
+            estado_cache = 'MISS'
+            if cacheable:
+                self.stats['cache_misses'] += 1
+                self.cache[clave] = entrada
+                if len(self.cache) > self.cache_size:
+                    self.cache.popitem(last=False)
+
+        headers = {'x-cache': estado_cache, 'vary': 'accept-encoding'}
+        if acepta_gzip and len(entrada[0]) >= GZIP_MIN_BYTES:
+            # Se comprime una sola vez por entrada de caché
+            if entrada[1] is None:
+                entrada[1] = gzip.compress(entrada[0], compresslevel=5)
+            headers['content-encoding'] = 'gzip'
+            return 200, headers, entrada[1]
+        return 200, headers, entrada[0]
+
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """Atiende una conexión HTTP/1.1 con keep-alive hasta que el cliente la cierre."""
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                try:
+                    method, target, _ = request_line.decode('latin-1').split(' ', 2)
+                except ValueError:
+                    break
+
+                headers: Dict[str, str] = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+
+                length = int(headers.get('content-length', 0))
+                if length:
+                    await reader.readexactly(length)
+
+                self.stats['requests'] += 1
+                if method == 'OPTIONS':
+                    status, extra_headers, payload = 204, {}, b''
+                elif method != 'GET':
+                    status, extra_headers, payload = 405, {}, b'{"error":"Solo se admite GET"}'
+                else:
+                    try:
+                        status, extra_headers, payload = self.responder(target, 'gzip' in headers.get('accept-encoding', ''))
+                    except Exception as e:  # Un error en una consulta no debe tumbar la conexión
+                        self.stats['errors'] += 1
+                        status, extra_headers = 500, {}
+                        payload = json.dumps({'error': f"{type(e).__name__}: {e}"}).encode('utf-8')
+
+                keep_alive = headers.get('connection', '').lower() != 'close'
+                response_headers = {
+                    'content-type': 'application/json; charset=utf-8',
+                    'content-length': str(len(payload)),
+                    'connection': 'keep-alive' if keep_alive else 'close',
+                    # El frontend de Next.js corre en otro puerto
+                    'access-control-allow-origin': '*',
+                    'access-control-allow-methods': 'GET, OPTIONS',
+                    **extra_headers,
+                }
+                head = f"HTTP/1.1 {status} {_REASONS.get(status, 'OK')}\r\n"
+                head += ''.join(f"{k}: {v}\r\n" for k, v in response_headers.items())
+                writer.write(head.encode('latin-1') + b'\r\n' + payload)
+                await writer.drain()
+
+                if not keep_alive:
+                    break
+        except (ConnectionResetError, asyncio.IncompleteReadError, BrokenPipeError):
+            pass
+        finally:
+            writer.close()
+
+
+_REASONS = {200: 'OK', 204: 'No Content', 400: 'Bad Request', 404: 'Not Found',
+            405: 'Method Not Allowed', 500: 'Internal Server Error'}
+
+
+async def start_query_service(service: QueryService, host: str = '127.0.0.1', port: int = 0) -> Tuple[asyncio.AbstractServer, str]:
+    """
+    Carga el dataset (si no lo estaba) y arranca el servidor en el loop actual.
+
+    Returns:
+        Tupla (servidor, base_url). Con port=0 el sistema asigna un puerto libre.
+    """
+    if service.index is None:
+        service.cargar()
+    server = await asyncio.start_server(service.handle_connection, host, port, backlog=1024)
+    sock_host, sock_port = server.sockets[0].getsockname()[:2]
+    return server, f"http://{sock_host}:{sock_port}"
+
+
+async def _serve(args: argparse.Namespace) -> None:
+    service = QueryService(args.dataset, cache_size=args.cache_size, reload_interval=args.reload_interval)
+    server, base_url = await start_query_service(service, args.host, args.port)
+    print(f"✓ Servicio de consultas escuchando en {base_url}")
+    recarga = f"recarga cada {args.reload_interval:g}s si cambia {args.dataset}" if args.reload_interval > 0 else "sin recarga"
+    print(f"  Caché: {args.cache_size} respuestas, {recarga}")
+    vigilancia = asyncio.create_task(service.vigilar()) if args.reload_interval > 0 else None
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        if vigilancia is not None:
+            vigilancia.cancel()
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """Función principal para ejecutar el servicio de consultas."""
+    parser = argparse.ArgumentParser(description='Servicio HTTP local de consultas sobre el dataset')
+    parser.add_argument('dataset', nargs='?', default='public/data/dataset.json')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8787)
+    parser.add_argument('--cache-size', type=int, default=1024, help='Respuestas en la caché LRU (0 = sin caché)')
+    parser.add_argument('--reload-interval', type=float, default=2.0, help='Segundos entre comprobaciones (0 = sin recarga)')
+    args = parser.parse_args(argv)
+
+    try:
+        asyncio.run(_serve(args))
+    except KeyboardInterrupt:
+        print("\nServidor detenido")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,435 @@
+"""
+Índice de offsets de bytes para acceso aleatorio a dataset.json
+
+Recorre dataset.json una sola vez y guarda, para cada tweet, usuario, lugar y
+registro de sentimiento, el tramo de bytes (offset, longitud) que ocupa en el fichero.
+La tabla se ordena por id y se escribe en binario (dataset.records.idx), de
+modo que el lector puede hacer búsqueda binaria directamente sobre el mmap del
+índice y decodificar solo los registros pedidos mediante un mmap del dataset.
+
+Formato del índice:
+    b'RIDX2' | uint32 longitud de cabecera | cabecera JSON | secciones alineadas a 8 bytes
+    Cada sección: claves uint64[n] | offsets uint64[n] | longitudes uint32[n]
+
+Las claves son el id numérico cuando cabe en 64 bits (caso de los ids de
+Twitter); en otro caso, un hash blake2b de 64 bits. El lector verifica el id
+del registro decodificado, así que una colisión nunca devuelve un registro
+equivocado.
+
+Uso:
+    python scripts/record_index.py build public/data/dataset.json
+    python scripts/record_index.py get public/data/dataset.json tweets 1988417065263526146
+    python scripts/record_index.py bench public/data/dataset.json
+    python scripts/record_index.py verify public/data/dataset.json --crlf
+"""
+
+import argparse
+import bisect
+import hashlib
+import json
+import mmap
+import os
+import random
+import re
+import struct
+import tempfile
+import time
+from array import array
+from typing import Dict, Any, List, Iterable, Iterator, Optional, Tuple
+
+_MAGIC = b'RIDX2'
+_WS = re.compile(r'\s*')
+
+# Secciones indexadas: las listas usan record["id"], users y places la clave del objeto.
+# El dataset real usa "sentimiento" en lugar de "enriched_tweets".
+SECCIONES_LISTA = {'tweets': 'tweets', 'sentimiento': 'sentimiento', 'enriched_tweets': 'sentimiento'}
+SECCIONES_OBJETO = {'users': 'users', 'places': 'places'}
+
+
+def clave_id(record_id: str) -> int:
+    """Clave uint64 de un id: el propio número si es numérico, si no un hash de 64 bits."""
+    if record_id.isdigit() and len(record_id) <= 20:
+        valor = int(record_id)
+        if valor < 2 ** 64:
+            return valor
+    return int.from_bytes(hashlib.blake2b(record_id.encode('utf-8'), digest_size=8).digest(), 'little')
+
+
+def index_path_for(dataset_path: str) -> str:
+    """Ruta del índice que acompaña a un dataset (dataset.json -> dataset.records.idx)."""
+    base, _ = os.path.splitext(dataset_path)
+    return f"{base}.records.idx"
+
+
+class _ByteCursor:
+    """Convierte índices de carácter del texto decodificado en offsets de bytes UTF-8, avanzando una sola vez."""
+
+    def __init__(self, texto: str):
+        self.texto = texto
+        self.ascii = texto.isascii()
+        self.char_pos = 0
+        self.byte_pos = 0
+
+    def to_bytes(self, idx: int) -> int:
+        if self.ascii:
+            return idx
+        self.byte_pos += len(self.texto[self.char_pos:idx].encode('utf-8'))
+        self.char_pos = idx
+        return self.byte_pos
+
+
+def escanear_dataset(dataset_path: str) -> Dict[str, List[Tuple[str, int, int]]]:
+    """
+    Recorre el JSON de nivel superior y devuelve los tramos de cada registro.
+
+    Cada elemento se decodifica con JSONDecoder.raw_decode (en C) solo para
+    obtener su id y su final; nunca se construye el árbol completo del dataset.
+
+    Returns:
+        {sección: [(id, offset_bytes, longitud_bytes), ...]}
+    """
+    # Se decodifican los bytes tal cual: en modo texto la traducción de \r\n
+    # desplazaría los índices de carácter respecto a los offsets del fichero
+    with open(dataset_path, 'rb') as f:
+        texto = f.read().decode('utf-8')
+    decoder = json.JSONDecoder()
+    cursor = _ByteCursor(texto)
+    secciones: Dict[str, List[Tuple[str, int, int]]] = {}
+
+    def ws(i: int) -> int:
+        return _WS.match(texto, i).end()
+
+    def esperar(i: int, caracter: str) -> int:
+        i = ws(i)
+        if texto[i:i + 1] != caracter:
+            raise ValueError(f"Se esperaba {caracter!r} en el carácter {i} de {dataset_path}")
+        return i + 1
+
+    def tramo(inicio: int, fin: int) -> Tuple[int, int]:
+        byte_inicio = cursor.to_bytes(inicio)
+        return byte_inicio, cursor.to_bytes(fin) - byte_inicio
+
+    i = esperar(0, '{')
+    i = ws(i)
+    while texto[i] != '}':
+        clave, i = decoder.raw_decode(texto, i)
+        i = ws(esperar(i, ':'))
+
+        if clave in SECCIONES_LISTA and texto[i] == '[':
+            destino = secciones.setdefault(SECCIONES_LISTA[clave], [])
+            i = ws(i + 1)
+            while texto[i] != ']':
+                registro, fin = decoder.raw_decode(texto, i)
+                destino.append((str(registro['id']),) + tramo(i, fin))
+                i = ws(fin)
+                if texto[i] == ',':
+                    i = ws(i + 1)
+            i += 1
+        elif clave in SECCIONES_OBJETO and texto[i] == '{':
+            destino = secciones.setdefault(SECCIONES_OBJETO[clave], [])
+            i = ws(i + 1)
+            while texto[i] != '}':
+                record_id, i = decoder.raw_decode(texto, i)
+                i = ws(esperar(i, ':'))
+                _, fin = decoder.raw_decode(texto, i)
+                destino.append((record_id,) + tramo(i, fin))
+                i = ws(fin)
+                if texto[i] == ',':
+                    i = ws(i + 1)
+            i += 1
+        else:
+            _, i = decoder.raw_decode(texto, i)
+
+        i = ws(i)
+        if texto[i] == ',':
+            i = ws(i + 1)
+
+    return secciones
+
+
+def build_record_index(dataset_path: str, index_path: Optional[str] = None) -> str:
+    """
+    Construye el índice de offsets de un dataset.
+
+    Returns:
+        Ruta del índice escrito
+    """
+    index_path = index_path or index_path_for(dataset_path)
+    secciones = escanear_dataset(dataset_path)
+
+    header: Dict[str, Any] = {'sections': {}}
+    st = os.stat(dataset_path)
+    header['source'] = {'path': os.path.basename(dataset_path), 'size': st.st_size, 'mtime_ns': st.st_mtime_ns}
+
+    cuerpos = []
+    for nombre, registros in secciones.items():
+        registros.sort(key=lambda r: clave_id(r[0]))
+        claves = array('Q', (clave_id(r[0]) for r in registros))
+        offsets = array('Q', (r[1] for r in registros))
+        longitudes = array('I', (r[2] for r in registros))
+        cuerpo = claves.tobytes() + offsets.tobytes() + longitudes.tobytes()
+        cuerpo += b'\0' * (-len(cuerpo) % 8)
+        cuerpos.append((nombre, len(registros), cuerpo))
+
+    # Offsets de sección relativos al inicio de los datos (tras la cabecera alineada)
+    posicion = 0
+    for nombre, n, cuerpo in cuerpos:
+        header['sections'][nombre] = {'count': n, 'offset': posicion}
+        posicion += len(cuerpo)
+
+    header_bytes = json.dumps(header).encode('utf-8')
+    prefijo = len(_MAGIC) + 4 + len(header_bytes)
+    header_bytes += b' ' * (-prefijo % 8)
+
+    with open(index_path, 'wb') as f:
+        f.write(_MAGIC)
+        f.write(struct.pack('<I', len(header_bytes)))
+        f.write(header_bytes)
+        for _, _, cuerpo in cuerpos:
+            f.write(cuerpo)
+    return index_path
+
+
+class _Seccion:
+    """Vistas sin copia sobre las tablas de una sección del índice."""
+
+    def __init__(self, buffer: memoryview, inicio: int, n: int):
+        self.n = n
+        self.claves = buffer[inicio:inicio + 8 * n].cast('Q')
+        self.offsets = buffer[inicio + 8 * n:inicio + 16 * n].cast('Q')
+        self.longitudes = buffer[inicio + 16 * n:inicio + 20 * n].cast('I')
+
+    def posiciones(self, clave: int) -> range:
+        """Rango de posiciones con esa clave (más de una solo si hay colisión de hash)."""
+        lo = bisect.bisect_left(self.claves, clave)
+        hi = lo
+        while hi < self.n and self.claves[hi] == clave:
+            hi += 1
+        return range(lo, hi)
+
+
+class RecordReader:
+    """
+    Lector de registros individuales por id con mmap, sin parsear el dataset completo.
+
+    Cada búsqueda es O(log n) sobre la tabla ordenada más la decodificación del
+    único registro pedido.
+
+    Args:
+        dataset_path: Ruta de dataset.json
+        index_path: Ruta del índice (por defecto junto al dataset)
+        check_stale: Reconstruir el índice si el dataset cambió desde su creación
+    """
+
+    def __init__(self, dataset_path: str, index_path: Optional[str] = None, check_stale: bool = True):
+        self.dataset_path = dataset_path
+        self.index_path = index_path or index_path_for(dataset_path)
+        if not os.path.exists(self.index_path) or (check_stale and self._is_stale()):
+            build_record_index(dataset_path, self.index_path)
+
+        self._data_file = open(dataset_path, 'rb')
+        self._data = mmap.mmap(self._data_file.fileno(), 0, access=mmap.ACCESS_READ)
+        self._index_file = open(self.index_path, 'rb')
+        self._index = mmap.mmap(self._index_file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        buffer = memoryview(self._index)
+        (header_len,) = struct.unpack_from('<I', buffer, len(_MAGIC))
+        inicio_datos = len(_MAGIC) + 4 + header_len
+        self.header = json.loads(bytes(buffer[len(_MAGIC) + 4:inicio_datos]))
+        self._secciones = {
+            nombre: _Seccion(buffer, inicio_datos + info['offset'], info['count'])
+            for nombre, info in self.header['sections'].items()
+        }
+
+    def _is_stale(self) -> bool:
+        with open(self.index_path, 'rb') as f:
+            if f.read(len(_MAGIC)) != _MAGIC:
+                return True
+            (header_len,) = struct.unpack('<I', f.read(4))
+            source = json.loads(f.read(header_len)).get('source', {})
+        st = os.stat(self.dataset_path)
+        return st.st_size != source.get('size') or st.st_mtime_ns != source.get('mtime_ns')
+
+    def __enter__(self) -> 'RecordReader':
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+    def close(self) -> None:
+        # Las vistas de memoria deben liberarse antes de cerrar el mmap
+        for seccion in self._secciones.values():
+            seccion.claves.release()
+            seccion.offsets.release()
+            seccion.longitudes.release()
+        self._secciones = {}
+        self._index.close()
+        self._index_file.close()
+        self._data.close()
+        self._data_file.close()
+
+    def count(self, section: str) -> int:
+        return self._secciones[section].n if section in self._secciones else 0
+
+    def get(self, section: str, record_id: str) -> Optional[Dict[str, Any]]:
+        """Registro de una sección ('tweets', 'users', 'places', 'sentimiento') por id, o None."""
+        seccion = self._secciones.get(section)
+        if seccion is None:
+            return None
+        for pos in seccion.posiciones(clave_id(record_id)):
+            offset = seccion.offsets[pos]
+            registro = json.loads(self._data[offset:offset + seccion.longitudes[pos]])
+            if str(registro.get('id', record_id)) == record_id:
+                return registro
+        return None
+
+    def get_many(self, section: str, record_ids: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+        """
+        Varios registros de una sección; se leen en orden de offset para aprovechar la localidad.
+
+        Returns:
+            {id: registro} solo con los ids encontrados
+        """
+        seccion = self._secciones.get(section)
+        if seccion is None:
+            return {}
+        candidatos = []
+        for record_id in dict.fromkeys(record_ids):
+            for pos in seccion.posiciones(clave_id(record_id)):
+                candidatos.append((seccion.offsets[pos], seccion.longitudes[pos], record_id))
+        candidatos.sort()
+
+        encontrados: Dict[str, Dict[str, Any]] = {}
+        for offset, longitud, record_id in candidatos:
+            if record_id in encontrados:
+                continue
+            registro = json.loads(self._data[offset:offset + longitud])
+            if str(registro.get('id', record_id)) == record_id:
+                encontrados[record_id] = registro
+        return encontrados
+
+    def recorrer(self, section: str) -> Iterator[Tuple[int, Dict[str, Any]]]:
+        """
+        Todos los registros de una sección como (offset, registro), uno a uno.
+
+        Se recorren en orden de clave, no de fichero; el offset permite
+        recuperar el orden original.
+        """
+        seccion = self._secciones.get(section)
+        if seccion is None:
+            return
+        for pos in range(seccion.n):
+            offset = seccion.offsets[pos]
+            yield offset, json.loads(self._data[offset:offset + seccion.longitudes[pos]])
+
+    def tweet(self, tweet_id: str) -> Optional[Dict[str, Any]]:
+        return self.get('tweets', tweet_id)
+
+    def user(self, user_id: str) -> Optional[Dict[str, Any]]:
+        return self.get('users', user_id)
+
+    def enriched(self, tweet_id: str) -> Optional[Dict[str, Any]]:
+        return self.get('sentimiento', tweet_id)
+
+
+def verificar_indice(dataset_path: str, index_path: Optional[str] = None) -> Dict[str, int]:
+    """
+    Comprueba que cada registro del dataset se recupera idéntico a través del índice.
+
+    Returns:
+        {sección: registros verificados}
+
+    Raises:
+        AssertionError: Si algún registro falta o difiere
+    """
+    with open(dataset_path, 'r', encoding='utf-8') as f:
+        dataset = json.load(f)
+    verificados: Dict[str, int] = {}
+    with RecordReader(dataset_path, index_path) as reader:
+        for clave, seccion in SECCIONES_LISTA.items():
+            for registro in dataset.get(clave) or []:
+                if reader.get(seccion, str(registro['id'])) != registro:
+                    raise AssertionError(f"{seccion}/{registro['id']} no coincide en {dataset_path}")
+                verificados[seccion] = verificados.get(seccion, 0) + 1
+        for clave, seccion in SECCIONES_OBJETO.items():
+            for record_id, registro in (dataset.get(clave) or {}).items():
+                if reader.get(seccion, record_id) != registro:
+                    raise AssertionError(f"{seccion}/{record_id} no coincide en {dataset_path}")
+                verificados[seccion] = verificados.get(seccion, 0) + 1
+    return verificados
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """Función principal: build / get / bench / verify."""
+    parser = argparse.ArgumentParser(description='Índice de offsets para acceso aleatorio a dataset.json')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    p_build = sub.add_parser('build', help='Construir el índice')
+    p_build.add_argument('dataset')
+
+    p_get = sub.add_parser('get', help='Leer registros por id')
+    p_get.add_argument('dataset')
+    p_get.add_argument('section', choices=('tweets', 'users', 'places', 'sentimiento'))
+    p_get.add_argument('ids', nargs='+')
+
+    p_bench = sub.add_parser('bench', help='Comparar con json.load completo')
+    p_bench.add_argument('dataset')
+    p_bench.add_argument('--lookups', type=int, default=1000)
+
+    p_verify = sub.add_parser('verify', help='Comprobar todos los registros contra json.load')
+    p_verify.add_argument('dataset')
+    p_verify.add_argument('--crlf', action='store_true', help='Repetir sobre una copia con finales de línea CRLF')
+
+    args = parser.parse_args(argv)
+
+    if args.command == 'build':
+        inicio = time.perf_counter()
+        path = build_record_index(args.dataset)
+        print(f"✓ Índice guardado en {path} ({time.perf_counter() - inicio:.2f}s)")
+
+    elif args.command == 'get':
+        with RecordReader(args.dataset) as reader:
+            for registro in reader.get_many(args.section, args.ids).values():
+                print(json.dumps(registro, ensure_ascii=False, indent=2))
+
+    elif args.command == 'bench':
+        inicio = time.perf_counter()
+        with open(args.dataset, 'r', encoding='utf-8') as f:
+            dataset = json.load(f)
+        t_load = time.perf_counter() - inicio
+        ids = random.sample([t['id'] for t in dataset['tweets']], min(args.lookups, len(dataset['tweets'])))
+        del dataset
+
+        inicio = time.perf_counter()
+        reader = RecordReader(args.dataset)
+        t_open = time.perf_counter() - inicio
+
+        inicio = time.perf_counter()
+        for tweet_id in ids:
+            if reader.tweet(tweet_id) is None:
+                raise AssertionError(f"Tweet {tweet_id} no encontrado")
+        t_lookup = (time.perf_counter() - inicio) * 1e6 / len(ids)
+        reader.close()
+
+        print(f"json.load completo:        {t_load * 1000:>10.1f} ms")
+        print(f"Abrir índice (mmap):       {t_open * 1000:>10.1f} ms")
+        print(f"Búsqueda por id (media):   {t_lookup:>10.1f} µs")
+
+    elif args.command == 'verify':
+        casos = [('original', args.dataset)]
+        with tempfile.TemporaryDirectory() as tmp:
+            if args.crlf:
+                copia = os.path.join(tmp, 'dataset.crlf.json')
+                with open(args.dataset, 'rb') as f:
+                    contenido = f.read().replace(b'\r\n', b'\n').replace(b'\n', b'\r\n')
+                with open(copia, 'wb') as f:
+                    f.write(contenido)
+                casos.append(('CRLF', copia))
+            for nombre, path in casos:
+                verificados = verificar_indice(path)
+                detalle = ', '.join(f"{n} {s}" for s, n in verificados.items())
+                print(f"✓ {nombre}: {detalle}")
+
+
+if __name__ == '__main__':
+    main()
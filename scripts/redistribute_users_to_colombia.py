@@ -37,13 +37,15 @@ MAJOR_CITIES = [
     {'name': 'Ibagué', 'lat': 4.4389, 'lon': -75.2322, 'weight': 3},
 ]
 
-def generate_coordinates_near_city(city: Dict[str, Any], radius_deg: float = 0.5) -> Tuple[float, float]:
+def generate_coordinates_near_city(city: Dict[str, Any], radius_deg: float = 0.5,
+                                   rng: random.Random = random) -> Tuple[float, float]:
     """
     Genera coordenadas aleatorias cerca de una ciudad específica usando distribución circular.
     
     Args:
         city: Diccionario con información de la ciudad (lat, lon, weight)
         radius_deg: Radio en grados para dispersión (aprox. 55km por 0.5 grados)
+        rng: Generador aleatorio (por defecto el módulo random global)
     
     Returns:
         Tupla (latitud, longitud)
@@ -51,11 +53,11 @@ def generate_coordinates_near_city(city: Dict[str, Any], radius_deg: float = 0.5
     import math
     
     # Generar ángulo completamente aleatorio (0 a 360 grados)
-    angle = random.uniform(0, 2 * math.pi)
+    angle = rng.uniform(0, 2 * math.pi)
     
     # Usar raíz cuadrada para distribución uniforme en círculo
     # Esto evita concentración en el centro
-    distance = math.sqrt(random.uniform(0, 1)) * radius_deg
+    distance = math.sqrt(rng.uniform(0, 1)) * radius_deg
     
     # Calcular offset en latitud y longitud
     lat_offset = distance * math.cos(angle)
@@ -73,30 +75,33 @@ def generate_coordinates_near_city(city: Dict[str, Any], radius_deg: float = 0.5
     
     return lat, lon
 
-def generate_random_coordinates_in_colombia() -> Tuple[float, float]:
+def generate_random_coordinates_in_colombia(rng: random.Random = random) -> Tuple[float, float]:
     """
     Genera coordenadas aleatorias dentro de Colombia.
     
     70% cerca de ciudades principales
     30% distribuido aleatoriamente en el país
     
+    Args:
+        rng: Generador aleatorio (por defecto el módulo random global)
+    
     Returns:
         Tupla (latitud, longitud)
     """
-    if random.random() < 0.7:
+    if rng.random() < 0.7:
         # Seleccionar ciudad basada en peso
         total_weight = sum(city['weight'] for city in MAJOR_CITIES)
-        rand_val = random.uniform(0, total_weight)
+        rand_val = rng.uniform(0, total_weight)
         current_sum = 0
         
         for city in MAJOR_CITIES:
             current_sum += city['weight']
             if rand_val <= current_sum:
-                return generate_coordinates_near_city(city)
+                return generate_coordinates_near_city(city, rng=rng)
     
     # Distribución aleatoria en todo el país
-    lat = random.uniform(COLOMBIA_BOUNDS['lat_min'], COLOMBIA_BOUNDS['lat_max'])
-    lon = random.uniform(COLOMBIA_BOUNDS['lon_min'], COLOMBIA_BOUNDS['lon_max'])
+    lat = rng.uniform(COLOMBIA_BOUNDS['lat_min'], COLOMBIA_BOUNDS['lat_max'])
+    lon = rng.uniform(COLOMBIA_BOUNDS['lon_min'], COLOMBIA_BOUNDS['lon_max'])
     
     return lat, lon
 
@@ -139,7 +144,6 @@ def main():
     """Función principal para ejecutar la redistribución."""
     input_file = '../public/data/dataset.json'
     output_file = '../public/data/dataset.json'
-    backup_file = '../public/data/dataset_backup_original.json'
     
     print("=" * 60)
     print("REDISTRIBUCIÓN DE USUARIOS GEOREFERENCIADOS A COLOMBIA")
@@ -159,14 +163,16 @@ def main():
         print(f"   ✗ Error al parsear JSON: {e}")
         return
     
-    # Crear backup
-    print("\n2. Creando backup del dataset original...")
+    # Registrar la versión original como snapshot (base completa solo la primera vez)
+    print("\n2. Registrando versión original en snapshots...")
+    from dataset_snapshots import SnapshotStore, snapshot_dir_for
     try:
-        with open(backup_file, 'w', encoding='utf-8') as f:
-            json.dump(dataset, f, ensure_ascii=False, indent=2)
-        print(f"   ✓ Backup guardado en: {backup_file}")
+        store = SnapshotStore(snapshot_dir_for(input_file))
+        store.commit(dataset, "Antes de redistribuir usuarios")
+        original_version = store.latest()['version']
+        print(f"   ✓ Versión original: {original_version}")
     except Exception as e:
-        print(f"   ✗ Error al crear backup: {e}")
+        print(f"   ✗ Error al registrar snapshot: {e}")
         return
     
     # Redistribuir usuarios
@@ -183,13 +189,25 @@ def main():
         print(f"   ✗ Error al guardar dataset: {e}")
         return
     
+    # Guardar solo el delta (coordenadas cambiadas) como nueva versión
+    entry = store.commit(dataset_modified, "Usuarios redistribuidos a Colombia")
+    if entry is not None:
+        print(f"   ✓ Parche de la versión {entry['version']}: {entry['bytes'] / 1024:.1f} KB")
+    
+    # Reconstruir el índice espacial que acompaña al dataset
+    print("\n5. Construyendo índice espacial de usuarios...")
+    from spatial_index import build_for_dataset
+    index_file = build_for_dataset(dataset_modified, output_file)
+    print(f"   ✓ Índice guardado en: {index_file}")
+    
     print("\n" + "=" * 60)
     print("REDISTRIBUCIÓN COMPLETADA EXITOSAMENTE")
     print("=" * 60)
     print("\nNotas:")
     print("- 70% de usuarios distribuidos cerca de ciudades principales")
     print("- 30% de usuarios distribuidos aleatoriamente en Colombia")
-    print(f"- Backup original guardado en: {backup_file}")
+    print(f"- Versión original en snapshots: {original_version} "
+          f"(restaurar con: python dataset_snapshots.py rollback {input_file} {original_version})")
     print("\nCiudades principales consideradas:")
     for city in MAJOR_CITIES[:5]:
         print(f"  • {city['name']} (peso: {city['weight']}%)")
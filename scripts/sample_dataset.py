@@ -0,0 +1,279 @@
+"""
+Muestreo estratificado del dataset para niveles de desarrollo y preview
+
+Produce muestras pequeñas (por defecto 1 % y 10 %) de dataset.json en una sola
+pasada sobre los tweets, conservando la distribución conjunta de:
+
+- sentimiento (registro de "sentimiento" del tweet)
+- ciudad del autor (user.location si es una de CIUDADES / MAJOR_CITIES, si no "Otra")
+- franja temporal de 6 horas de created_at
+- autor verificado o no
+
+Cada tweet recibe una prioridad pseudoaleatoria determinista (hash del id).
+Dentro de cada estrato se eligen los tweets con menor prioridad y el tamaño de
+cada estrato se reparte por redondeo sistemático, así que cada estrato recibe
+en promedio exactamente su cuota y la muestra del 1 % está contenida en la del
+10 %.
+
+La pasada no carga dataset.json: recorre los tweets uno a uno a través del
+índice de offsets de record_index (que se construye si falta) y busca el
+sentimiento de cada tweet y el autor por id. En memoria quedan los conteos por
+estrato, los candidatos con prioridad baja (más el mínimo de cada estrato) y la
+ciudad y verificación de cada autor visto; las muestras se completan después
+leyendo solo sus autores y registros de sentimiento.
+
+Las muestras mantienen la integridad referencial: incluyen los autores y los
+registros de sentimiento de todos los tweets elegidos. El informe compara las
+marginales de cada nivel con las del dataset completo.
+
+Uso:
+    python scripts/sample_dataset.py public/data/dataset.json --tiers 0.01 0.1
+"""
+
+import argparse
+import hashlib
+import heapq
+import json
+import math
+import os
+from collections import Counter, defaultdict
+from typing import Dict, Any, List, Iterable, Optional, Tuple
+
+from generate_mock_data import CIUDADES
+from record_index import RecordReader
+from redistribute_users_to_colombia import MAJOR_CITIES
+
+CIUDADES_CONOCIDAS = set(CIUDADES) | {c['name'] for c in MAJOR_CITIES}
+
+DIMENSIONES = ('sentiment', 'city', 'time_bucket', 'verified')
+
+# Margen sobre la tasa máxima para los candidatos que se conservan durante la pasada
+_HOLGURA = 2.0
+# Candidatos mínimos por estrato, para estratos pequeños donde el margen no basta
+_MINIMO_ESTRATO = 32
+
+
+def _prioridad(tweet_id: str, seed: int) -> float:
+    """Prioridad uniforme en [0, 1) determinista para un id."""
+    digest = hashlib.blake2b(f"{seed}:{tweet_id}".encode('utf-8'), digest_size=8).digest()
+    return int.from_bytes(digest, 'big') / 2 ** 64
+
+
+def _franja(created_at: str) -> str:
+    """Franja de 6 horas: '2025-11-12T00', '2025-11-12T06', ..."""
+    if len(created_at) < 13:
+        return 'desconocida'
+    return f"{created_at[:10]}T{int(created_at[11:13]) // 6 * 6:02d}"
+
+
+def _perfil(user: Optional[Dict[str, Any]]) -> Tuple[str, str]:
+    """Dimensiones que dependen del autor: (ciudad, verificado)."""
+    ubicacion = (user or {}).get('location')
+    return (
+        ubicacion if ubicacion in CIUDADES_CONOCIDAS else 'Otra',
+        'verificado' if (user or {}).get('verified') else 'no_verificado',
+    )
+
+
+def estrato(tweet: Dict[str, Any], user: Optional[Dict[str, Any]], enriched: Optional[Dict[str, Any]]) -> Tuple[str, ...]:
+    """Clave de estrato (sentimiento, ciudad, franja, verificado) de un tweet."""
+    ciudad, verificado = _perfil(user)
+    return (
+        (enriched or {}).get('sentiment', 'desconocido'),
+        ciudad,
+        _franja(tweet.get('created_at', '')),
+        verificado,
+    )
+
+
+def _asignar(conteos: Dict[Tuple[str, ...], int], tasa: float, seed: int = 42) -> Dict[Tuple[str, ...], int]:
+    """
+    Reparte ≈ tasa·N plazas entre estratos por redondeo sistemático.
+
+    Con cientos de estratos de pocos tweets (cuota < 1) el redondeo por restos
+    mayores sesga siempre contra los valores minoritarios. Aquí los estratos se
+    ordenan por sus claves y a cada uno le tocan floor(C_k + u) - floor(C_{k-1} + u)
+    plazas, con C_k la cuota acumulada y u un desplazamiento fijado por la
+    semilla: la asignación esperada de cada estrato es exactamente su cuota y
+    cualquier prefijo del orden (p. ej. cada sentimiento) queda a ±1 de la suya.
+    Con tasa <= 1 ningún estrato recibe más plazas que tweets.
+    """
+    u = _prioridad(f'asignacion:{tasa}', seed)
+    asignacion = {}
+    acumulado = 0.0
+    anterior = math.floor(u)
+    for clave in sorted(conteos):
+        acumulado += tasa * conteos[clave]
+        actual = math.floor(acumulado + u)
+        asignacion[clave] = actual - anterior
+        anterior = actual
+    return asignacion
+
+
+def muestrear(reader: RecordReader, tasas: Iterable[float],
+              seed: int = 42) -> Tuple[Dict[float, List[Dict[str, Any]]], Counter]:
+    """
+    Selecciona los tweets de cada nivel en una sola pasada sobre el índice.
+
+    Returns:
+        ({tasa: [tweets elegidos en el orden original]}, tweets por estrato)
+    """
+    tasas = sorted(set(tasas))
+    umbral = min(1.0, max(tasas) * _HOLGURA + 0.001)
+    # (ciudad, verificado) de cada autor visto, para no releer su registro
+    perfiles: Dict[str, Tuple[str, str]] = {}
+
+    conteos: Counter = Counter()
+    # (prioridad, offset, id): el offset en el fichero da el orden original
+    candidatos: Dict[Tuple[str, ...], List[Tuple[float, int, str]]] = defaultdict(list)
+    # Montículo de máximos (prioridades negadas) con los menores por encima del umbral
+    reserva: Dict[Tuple[str, ...], List[Tuple[float, int, str]]] = defaultdict(list)
+
+    for offset, tweet in reader.recorrer('tweets'):
+        tweet_id, author_id = str(tweet['id']), tweet['author_id']
+        if author_id not in perfiles:
+            perfiles[author_id] = _perfil(reader.get('users', author_id))
+        ciudad, verificado = perfiles[author_id]
+        # El índice guarda "enriched_tweets" también como "sentimiento"
+        clave = (
+            (reader.get('sentimiento', tweet_id) or {}).get('sentiment', 'desconocido'),
+            ciudad,
+            _franja(tweet.get('created_at', '')),
+            verificado,
+        )
+        conteos[clave] += 1
+        prioridad = _prioridad(tweet_id, seed)
+        if prioridad < umbral:
+            candidatos[clave].append((prioridad, offset, tweet_id))
+        elif len(candidatos[clave]) < _MINIMO_ESTRATO:
+            heap = reserva[clave]
+            if len(heap) < _MINIMO_ESTRATO:
+                heapq.heappush(heap, (-prioridad, offset, tweet_id))
+            elif -heap[0][0] > prioridad:
+                heapq.heapreplace(heap, (-prioridad, offset, tweet_id))
+
+    # Candidatos de cada estrato ordenados por prioridad
+    ordenados = {
+        clave: sorted(candidatos.get(clave, [])) + sorted((-p, off, i) for p, off, i in reserva.get(clave, []))
+        for clave in conteos
+    }
+
+    # Cada nivel se submuestrea del inmediatamente mayor para que queden anidados
+    resultado = {}
+    base, tasa_base = dict(conteos), 1.0
+    for tasa in reversed(tasas):
+        asignacion = _asignar(base, tasa / tasa_base, seed)
+        base, tasa_base = asignacion, tasa
+        elegidos: List[Tuple[float, int, str]] = []
+        faltantes = 0
+        sobrantes: List[Tuple[float, int, str]] = []
+        for clave, plazas in asignacion.items():
+            disponibles = ordenados[clave]
+            elegidos.extend(disponibles[:plazas])
+            faltantes += max(0, plazas - len(disponibles))
+            sobrantes.extend(disponibles[plazas:])
+        # Si algún estrato no tenía candidatos suficientes, se completa con los de menor prioridad global
+        elegidos.extend(sorted(sobrantes)[:faltantes])
+        elegidos.sort(key=lambda c: c[1])
+        tweets = reader.get_many('tweets', [tweet_id for _, _, tweet_id in elegidos])
+        resultado[tasa] = [tweets[tweet_id] for _, _, tweet_id in elegidos]
+    return resultado, conteos
+
+
+def construir_muestra(reader: RecordReader, tweets: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Dataset de muestra con los tweets elegidos, sus autores y sus registros de sentimiento."""
+    ids = [str(t['id']) for t in tweets]
+    enriched = reader.get_many('sentimiento', ids)
+    return {
+        "tweets": tweets,
+        "users": reader.get_many('users', [t['author_id'] for t in tweets]),
+        "places": {str(place['id']): place for _, place in reader.recorrer('places')},
+        "sentimiento": [enriched[i] for i in ids if i in enriched],
+    }
+
+
+def marginales_estratos(conteos: Dict[Tuple[str, ...], int]) -> Dict[str, Dict[str, float]]:
+    """Proporción de tweets por valor en cada dimensión, a partir de los tweets por estrato."""
+    total = sum(conteos.values())
+    por_dimension = {dim: Counter() for dim in DIMENSIONES}
+    for clave, n in conteos.items():
+        for dim, valor in zip(DIMENSIONES, clave):
+            por_dimension[dim][valor] += n
+    return {dim: {v: n / total for v, n in c.items()} for dim, c in por_dimension.items()} if total else {}
+
+
+def marginales(dataset: Dict[str, Any]) -> Dict[str, Dict[str, float]]:
+    """Proporción de tweets por valor en cada dimensión de estratificación."""
+    users = dataset.get('users', {})
+    enriched = {e['id']: e for e in (dataset.get('sentimiento') or dataset.get('enriched_tweets') or [])}
+    return marginales_estratos(Counter(
+        estrato(tweet, users.get(tweet['author_id']), enriched.get(tweet['id']))
+        for tweet in dataset.get('tweets', [])
+    ))
+
+
+def informe(completo: Dict[str, Dict[str, float]], muestra: Dict[str, Dict[str, float]]) -> Dict[str, Any]:
+    """Distancia de variación total y máxima diferencia absoluta por dimensión."""
+    resultado = {}
+    for dim in DIMENSIONES:
+        a, b = completo.get(dim, {}), muestra.get(dim, {})
+        diferencias = {v: b.get(v, 0.0) - a.get(v, 0.0) for v in set(a) | set(b)}
+        resultado[dim] = {
+            'tvd': sum(abs(d) for d in diferencias.values()) / 2,
+            'max_abs_diff': max((abs(d) for d in diferencias.values()), default=0.0),
+            'full': a,
+            'sample': b,
+        }
+    return resultado
+
+
+def _sufijo(tasa: float) -> str:
+    return f"{tasa * 100:g}pct".replace('.', '_')
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """Función principal para generar los niveles de muestra."""
+    parser = argparse.ArgumentParser(description='Muestreo estratificado del dataset')
+    parser.add_argument('dataset')
+    parser.add_argument('--tiers', type=float, nargs='+', default=[0.01, 0.1], help='Tasas de muestreo')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output-dir', default=None, help='Directorio de salida (por defecto el del dataset)')
+    args = parser.parse_args(argv)
+
+    salida = args.output_dir or os.path.dirname(args.dataset) or '.'
+    base = os.path.splitext(os.path.basename(args.dataset))[0]
+    reader = RecordReader(args.dataset)
+    reporte: Dict[str, Any] = {'source': args.dataset, 'tweets': reader.count('tweets'), 'tiers': {}}
+
+    print(f"Muestreando {reporte['tweets']} tweets...")
+    niveles, conteos = muestrear(reader, args.tiers, args.seed)
+    completo = marginales_estratos(conteos)
+    for tasa, tweets in niveles.items():
+        muestra = construir_muestra(reader, tweets)
+        path = os.path.join(salida, f"{base}.sample-{_sufijo(tasa)}.json")
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(muestra, f, ensure_ascii=False, indent=2)
+
+        comparacion = informe(completo, marginales(muestra))
+        reporte['tiers'][_sufijo(tasa)] = {
+            'rate': tasa,
+            'path': path,
+            'tweets': len(muestra['tweets']),
+            'users': len(muestra['users']),
+            'sentimiento': len(muestra['sentimiento']),
+            'marginals': comparacion,
+        }
+        print(f"\n✓ Nivel {tasa:.0%}: {len(muestra['tweets'])} tweets, {len(muestra['users'])} usuarios -> {path}")
+        for dim in DIMENSIONES:
+            print(f"   {dim:<12} TVD {comparacion[dim]['tvd']:.4f}  máx. dif. {comparacion[dim]['max_abs_diff']:.4f}")
+
+    reader.close()
+
+    reporte_path = os.path.join(salida, f"{base}.sample-report.json")
+    with open(reporte_path, 'w', encoding='utf-8') as f:
+        json.dump(reporte, f, ensure_ascii=False, indent=2)
+    print(f"\n📊 Informe guardado en {reporte_path}")
+
+
+if __name__ == '__main__':
+    main()
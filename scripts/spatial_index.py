@@ -0,0 +1,424 @@
+"""
+Índice espacial KD-tree sobre las coordenadas de usuarios
+
+Construye una sola vez un KD-tree balanceado a partir de user.geo (x = longitud,
+y = latitud) y permite consultas por radio ("usuarios a menos de 20 km de
+Medellín"), k vecinos más cercanos y caja de latitud/longitud, sin recorrer
+linealmente todos los usuarios.
+
+Los puntos se proyectan a vectores unitarios 3D sobre la esfera: la distancia
+euclídea (cuerda) es monótona con la distancia de gran círculo, así que las
+consultas por radio y kNN son exactas en km, sin distorsión por latitud.
+
+El árbol es implícito: los puntos se reordenan de forma que el nodo del rango
+[lo, hi) tiene su mediana en mid = (lo + hi) // 2 y sus hijos en [lo, mid) y
+[mid + 1, hi). Se serializa en binario junto al dataset (dataset.spatial.bin).
+
+Uso:
+    python scripts/spatial_index.py build public/data/dataset.json
+    python scripts/spatial_index.py query public/data/dataset.spatial.bin --lat 6.2442 --lon -75.5812 --radius 20
+    python scripts/spatial_index.py bench --users 1000000
+"""
+
+import argparse
+import heapq
+import json
+import math
+import os
+import random
+import struct
+import time
+from array import array
+from typing import Dict, Any, List, Iterable, Optional, Tuple
+
+from redistribute_users_to_colombia import MAJOR_CITIES, generate_random_coordinates_in_colombia
+
+EARTH_RADIUS_KM = 6371.0088
+
+_MAGIC = b'SPIX1'
+
+
+def _to_xyz(lat: float, lon: float) -> Tuple[float, float, float]:
+    """Convierte (lat, lon) en grados a vector unitario 3D."""
+    phi = math.radians(lat)
+    lam = math.radians(lon)
+    cos_phi = math.cos(phi)
+    return cos_phi * math.cos(lam), cos_phi * math.sin(lam), math.sin(phi)
+
+
+def _chord_to_km(chord: float) -> float:
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, chord / 2))
+
+
+def _km_to_chord(km: float) -> float:
+    return 2 * math.sin(min(math.pi, km / EARTH_RADIUS_KM) / 2)
+
+
+def haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """Distancia de gran círculo en km."""
+    p1, p2 = math.radians(lat1), math.radians(lat2)
+    dp = p2 - p1
+    dl = math.radians(lon2 - lon1)
+    a = math.sin(dp / 2) ** 2 + math.cos(p1) * math.cos(p2) * math.sin(dl / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def _range_extrema(f, lo: float, hi: float, criticos: Iterable[float]) -> Tuple[float, float]:
+    """Mínimo y máximo de una función trigonométrica en [lo, hi] evaluando bordes y puntos críticos."""
+    valores = [f(lo), f(hi)] + [f(c) for c in criticos if lo < c < hi]
+    return min(valores), max(valores)
+
+
+class SpatialIndex:
+    """
+    KD-tree implícito sobre vectores unitarios 3D.
+
+    Args:
+        ids: Identificadores de usuario
+        lats: Latitudes en grados
+        lons: Longitudes en grados
+        leaf_size: Puntos máximos por hoja (se recorren linealmente)
+    """
+
+    def __init__(self, ids: List[str], lats: Iterable[float], lons: Iterable[float], leaf_size: int = 16):
+        self.leaf_size = leaf_size
+        lats = array('d', lats)
+        lons = array('d', lons)
+        xyz = [_to_xyz(lat, lon) for lat, lon in zip(lats, lons)]
+        xs = array('d', (p[0] for p in xyz))
+        ys = array('d', (p[1] for p in xyz))
+        zs = array('d', (p[2] for p in xyz))
+
+        order, self.split = self._build((xs, ys, zs), leaf_size)
+
+        self.ids = [ids[i] for i in order]
+        self.lats = array('d', (lats[i] for i in order))
+        self.lons = array('d', (lons[i] for i in order))
+        self.xs = array('d', (xs[i] for i in order))
+        self.ys = array('d', (ys[i] for i in order))
+        self.zs = array('d', (zs[i] for i in order))
+
+    @staticmethod
+    def _build(coords: Tuple[array, array, array], leaf_size: int) -> Tuple[List[int], bytearray]:
+        """
+        Ordena los puntos en forma de árbol implícito.
+
+        En cada nodo se divide por el eje de mayor dispersión; split[mid] guarda ese eje.
+        """
+        n = len(coords[0])
+        order = list(range(n))
+        split = bytearray(n)
+        stack = [(0, n)]
+        while stack:
+            lo, hi = stack.pop()
+            if hi - lo <= leaf_size:
+                continue
+            seg = order[lo:hi]
+            best_dim, best_spread = 0, -1.0
+            for dim, c in enumerate(coords):
+                valores = [c[i] for i in seg]
+                spread = max(valores) - min(valores)
+                if spread > best_spread:
+                    best_dim, best_spread = dim, spread
+            seg.sort(key=coords[best_dim].__getitem__)
+            order[lo:hi] = seg
+            mid = (lo + hi) // 2
+            split[mid] = best_dim
+            stack.append((lo, mid))
+            stack.append((mid + 1, hi))
+        return order, split
+
+    @classmethod
+    def from_users(cls, users: Dict[str, Dict[str, Any]], leaf_size: int = 16) -> 'SpatialIndex':
+        """Construye el índice con los usuarios del dataset que tienen geo."""
+        ids, lats, lons = [], [], []
+        for user_id, user in users.items():
+            geo = user.get('geo')
+            if isinstance(geo, dict) and 'x' in geo and 'y' in geo:
+                ids.append(user_id)
+                lats.append(geo['y'])
+                lons.append(geo['x'])
+        return cls(ids, lats, lons, leaf_size)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def _box_positions(self, qmin: Tuple[float, ...], qmax: Tuple[float, ...]) -> List[int]:
+        """Posiciones de los puntos dentro de la caja 3D [qmin, qmax]."""
+        coords = (self.xs, self.ys, self.zs)
+        xs, ys, zs = coords
+        x0, y0, z0 = qmin
+        x1, y1, z1 = qmax
+        leaf = self.leaf_size
+        out = []
+        stack = [(0, len(self.ids))]
+        while stack:
+            lo, hi = stack.pop()
+            if hi - lo <= leaf:
+                for i in range(lo, hi):
+                    if x0 <= xs[i] <= x1 and y0 <= ys[i] <= y1 and z0 <= zs[i] <= z1:
+                        out.append(i)
+                continue
+            mid = (lo + hi) // 2
+            if x0 <= xs[mid] <= x1 and y0 <= ys[mid] <= y1 and z0 <= zs[mid] <= z1:
+                out.append(mid)
+            dim = self.split[mid]
+            c = coords[dim][mid]
+            if qmin[dim] <= c:
+                stack.append((lo, mid))
+            if qmax[dim] >= c:
+                stack.append((mid + 1, hi))
+        return out
+
+    def within_radius(self, lat: float, lon: float, radius_km: float) -> List[Tuple[str, float]]:
+        """
+        Usuarios a menos de radius_km del punto, ordenados por distancia.
+
+        Returns:
+            Lista de (user_id, distancia_km)
+        """
+        qx, qy, qz = _to_xyz(lat, lon)
+        r = _km_to_chord(radius_km)
+        r2 = r * r
+        candidatos = self._box_positions((qx - r, qy - r, qz - r), (qx + r, qy + r, qz + r))
+        resultado = []
+        for i in candidatos:
+            d2 = (self.xs[i] - qx) ** 2 + (self.ys[i] - qy) ** 2 + (self.zs[i] - qz) ** 2
+            if d2 <= r2:
+                resultado.append((self.ids[i], _chord_to_km(math.sqrt(d2))))
+        resultado.sort(key=lambda item: item[1])
+        return resultado
+
+    def nearest(self, lat: float, lon: float, k: int = 10) -> List[Tuple[str, float]]:
+        """
+        Los k usuarios más cercanos al punto.
+
+        Returns:
+            Lista de (user_id, distancia_km) ordenada de menor a mayor distancia
+        """
+        if k <= 0 or not self.ids:
+            return []
+        q = _to_xyz(lat, lon)
+        qx, qy, qz = q
+        coords = (self.xs, self.ys, self.zs)
+        xs, ys, zs = coords
+        leaf = self.leaf_size
+        heap: List[Tuple[float, int]] = []  # max-heap por -d2
+
+        def considerar(i: int) -> None:
+            d2 = (xs[i] - qx) ** 2 + (ys[i] - qy) ** 2 + (zs[i] - qz) ** 2
+            if len(heap) < k:
+                heapq.heappush(heap, (-d2, i))
+            elif d2 < -heap[0][0]:
+                heapq.heapreplace(heap, (-d2, i))
+
+        def visitar(lo: int, hi: int) -> None:
+            if hi - lo <= leaf:
+                for i in range(lo, hi):
+                    considerar(i)
+                return
+            mid = (lo + hi) // 2
+            considerar(mid)
+            dim = self.split[mid]
+            diff = q[dim] - coords[dim][mid]
+            if diff < 0:
+                primero, segundo = (lo, mid), (mid + 1, hi)
+            else:
+                primero, segundo = (mid + 1, hi), (lo, mid)
+            visitar(*primero)
+            if len(heap) < k or diff * diff < -heap[0][0]:
+                visitar(*segundo)
+
+        visitar(0, len(self.ids))
+        return [(self.ids[i], _chord_to_km(math.sqrt(-neg))) for neg, i in sorted(heap, reverse=True)]
+
+    def in_bbox(self, lat_min: float, lat_max: float, lon_min: float, lon_max: float) -> List[str]:
+        """
+        Usuarios dentro de una caja de latitud/longitud (sin cruzar el antimeridiano).
+
+        La caja se convierte en su envolvente 3D para podar el árbol y luego se
+        filtra exactamente en grados.
+        """
+        phi0, phi1 = math.radians(lat_min), math.radians(lat_max)
+        lam0, lam1 = math.radians(lon_min), math.radians(lon_max)
+        cos_phi = _range_extrema(math.cos, phi0, phi1, (0.0,))
+        criticos = (-math.pi, -math.pi / 2, 0.0, math.pi / 2, math.pi)
+        cos_lam = _range_extrema(math.cos, lam0, lam1, criticos)
+        sin_lam = _range_extrema(math.sin, lam0, lam1, criticos)
+
+        # x = cos(phi)·cos(lam), y = cos(phi)·sin(lam); cos(phi) >= 0, así que los
+        # extremos del producto están en combinaciones de los extremos de cada factor
+        xs_ext = [a * b for a in cos_phi for b in cos_lam]
+        ys_ext = [a * b for a in cos_phi for b in sin_lam]
+        eps = 1e-12
+        qmin = (min(xs_ext) - eps, min(ys_ext) - eps, math.sin(phi0) - eps)
+        qmax = (max(xs_ext) + eps, max(ys_ext) + eps, math.sin(phi1) + eps)
+
+        return [
+            self.ids[i] for i in self._box_positions(qmin, qmax)
+            if lat_min <= self.lats[i] <= lat_max and lon_min <= self.lons[i] <= lon_max
+        ]
+
+    def save(self, path: str, source: Optional[str] = None) -> None:
+        """
+        Serializa el índice en binario.
+
+        Formato: magic, longitud de cabecera (uint32), cabecera JSON (ids y
+        metadatos del dataset de origen), arrays float64 lat/lon/x/y/z y split.
+        """
+        header: Dict[str, Any] = {'n': len(self.ids), 'leaf_size': self.leaf_size, 'ids': self.ids}
+        if source and os.path.exists(source):
+            st = os.stat(source)
+            header['source'] = {'path': os.path.basename(source), 'size': st.st_size, 'mtime_ns': st.st_mtime_ns}
+        header_bytes = json.dumps(header).encode('utf-8')
+        with open(path, 'wb') as f:
+            f.write(_MAGIC)
+            f.write(struct.pack('<I', len(header_bytes)))
+            f.write(header_bytes)
+            for arr in (self.lats, self.lons, self.xs, self.ys, self.zs):
+                arr.tofile(f)
+            f.write(self.split)
+
+    @classmethod
+    def load(cls, path: str) -> 'SpatialIndex':
+        """Carga un índice serializado con save() sin reconstruir el árbol."""
+        with open(path, 'rb') as f:
+            if f.read(len(_MAGIC)) != _MAGIC:
+                raise ValueError(f"{path} no es un índice espacial válido")
+            (header_len,) = struct.unpack('<I', f.read(4))
+            header = json.loads(f.read(header_len).decode('utf-8'))
+            n = header['n']
+            index = cls.__new__(cls)
+            index.leaf_size = header['leaf_size']
+            index.ids = header['ids']
+            index.source = header.get('source')
+            for name in ('lats', 'lons', 'xs', 'ys', 'zs'):
+                arr = array('d')
+                arr.fromfile(f, n)
+                setattr(index, name, arr)
+            index.split = bytearray(f.read(n))
+        return index
+
+    def is_stale(self, dataset_path: str) -> bool:
+        """True si el dataset cambió desde que se construyó el índice."""
+        source = getattr(self, 'source', None)
+        if not source or not os.path.exists(dataset_path):
+            return True
+        st = os.stat(dataset_path)
+        return st.st_size != source['size'] or st.st_mtime_ns != source['mtime_ns']
+
+
+def index_path_for(dataset_path: str) -> str:
+    """Ruta del índice que acompaña a un dataset (dataset.json -> dataset.spatial.bin)."""
+    base, _ = os.path.splitext(dataset_path)
+    return f"{base}.spatial.bin"
+
+
+def build_for_dataset(dataset: Dict[str, Any], dataset_path: str) -> str:
+    """Construye y guarda el índice de un dataset ya escrito en disco. Devuelve la ruta del índice."""
+    index = SpatialIndex.from_users(dataset.get('users', {}))
+    path = index_path_for(dataset_path)
+    index.save(path, source=dataset_path)
+    return path
+
+
+def benchmark(num_users: int = 1_000_000, consultas: int = 20, seed: int = 42) -> None:
+    """Compara el índice con el recorrido lineal sobre usuarios sintéticos en Colombia."""
+    rng = random.Random(seed)
+    print(f"Generando {num_users} usuarios sintéticos...")
+    puntos = [generate_random_coordinates_in_colombia(rng) for _ in range(num_users)]
+    ids = [str(i) for i in range(num_users)]
+    lats = [p[0] for p in puntos]
+    lons = [p[1] for p in puntos]
+
+    inicio = time.perf_counter()
+    index = SpatialIndex(ids, lats, lons)
+    print(f"✓ Índice construido en {time.perf_counter() - inicio:.2f}s")
+
+    centros = [(c['lat'], c['lon']) for c in MAJOR_CITIES]
+    centros = [centros[i % len(centros)] for i in range(consultas)]
+
+    def lineal_radio(lat: float, lon: float, km: float) -> int:
+        return sum(1 for la, lo in zip(lats, lons) if haversine_km(lat, lon, la, lo) <= km)
+
+    def lineal_knn(lat: float, lon: float, k: int) -> List[float]:
+        return heapq.nsmallest(k, (haversine_km(lat, lon, la, lo) for la, lo in zip(lats, lons)))
+
+    def lineal_bbox(lat: float, lon: float) -> int:
+        return sum(1 for la, lo in zip(lats, lons) if lat - 0.2 <= la <= lat + 0.2 and lon - 0.2 <= lo <= lon + 0.2)
+
+    casos = [
+        ('radio 20 km', lambda la, lo: len(index.within_radius(la, lo, 20)), lambda la, lo: lineal_radio(la, lo, 20)),
+        ('kNN k=10', lambda la, lo: [d for _, d in index.nearest(la, lo, 10)],
+         lambda la, lo: lineal_knn(la, lo, 10)),
+        ('caja ±0.2°', lambda la, lo: len(index.in_bbox(la - 0.2, la + 0.2, lo - 0.2, lo + 0.2)),
+         lambda la, lo: lineal_bbox(la, lo)),
+    ]
+
+    # El recorrido lineal es costoso: se mide sobre pocas consultas
+    muestras_lineal = centros[:3]
+    print(f"\n{'Consulta':<14} {'Índice (ms)':>12} {'Lineal (ms)':>12} {'Speedup':>10}")
+    for nombre, con_indice, lineal in casos:
+        inicio = time.perf_counter()
+        for lat, lon in centros:
+            con_indice(lat, lon)
+        t_index = (time.perf_counter() - inicio) * 1000 / len(centros)
+
+        inicio = time.perf_counter()
+        for lat, lon in muestras_lineal:
+            esperado = lineal(lat, lon)
+            obtenido = con_indice(lat, lon)
+            if isinstance(esperado, list):
+                iguales = all(math.isclose(a, b, abs_tol=1e-6) for a, b in zip(esperado, obtenido))
+            else:
+                iguales = esperado == obtenido
+            if not iguales:
+                raise AssertionError(f"Resultado distinto en {nombre} para ({lat}, {lon})")
+        t_lineal = (time.perf_counter() - inicio) * 1000 / len(muestras_lineal)
+
+        print(f"{nombre:<14} {t_index:>12.3f} {t_lineal:>12.1f} {t_lineal / t_index:>9.0f}x")
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """Función principal: build / query / bench."""
+    parser = argparse.ArgumentParser(description='Índice espacial KD-tree de usuarios')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    p_build = sub.add_parser('build', help='Construir el índice de un dataset')
+    p_build.add_argument('dataset')
+
+    p_query = sub.add_parser('query', help='Consultar un índice serializado')
+    p_query.add_argument('index')
+    p_query.add_argument('--lat', type=float, required=True)
+    p_query.add_argument('--lon', type=float, required=True)
+    p_query.add_argument('--radius', type=float, default=None, help='Radio en km')
+    p_query.add_argument('--k', type=int, default=10)
+
+    p_bench = sub.add_parser('bench', help='Comparar con el recorrido lineal')
+    p_bench.add_argument('--users', type=int, default=1_000_000)
+
+    args = parser.parse_args(argv)
+
+    if args.command == 'build':
+        with open(args.dataset, 'r', encoding='utf-8') as f:
+            dataset = json.load(f)
+        inicio = time.perf_counter()
+        path = build_for_dataset(dataset, args.dataset)
+        print(f"✓ Índice guardado en {path} ({time.perf_counter() - inicio:.2f}s)")
+
+    elif args.command == 'query':
+        index = SpatialIndex.load(args.index)
+        if args.radius is not None:
+            resultados = index.within_radius(args.lat, args.lon, args.radius)
+            print(f"{len(resultados)} usuarios a menos de {args.radius} km")
+        else:
+            resultados = index.nearest(args.lat, args.lon, args.k)
+        for user_id, km in resultados[:args.k]:
+            print(f"  {user_id}: {km:.2f} km")
+
+    elif args.command == 'bench':
+        benchmark(args.users)
+
+
+if __name__ == '__main__':
+    main()
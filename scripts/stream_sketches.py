@@ -0,0 +1,459 @@
+"""
+Agregados aproximados en streaming: top-K con Space-Saving y conteos distintos con HyperLogLog
+
+Sustituyen a los mapas hash exactos de getTopEntities, getTopUsers y
+calculateDatasetStats cuando los tweets llegan de forma continua (generar_dataset
+o la ingesta): se actualizan en una sola pasada, usan memoria fija y se pueden
+combinar entre shards.
+
+Para que la memoria siga acotada, los HyperLogLog por ciudad solo usan claves de
+CIUDADES / MAJOR_CITIES (el resto cae en "Otra") y los HyperLogLog por hora
+forman una ventana de las últimas ventana_horas horas; las más antiguas se
+descartan.
+
+Cotas de error:
+- SpaceSaving(capacity=k) sobre N eventos: cada conteo estimado c' cumple
+  c <= c' <= c + N/k, y todo elemento con frecuencia real > N/k está en el
+  resumen. El campo "error" de cada entrada acota la sobreestimación.
+- HyperLogLog(p): 2^p registros de un byte; error relativo típico
+  1.04 / sqrt(2^p) (p=12 -> ~1.6 %, 4 KB por contador).
+
+Uso:
+    python scripts/stream_sketches.py public/data/dataset.json
+"""
+
+import argparse
+import base64
+import hashlib
+import heapq
+import itertools
+import json
+import math
+import os
+import re
+from typing import Dict, Any, List, Hashable, Iterable, Optional, Tuple
+
+MENCION_RE = re.compile(r'@(\w{1,15})')
+
+# Horas que conserva users_by_hour por defecto (una semana, ~670 KB con p=12)
+VENTANA_HORAS = 168
+
+_ciudades_conocidas: Optional[Dict[str, str]] = None
+
+
+def _ciudad_canonica(ubicacion: str) -> str:
+    """
+    Reduce user.location a una ciudad conocida o a "Otra".
+
+    Compara sin mayúsculas la parte anterior a la primera coma ("Cali, Valle"
+    -> "Cali"). Las ciudades se importan al primer uso porque generate_mock_data
+    importa este módulo.
+    """
+    global _ciudades_conocidas
+    if _ciudades_conocidas is None:
+        from generate_mock_data import CIUDADES
+        from redistribute_users_to_colombia import MAJOR_CITIES
+        nombres = set(CIUDADES) | {c['name'] for c in MAJOR_CITIES}
+        _ciudades_conocidas = {n.casefold(): n for n in nombres}
+    return _ciudades_conocidas.get(ubicacion.split(',')[0].strip().casefold(), 'Otra')
+
+
+def _hash64(item: str) -> int:
+    return int.from_bytes(hashlib.blake2b(item.encode('utf-8'), digest_size=8).digest(), 'big')
+
+
+class SpaceSaving:
+    """
+    Resumen Space-Saving de los elementos más frecuentes.
+
+    El contador mínimo se localiza con un montículo perezoso de k entradas: como
+    los conteos solo crecen, una entrada desactualizada en la cima se reinserta
+    con su conteo actual. Cada actualización cuesta O(log k) amortizado.
+
+    Args:
+        capacity: Número de contadores (k); la sobreestimación máxima es N/k
+    """
+
+    def __init__(self, capacity: int = 256):
+        self.capacity = capacity
+        self.total = 0
+        self.counts: Dict[Hashable, int] = {}
+        self.errors: Dict[Hashable, int] = {}
+        # (conteo al insertar, desempate, elemento); el conteo puede haberse quedado atrás
+        self._heap: List[Tuple[int, int, Hashable]] = []
+        self._orden = itertools.count()
+
+    def _reconstruir_heap(self) -> None:
+        self._heap = [(count, next(self._orden), item) for item, count in self.counts.items()]
+        heapq.heapify(self._heap)
+
+    def _extraer_minimo(self) -> Hashable:
+        """Saca del montículo el elemento con menor conteo actual."""
+        heap = self._heap
+        while True:
+            count, _, item = heap[0]
+            actual = self.counts[item]
+            if actual == count:
+                heapq.heappop(heap)
+                return item
+            heapq.heapreplace(heap, (actual, next(self._orden), item))
+
+    def update(self, item: Hashable, weight: int = 1) -> None:
+        self.total += weight
+        if item in self.counts:
+            self.counts[item] += weight
+            return
+        if len(self.counts) < self.capacity:
+            self.counts[item] = weight
+            self.errors[item] = 0
+            heapq.heappush(self._heap, (weight, next(self._orden), item))
+            return
+        # Reemplaza el contador mínimo; el nuevo elemento hereda su valor como error
+        minimo = self._extraer_minimo()
+        min_count = self.counts.pop(minimo)
+        del self.errors[minimo]
+        self.counts[item] = min_count + weight
+        self.errors[item] = min_count
+        heapq.heappush(self._heap, (min_count + weight, next(self._orden), item))
+
+    def top(self, n: int = 10) -> List[Dict[str, Any]]:
+        """Los n elementos con mayor conteo estimado (count, error máximo y cota inferior)."""
+        ordenados = sorted(self.counts.items(), key=lambda kv: kv[1], reverse=True)[:n]
+        return [
+            {'item': item, 'count': count, 'error': self.errors[item], 'guaranteed': count - self.errors[item]}
+            for item, count in ordenados
+        ]
+
+    def merge(self, other: 'SpaceSaving') -> 'SpaceSaving':
+        """
+        Combina dos resúmenes (Agarwal et al., "Mergeable Summaries").
+
+        Un elemento ausente en un resumen lleno pudo tener hasta su conteo mínimo,
+        que se suma como conteo y como error; después se conservan los k mayores.
+        """
+        def minimo(s: 'SpaceSaving') -> int:
+            return min(s.counts.values()) if len(s.counts) >= s.capacity else 0
+
+        min_self, min_other = minimo(self), minimo(other)
+        merged = SpaceSaving(max(self.capacity, other.capacity))
+        merged.total = self.total + other.total
+        for item in set(self.counts) | set(other.counts):
+            count = self.counts.get(item, min_self) + other.counts.get(item, min_other)
+            error = self.errors.get(item, min_self) + other.errors.get(item, min_other)
+            merged.counts[item] = count
+            merged.errors[item] = error
+
+        if len(merged.counts) > merged.capacity:
+            conservar = sorted(merged.counts, key=merged.counts.__getitem__, reverse=True)[:merged.capacity]
+            merged.counts = {k: merged.counts[k] for k in conservar}
+            merged.errors = {k: merged.errors[k] for k in conservar}
+        merged._reconstruir_heap()
+        return merged
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'capacity': self.capacity,
+            'total': self.total,
+            'entries': [[item, self.counts[item], self.errors[item]] for item in self.counts],
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'SpaceSaving':
+        sketch = cls(data['capacity'])
+        sketch.total = data['total']
+        for item, count, error in data['entries']:
+            sketch.counts[item] = count
+            sketch.errors[item] = error
+        sketch._reconstruir_heap()
+        return sketch
+
+
+class HyperLogLog:
+    """
+    Estimador HyperLogLog de cardinalidad.
+
+    Args:
+        p: Bits de precisión (4-16); 2^p registros
+    """
+
+    def __init__(self, p: int = 12):
+        if not 4 <= p <= 16:
+            raise ValueError('p debe estar entre 4 y 16')
+        self.p = p
+        self.m = 1 << p
+        self.registers = bytearray(self.m)
+
+    def add(self, item: str) -> None:
+        h = _hash64(item)
+        idx = h >> (64 - self.p)
+        resto = h & ((1 << (64 - self.p)) - 1)
+        rank = (64 - self.p) - resto.bit_length() + 1
+        if rank > self.registers[idx]:
+            self.registers[idx] = rank
+
+    def count(self) -> int:
+        m = self.m
+        alpha = 0.7213 / (1 + 1.079 / m) if m >= 128 else {16: 0.673, 32: 0.697, 64: 0.709}[m]
+        estimate = alpha * m * m / sum(2.0 ** -r for r in self.registers)
+        ceros = self.registers.count(0)
+        # Corrección de rango pequeño: conteo lineal
+        if estimate <= 2.5 * m and ceros:
+            estimate = m * math.log(m / ceros)
+        return int(round(estimate))
+
+    @property
+    def relative_error(self) -> float:
+        return 1.04 / math.sqrt(self.m)
+
+    def copy(self) -> 'HyperLogLog':
+        sketch = HyperLogLog(self.p)
+        sketch.registers = bytearray(self.registers)
+        return sketch
+
+    def merge(self, other: 'HyperLogLog') -> 'HyperLogLog':
+        if other.p != self.p:
+            raise ValueError('Solo se pueden combinar HyperLogLog con la misma precisión')
+        merged = HyperLogLog(self.p)
+        merged.registers = bytearray(max(a, b) for a, b in zip(self.registers, other.registers))
+        return merged
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {'p': self.p, 'registers': base64.b64encode(bytes(self.registers)).decode('ascii')}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'HyperLogLog':
+        sketch = cls(data['p'])
+        sketch.registers = bytearray(base64.b64decode(data['registers']))
+        return sketch
+
+
+def _merge_hll_maps(a: Dict[str, HyperLogLog], b: Dict[str, HyperLogLog]) -> Dict[str, HyperLogLog]:
+    """Une dos mapas clave -> HyperLogLog sin compartir registros con las entradas."""
+    merged = {key: sketch.copy() for key, sketch in a.items()}
+    for key, sketch in b.items():
+        merged[key] = merged[key].merge(sketch) if key in merged else sketch.copy()
+    return merged
+
+
+def _recortar_horas(por_hora: Dict[str, HyperLogLog], ventana_horas: int) -> Dict[str, HyperLogLog]:
+    """Conserva las ventana_horas horas más recientes (las claves ISO ordenan cronológicamente)."""
+    if len(por_hora) <= ventana_horas:
+        return por_hora
+    return {h: por_hora[h] for h in sorted(por_hora)[-ventana_horas:]}
+
+
+class StreamSketches:
+    """
+    Conjunto de sketches que se alimenta tweet a tweet.
+
+    - Top-K de entidades, autores y usuarios mencionados (Space-Saving)
+    - Usuarios distintos globales, por hora (created_at[:13]) y por ciudad (HyperLogLog)
+
+    Args:
+        capacity: Contadores por resumen top-K
+        p: Precisión de cada HyperLogLog
+        ventana_horas: Horas más recientes que conserva users_by_hour
+    """
+
+    def __init__(self, capacity: int = 256, p: int = 12, ventana_horas: int = VENTANA_HORAS):
+        self.capacity = capacity
+        self.p = p
+        self.ventana_horas = ventana_horas
+        self.tweets = 0
+        self.top_entities = SpaceSaving(capacity)
+        self.top_authors = SpaceSaving(capacity)
+        self.top_mentions = SpaceSaving(capacity)
+        self.distinct_users = HyperLogLog(p)
+        self.users_by_hour: Dict[str, HyperLogLog] = {}
+        self.users_by_city: Dict[str, HyperLogLog] = {}
+
+    def update(self, tweet: Dict[str, Any], enriched: Optional[Dict[str, Any]] = None,
+               user: Optional[Dict[str, Any]] = None) -> None:
+        """
+        Incorpora un tweet.
+
+        Args:
+            tweet: Tweet en formato del dataset (id, text, author_id, created_at)
+            enriched: Registro de "sentimiento" con sus entidades, si existe
+            user: Autor del tweet, para agregar por ciudad (user.location)
+        """
+        self.tweets += 1
+        author_id = tweet['author_id']
+        self.top_authors.update(author_id)
+        self.distinct_users.add(author_id)
+
+        hora = tweet.get('created_at', '')[:13]
+        if hora:
+            self._contar_hora(hora, author_id)
+
+        ubicacion = (user or {}).get('location')
+        if ubicacion:
+            ciudad = _ciudad_canonica(ubicacion)
+            if ciudad not in self.users_by_city:
+                self.users_by_city[ciudad] = HyperLogLog(self.p)
+            self.users_by_city[ciudad].add(author_id)
+
+        for handle in MENCION_RE.findall(tweet.get('text', '')):
+            self.top_mentions.update(handle)
+
+        for entidad in (enriched or {}).get('entities', []):
+            self.top_entities.update(entidad['text'])
+
+    def _contar_hora(self, hora: str, author_id: str) -> None:
+        por_hora = self.users_by_hour
+        if hora not in por_hora:
+            if len(por_hora) >= self.ventana_horas:
+                mas_antigua = min(por_hora)
+                if hora < mas_antigua:
+                    return  # fuera de la ventana
+                del por_hora[mas_antigua]
+            por_hora[hora] = HyperLogLog(self.p)
+        por_hora[hora].add(author_id)
+
+    def update_many(self, tweets: Iterable[Dict[str, Any]], enriched: Iterable[Dict[str, Any]],
+                    users: Dict[str, Dict[str, Any]]) -> None:
+        """Incorpora un lote de tweets alineado con sus registros enriquecidos."""
+        for tweet, registro in zip(tweets, enriched):
+            self.update(tweet, registro, users.get(tweet['author_id']))
+
+    def merge(self, other: 'StreamSketches') -> 'StreamSketches':
+        """Combina los sketches de dos shards."""
+        merged = StreamSketches(max(self.capacity, other.capacity), self.p,
+                                max(self.ventana_horas, other.ventana_horas))
+        merged.tweets = self.tweets + other.tweets
+        merged.top_entities = self.top_entities.merge(other.top_entities)
+        merged.top_authors = self.top_authors.merge(other.top_authors)
+        merged.top_mentions = self.top_mentions.merge(other.top_mentions)
+        merged.distinct_users = self.distinct_users.merge(other.distinct_users)
+        merged.users_by_hour = _recortar_horas(_merge_hll_maps(self.users_by_hour, other.users_by_hour),
+                                               merged.ventana_horas)
+        merged.users_by_city = _merge_hll_maps(self.users_by_city, other.users_by_city)
+        return merged
+
+    def summary(self, n: int = 10) -> Dict[str, Any]:
+        """Resumen legible: top-n de cada resumen y conteos distintos estimados."""
+        return {
+            'tweets': self.tweets,
+            'distinct_users': self.distinct_users.count(),
+            'distinct_users_error': self.distinct_users.relative_error,
+            'top_entities': self.top_entities.top(n),
+            'top_authors': self.top_authors.top(n),
+            'top_mentions': self.top_mentions.top(n),
+            'users_by_hour': {h: s.count() for h, s in sorted(self.users_by_hour.items())},
+            'users_by_city': {c: s.count() for c, s in sorted(self.users_by_city.items())},
+        }
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'capacity': self.capacity,
+            'p': self.p,
+            'ventana_horas': self.ventana_horas,
+            'tweets': self.tweets,
+            'top_entities': self.top_entities.to_dict(),
+            'top_authors': self.top_authors.to_dict(),
+            'top_mentions': self.top_mentions.to_dict(),
+            'distinct_users': self.distinct_users.to_dict(),
+            'users_by_hour': {k: v.to_dict() for k, v in self.users_by_hour.items()},
+            'users_by_city': {k: v.to_dict() for k, v in self.users_by_city.items()},
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'StreamSketches':
+        sketches = cls(data['capacity'], data['p'], data.get('ventana_horas', VENTANA_HORAS))
+        sketches.tweets = data['tweets']
+        sketches.top_entities = SpaceSaving.from_dict(data['top_entities'])
+        sketches.top_authors = SpaceSaving.from_dict(data['top_authors'])
+        sketches.top_mentions = SpaceSaving.from_dict(data['top_mentions'])
+        sketches.distinct_users = HyperLogLog.from_dict(data['distinct_users'])
+        sketches.users_by_hour = _recortar_horas(
+            {k: HyperLogLog.from_dict(v) for k, v in data['users_by_hour'].items()}, sketches.ventana_horas)
+        sketches.users_by_city = {k: HyperLogLog.from_dict(v) for k, v in data['users_by_city'].items()}
+        return sketches
+
+
+def sketch_dataset(dataset: Dict[str, Any], capacity: int = 256, p: int = 12,
+                   ventana_horas: int = VENTANA_HORAS) -> StreamSketches:
+    """Construye los sketches de un dataset completo en una sola pasada."""
+    enriched = {e['id']: e for e in (dataset.get('sentimiento') or dataset.get('enriched_tweets') or [])}
+    users = dataset.get('users', {})
+    sketches = StreamSketches(capacity, p, ventana_horas)
+    for tweet in dataset.get('tweets', []):
+        sketches.update(tweet, enriched.get(tweet['id']), users.get(tweet['author_id']))
+    return sketches
+
+
+def actualizar_fichero_sketches(path: str, nuevos: StreamSketches, dataset: Dict[str, Any]) -> StreamSketches:
+    """
+    Combina los sketches de los tweets recién añadidos con los guardados y los persiste.
+
+    Los sketches guardados en path deben cubrir exactamente los tweets que el
+    dataset tenía antes de esta ejecución; si el fichero no existe o no cuadra
+    (otro dataset, ejecución sin --sketches), se reconstruyen con sketch_dataset.
+
+    Args:
+        path: Fichero JSON de sketches
+        nuevos: Sketches alimentados solo con los tweets nuevos
+        dataset: Dataset resultante completo (previos + nuevos)
+    """
+    previos = len(dataset.get('tweets', [])) - nuevos.tweets
+    sketches = None
+    if previos == 0:
+        sketches = nuevos
+    elif os.path.exists(path):
+        with open(path, 'r', encoding='utf-8') as f:
+            guardados = StreamSketches.from_dict(json.load(f))
+        if guardados.tweets == previos:
+            sketches = guardados.merge(nuevos)
+    if sketches is None:
+        print(f"   ⚠️ {path} no existe o no corresponde al dataset, reconstruyendo sketches")
+        sketches = sketch_dataset(dataset, nuevos.capacity, nuevos.p, nuevos.ventana_horas)
+
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(sketches.to_dict(), f, ensure_ascii=False)
+    return sketches
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """Función principal: calcula los sketches de un dataset y los compara con el cálculo exacto."""
+    from collections import Counter
+
+    parser = argparse.ArgumentParser(description='Sketches top-K y HyperLogLog del dataset')
+    parser.add_argument('dataset')
+    parser.add_argument('--capacity', type=int, default=256)
+    parser.add_argument('--p', type=int, default=12)
+    parser.add_argument('--ventana-horas', type=int, default=VENTANA_HORAS,
+                        help='Horas más recientes con conteo de usuarios distintos')
+    parser.add_argument('--output', default=None, help='Guardar los sketches serializados (JSON)')
+    args = parser.parse_args(argv)
+
+    with open(args.dataset, 'r', encoding='utf-8') as f:
+        dataset = json.load(f)
+
+    sketches = sketch_dataset(dataset, args.capacity, args.p, args.ventana_horas)
+    resumen = sketches.summary()
+
+    exact_users = len({t['author_id'] for t in dataset['tweets']})
+    enriched = dataset.get('sentimiento') or dataset.get('enriched_tweets') or []
+    exact_entities = Counter(ent['text'] for e in enriched for ent in e.get('entities', []))
+
+    print(f"Tweets procesados:   {resumen['tweets']}")
+    print(f"Usuarios distintos:  {resumen['distinct_users']} (exacto: {exact_users}, "
+          f"error típico ±{resumen['distinct_users_error']:.1%})")
+    print("\nTop entidades (estimado / exacto):")
+    for entry in resumen['top_entities']:
+        print(f"  {entry['item']:<30} {entry['count']:>8} / {exact_entities[entry['item']]:>8}  (±{entry['error']})")
+    print("\nTop autores:")
+    for entry in resumen['top_authors'][:5]:
+        print(f"  {entry['item']:<22} {entry['count']:>6}  (±{entry['error']})")
+    print("\nTop mencionados:")
+    for entry in resumen['top_mentions'][:5]:
+        print(f"  @{entry['item']:<21} {entry['count']:>6}  (±{entry['error']})")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(sketches.to_dict(), f, ensure_ascii=False)
+        print(f"\n✓ Sketches guardados en {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -8,3 +8,4 @@ export * from './loader';
 export * from './useDataset';
 export * from './network-builder';
 export * from './useNetworkData';
+export * from './snapshots';
@@ -12,11 +12,29 @@ import type {
   EnrichedTweet,
   DatasetStats,
 } from '@/types/dataset';
+import { refreshDataset, type RawDataset } from './snapshots';
+
+// Última versión recibida de los snapshots: las recargas solo descargan los parches nuevos
+let snapshotCache: { dataset: RawDataset; hash: string } | null = null;
 
 /**
  * Load the raw dataset from the public data directory
+ *
+ * Uses the snapshot store first, applying only the patches after the cached
+ * version, and falls back to downloading dataset.json in full.
  */
 export async function loadDataset(): Promise<Dataset> {
+  try {
+    const refresh = await refreshDataset(
+      snapshotCache?.dataset ?? null,
+      snapshotCache?.hash ?? null
+    );
+    snapshotCache = { dataset: refresh.dataset, hash: refresh.hash };
+    return normalizeDataset(refresh.dataset);
+  } catch (error) {
+    console.warn('Snapshot refresh failed, loading dataset.json:', error);
+  }
+
   try {
     const response = await fetch('/data/dataset.json');
 
@@ -24,20 +42,25 @@ export async function loadDataset(): Promise<Dataset> {
       throw new Error(`Failed to load dataset: ${response.statusText}`);
     }
 
-    const data = await response.json();
-
-    return {
-      tweets: data.tweets || [],
-      users: data.users || {},
-      // El dataset real usa "sentimiento" en lugar de "enriched_tweets"
-      enriched_tweets: data.sentimiento || data.enriched_tweets || [],
-    };
+    return normalizeDataset(await response.json());
   } catch (error) {
     console.error('Error loading dataset:', error);
     throw error;
   }
 }
 
+/**
+ * Map the raw JSON (dataset.json or a refreshed snapshot) to the Dataset shape
+ */
+export function normalizeDataset(data: Record<string, unknown>): Dataset {
+  return {
+    tweets: (data.tweets as Tweet[]) || [],
+    users: (data.users as Dataset['users']) || {},
+    // El dataset real usa "sentimiento" en lugar de "enriched_tweets"
+    enriched_tweets: ((data.sentimiento || data.enriched_tweets) as EnrichedTweet[]) || [],
+  };
+}
+
 /**
  * Process the raw dataset into a more usable format
  * Converts the users object into an array and creates lookup maps
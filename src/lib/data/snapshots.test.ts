@@ -0,0 +1,154 @@
+/**
+ * Dataset Snapshots tests
+ *
+ * Builds a snapshot store with scripts/dataset_snapshots.py, applies its patches
+ * with applyPatch / refreshDataset and checks the result against the content
+ * hash computed in Python (the client does not compute it).
+ *
+ * Run with: npm run test:snapshots (Node >= 22.6 and python3 on the PATH)
+ */
+
+import assert from 'node:assert/strict';
+import { execFileSync } from 'node:child_process';
+import { mkdtempSync, readFileSync, rmSync } from 'node:fs';
+import { tmpdir } from 'node:os';
+import { join } from 'node:path';
+import { fileURLToPath } from 'node:url';
+import { gunzipSync } from 'node:zlib';
+import { after, before, test } from 'node:test';
+
+import {
+  applyPatch,
+  refreshDataset,
+  type DatasetPatch,
+  type RawDataset,
+  type SnapshotManifest,
+} from './snapshots.ts';
+
+const SCRIPTS_DIR = fileURLToPath(new URL('../../../scripts', import.meta.url));
+
+// Tres versiones: base, parche con altas/bajas/cambios y parche que añade una sección.
+// Sin floats enteros (4.0): JSON.stringify los escribiría como 4 y cambiaría el hash.
+const BUILD_STORE = `
+import json, sys
+from dataset_snapshots import SnapshotStore
+
+v1 = {
+    'tweets': [
+        {'id': '1', 'author_id': 'u1', 'text': 'hola', 'created_at': '2024-05-01T10:00:00Z'},
+        {'id': '2', 'author_id': 'u2', 'text': 'adiós', 'created_at': '2024-05-01T11:00:00Z'},
+    ],
+    'users': {
+        'u1': {'id': 'u1', 'username': 'ana', 'location': 'Bogotá', 'geo': {'x': -74.0721, 'y': 4.711}},
+        'u2': {'id': 'u2', 'username': 'beto', 'location': 'Cali', 'verified': True},
+    },
+    'sentimiento': [
+        {'id': '1', 'sentiment': 'positive', 'score': 0.91},
+        {'id': '2', 'sentiment': 'negative', 'score': 0.35},
+    ],
+}
+v2 = json.loads(json.dumps(v1))
+v2['tweets'] = v2['tweets'][1:] + [{'id': '3', 'author_id': 'u3', 'text': 'nuevo', 'created_at': '2024-05-02T09:00:00Z'}]
+v2['sentimiento'][1]['score'] = 0.12
+v2['users']['u1']['geo'] = {'x': -75.5636, 'y': 6.2476}
+del v2['users']['u2']['verified']
+v2['users']['u3'] = {'id': 'u3', 'username': 'caro', 'location': 'Medellín'}
+v3 = json.loads(json.dumps(v2))
+v3['places'] = {'p1': {'id': 'p1', 'full_name': 'Medellín, Colombia'}}
+
+store = SnapshotStore(sys.argv[1])
+for dataset, message in ((v1, 'v1'), (v2, 'v2'), (v3, 'v3')):
+    store.commit(dataset, message)
+json.dump(v1, sys.stdout, ensure_ascii=False)
+`;
+
+const HASH_DATASET = `
+import json, sys
+from dataset_snapshots import hash_dataset
+print(hash_dataset(json.load(sys.stdin)))
+`;
+
+function python(script: string, args: string[] = [], input?: string): string {
+  return execFileSync('python3', ['-c', script, ...args], {
+    cwd: SCRIPTS_DIR,
+    input,
+    encoding: 'utf-8',
+  });
+}
+
+function contentHash(dataset: RawDataset): string {
+  return python(HASH_DATASET, [], JSON.stringify(dataset)).trim();
+}
+
+function readGz<T>(path: string): T {
+  return JSON.parse(gunzipSync(readFileSync(path)).toString('utf-8')) as T;
+}
+
+let storeDir: string;
+let base: RawDataset;
+let manifest: SnapshotManifest;
+const realFetch = globalThis.fetch;
+
+before(() => {
+  storeDir = mkdtempSync(join(tmpdir(), 'snapshots-'));
+  base = JSON.parse(python(BUILD_STORE, [storeDir]));
+  manifest = JSON.parse(readFileSync(join(storeDir, 'manifest.json'), 'utf-8'));
+
+  // Sirve el almacén como lo haría un servidor estático: los .gz sin Content-Encoding
+  globalThis.fetch = async (input: RequestInfo | URL) => {
+    const path = join(storeDir, String(input).replace('/snapshots/', ''));
+    try {
+      return new Response(readFileSync(path));
+    } catch {
+      return new Response(null, { status: 404, statusText: 'Not Found' });
+    }
+  };
+});
+
+after(() => {
+  globalThis.fetch = realFetch;
+  rmSync(storeDir, { recursive: true, force: true });
+});
+
+test('the store has a base followed by two patches', () => {
+  assert.deepEqual(
+    manifest.versions.map((v) => v.kind),
+    ['base', 'patch', 'patch']
+  );
+  assert.equal(contentHash(base), manifest.versions[0].hash);
+});
+
+test('applyPatch reproduces each version hashed by Python', () => {
+  let dataset = base;
+  manifest.versions.slice(1).forEach((version) => {
+    const patch = readGz<DatasetPatch>(join(storeDir, version.file));
+    const before = JSON.stringify(dataset);
+
+    const next = applyPatch(dataset, patch);
+
+    assert.equal(JSON.stringify(dataset), before, 'the input dataset must not change');
+    assert.equal(contentHash(next), patch.to);
+    assert.equal(patch.to, version.hash);
+    dataset = next;
+  });
+});
+
+test('refreshDataset downloads only the patches after the cached version', async () => {
+  const latest = manifest.versions[manifest.versions.length - 1];
+
+  const refresh = await refreshDataset(base, manifest.versions[0].hash, '/snapshots');
+
+  assert.equal(refresh.patchesApplied, 2);
+  assert.equal(refresh.hash, latest.hash);
+  assert.equal(refresh.version, latest.version);
+  assert.equal(contentHash(refresh.dataset), latest.hash);
+});
+
+test('refreshDataset without a cached version starts from the latest base', async () => {
+  const latest = manifest.versions[manifest.versions.length - 1];
+
+  const refresh = await refreshDataset(null, null, '/snapshots');
+
+  assert.equal(refresh.patchesApplied, 2);
+  assert.equal(contentHash(refresh.dataset), latest.hash);
+});
@@ -0,0 +1,217 @@
+/**
+ * Dataset Snapshots
+ *
+ * Client-side refresh from the versioned snapshot store written by
+ * scripts/dataset_snapshots.py (public/data/snapshots/). Instead of downloading
+ * dataset.json again, the client fetches manifest.json and applies only the
+ * gzip-compressed patches between the version it holds and the latest one.
+ *
+ * Versions are tracked by the hashes listed in the manifest: every patch must
+ * start at the hash the client currently holds, and the client adopts the
+ * patch's "to" hash afterwards. The content hash itself (canonical JSON +
+ * SHA-256 per record) is computed only in Python and is not recomputed here.
+ */
+
+export const SNAPSHOTS_URL = '/data/snapshots';
+
+const LIST_SECTIONS = ['tweets', 'sentimiento', 'enriched_tweets'];
+const OBJECT_SECTIONS = ['users', 'places'];
+
+type DatasetRecord = Record<string, unknown>;
+
+/**
+ * Dataset exactly as stored in dataset.json and in the snapshot bases
+ */
+export type RawDataset = Record<string, unknown>;
+
+export interface SnapshotVersion {
+  version: number;
+  hash: string;
+  parent: string | null;
+  kind: 'base' | 'patch';
+  file: string;
+  bytes: number;
+  created_at: string;
+  message: string;
+  stats?: { added: number; removed: number; changed: number };
+}
+
+export interface SnapshotManifest {
+  versions: SnapshotVersion[];
+}
+
+interface FieldDelta {
+  set?: DatasetRecord;
+  unset?: string[];
+}
+
+interface PatchSection {
+  added?: unknown[];
+  removed?: string[];
+  changed?: Record<string, FieldDelta>;
+  replace?: DatasetRecord[];
+  drop?: boolean;
+}
+
+export interface DatasetPatch {
+  format: number;
+  from: string;
+  to: string;
+  sections: Record<string, PatchSection>;
+  stats: { added: number; removed: number; changed: number };
+}
+
+export interface SnapshotRefresh {
+  dataset: RawDataset;
+  hash: string;
+  version: number;
+  patchesApplied: number;
+}
+
+/**
+ * Fetch a JSON file that may be gzip-compressed on disk (.json.gz)
+ *
+ * Static servers usually send .gz files as plain bytes without
+ * Content-Encoding, so the gzip magic number is checked before parsing.
+ */
+async function fetchJson<T>(url: string): Promise<T> {
+  const response = await fetch(url);
+  if (!response.ok) {
+    throw new Error(`Failed to load ${url}: ${response.statusText}`);
+  }
+
+  const bytes = new Uint8Array(await response.arrayBuffer());
+  if (bytes[0] !== 0x1f || bytes[1] !== 0x8b) {
+    return JSON.parse(new TextDecoder().decode(bytes)) as T;
+  }
+
+  const stream = new Blob([bytes]).stream().pipeThrough(new DecompressionStream('gzip'));
+  return JSON.parse(await new Response(stream).text()) as T;
+}
+
+/**
+ * Load the snapshot manifest
+ */
+export async function loadSnapshotManifest(
+  baseUrl: string = SNAPSHOTS_URL
+): Promise<SnapshotManifest> {
+  return fetchJson<SnapshotManifest>(`${baseUrl}/manifest.json`);
+}
+
+/**
+ * Records of a section keyed by id, preserving order
+ */
+function sectionRecords(dataset: RawDataset, section: string): Map<string, DatasetRecord> {
+  const value = dataset[section];
+  const records = new Map<string, DatasetRecord>();
+  if (value == null) {
+    return records;
+  }
+  if (LIST_SECTIONS.includes(section)) {
+    (value as DatasetRecord[]).forEach((record) => records.set(String(record.id), record));
+  } else {
+    Object.entries(value as Record<string, DatasetRecord>).forEach(([id, record]) =>
+      records.set(id, record)
+    );
+  }
+  return records;
+}
+
+/**
+ * Apply a patch and return a new dataset (the input is not modified)
+ *
+ * Mirrors aplicar_delta in scripts/dataset_snapshots.py.
+ */
+export function applyPatch(dataset: RawDataset, patch: DatasetPatch): RawDataset {
+  const result: RawDataset = { ...dataset };
+
+  Object.entries(patch.sections).forEach(([section, changes]) => {
+    if (changes.drop) {
+      delete result[section];
+      return;
+    }
+    if (changes.replace) {
+      result[section] = changes.replace;
+      return;
+    }
+
+    const records = sectionRecords(dataset, section);
+    (changes.removed || []).forEach((id) => records.delete(id));
+    Object.entries(changes.changed || {}).forEach(([id, delta]) => {
+      const record: DatasetRecord = { ...records.get(id), ...(delta.set || {}) };
+      (delta.unset || []).forEach((field) => delete record[field]);
+      records.set(id, record);
+    });
+
+    if (LIST_SECTIONS.includes(section)) {
+      result[section] = [...records.values(), ...((changes.added || []) as DatasetRecord[])];
+    } else if (OBJECT_SECTIONS.includes(section)) {
+      const object: Record<string, DatasetRecord> = {};
+      records.forEach((record, id) => {
+        object[id] = record;
+      });
+      (changes.added || []).forEach((entry) => {
+        const [id, record] = entry as [string, DatasetRecord];
+        object[id] = record;
+      });
+      result[section] = object;
+    }
+  });
+
+  return result;
+}
+
+/**
+ * Bring a dataset up to the latest snapshot version
+ *
+ * If the current hash is unknown (or null) or the chain passes through a newer
+ * base, the latest base is downloaded and the patches after it are applied.
+ *
+ * @param dataset - Dataset the client holds (ignored when currentHash is null)
+ * @param currentHash - Hash of that dataset, as returned by a previous refresh
+ */
+export async function refreshDataset(
+  dataset: RawDataset | null,
+  currentHash: string | null,
+  baseUrl: string = SNAPSHOTS_URL
+): Promise<SnapshotRefresh> {
+  const { versions } = await loadSnapshotManifest(baseUrl);
+  if (versions.length === 0) {
+    throw new Error('The snapshot store is empty');
+  }
+  const latest = versions[versions.length - 1];
+
+  const start = currentHash ? versions.findIndex((v) => v.hash === currentHash) : -1;
+  if (dataset && start === versions.length - 1) {
+    return { dataset, hash: latest.hash, version: latest.version, patchesApplied: 0 };
+  }
+
+  let current = dataset;
+  let hash = currentHash;
+  let pending = versions.slice(start + 1);
+  if (!current || start < 0 || pending.some((v) => v.kind === 'base')) {
+    let baseIndex = versions.length - 1;
+    while (versions[baseIndex].kind !== 'base') {
+      baseIndex--;
+    }
+    current = await fetchJson<RawDataset>(`${baseUrl}/${versions[baseIndex].file}`);
+    hash = versions[baseIndex].hash;
+    pending = versions.slice(baseIndex + 1);
+  }
+
+  for (const entry of pending) {
+    const patch = await fetchJson<DatasetPatch>(`${baseUrl}/${entry.file}`);
+    if (patch.from !== hash || patch.to !== entry.hash) {
+      throw new Error(`Patch ${entry.file} does not go from ${hash} to ${entry.hash}`);
+    }
+    current = applyPatch(current, patch);
+    hash = patch.to;
+  }
+
+  return {
+    dataset: current,
+    hash: latest.hash,
+    version: latest.version,
+    patchesApplied: pending.length,
+  };
+}